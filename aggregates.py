@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import data_store
+
+# Direction in which each metric is "better"; metrics not listed are ranked
+# with higher values first
+LOWER_IS_BETTER = ['P/E Ratio', 'Forward P/E', 'PEG Ratio', 'P/B Ratio', 'Debt/Equity']
+
+GROUP_COLUMNS = ['Sector', 'Industry']
+
+
+def metric_columns(fa):
+    return [c for c in fa.select_dtypes(include=[np.number]).columns]
+
+
+def higher_is_better(metric):
+    return metric not in LOWER_IS_BETTER
+
+
+def build_rankings(fa):
+    """Per-metric ranks over the whole universe in long format.
+
+    One row per (Metric, Symbol) with the value, its rank (1 = best, ties
+    broken by universe order) and percentile (100 = best). Rows are sorted by
+    (Metric, Rank), so each metric's block is its sorted index.
+    """
+    fa = data_store.clean_fundamentals(fa)
+    frames = []
+    for metric in metric_columns(fa):
+        values = fa[metric]
+        valid = values.notna()
+        rank = values.rank(method='first', ascending=not higher_is_better(metric))
+        frames.append(pd.DataFrame({
+            'Metric': metric,
+            'Symbol': fa['Symbol'].to_numpy(),
+            'Value': values.to_numpy(),
+            'Rank': rank.to_numpy(),
+            'Percentile': (100 * (valid.sum() - rank + 1) / valid.sum()).to_numpy() if valid.any() else np.nan,
+        }))
+    if not frames:
+        return pd.DataFrame(columns=['Metric', 'Symbol', 'Value', 'Rank', 'Percentile'])
+    ranks = pd.concat(frames, ignore_index=True)
+    return ranks.sort_values(['Metric', 'Rank'], na_position='last').reset_index(drop=True)
+
+
+def build_group_aggregates(fa, group):
+    """Mean, median, count and sum of every metric per sector or industry, long format"""
+    fa = data_store.clean_fundamentals(fa)
+    metrics = metric_columns(fa)
+    stats = fa.groupby(group)[metrics].agg(['mean', 'median', 'count', 'sum'])
+    stats = stats.stack(level=0, future_stack=True)
+    stats.index.names = [group, 'Metric']
+    stats.columns = ['Mean', 'Median', 'Count', 'Sum']
+    stats['Members'] = fa.groupby(group).size().reindex(stats.index.get_level_values(0)).to_numpy()
+    return stats.reset_index()
+
+
+def build_aggregates(fa):
+    """{dataset name: frame} of rankings and sector/industry aggregates"""
+    frames = {'fundamental_ranks': build_rankings(fa)}
+    for group in GROUP_COLUMNS:
+        if group in fa.columns:
+            frames[f"{group.lower()}_aggregates"] = build_group_aggregates(fa, group)
+    return frames
+
+
+def update_aggregates(fa):
+    """Rebuild and store rankings and sector/industry aggregates"""
+    return list(data_store.save_datasets(build_aggregates(fa)).values())
+
+
+def stored_versions(fa, snap):
+    """{dataset: version handle} of the stored rankings and aggregates if they
+    are at least as new as the fundamentals in snap, else None"""
+    fundamentals = snap.dataset_version('fundamentals')
+    names = ['fundamental_ranks'] + [f"{g.lower()}_aggregates" for g in GROUP_COLUMNS if g in fa.columns]
+    versions = {name: snap.dataset_version(name) for name in names}
+    # Files from before the manifest (version 0) cannot be ordered, so rebuild
+    fresh = (fundamentals is not None and fundamentals[1] > 0
+             and all(v is not None and v[1] >= fundamentals[1] for v in versions.values()))
+    return versions if fresh else None
+
+
+def load_aggregates(fa, snap=None):
+    """Stored rankings and aggregates, rebuilt in memory if they are missing or
+    older than the fundamentals they were derived from.
+
+    Returns {'ranks': wide Rank frame (Symbol x Metric), 'rankings': long
+    rankings, 'sector': ..., 'industry': ...}.
+    """
+    snap = snap or data_store.snapshot()
+    versions = stored_versions(fa, snap)
+    if versions is not None:
+        rankings = data_store.load_dataset('fundamental_ranks', version=versions['fundamental_ranks'])
+        rankings['Symbol'] = rankings['Symbol'].astype(str)
+        groups = {g.lower(): data_store.load_dataset(f"{g.lower()}_aggregates", version=versions[f"{g.lower()}_aggregates"])
+                  for g in GROUP_COLUMNS if g in fa.columns}
+    else:
+        rankings = build_rankings(fa)
+        groups = {g.lower(): build_group_aggregates(fa, g) for g in GROUP_COLUMNS if g in fa.columns}
+
+    ranks = rankings.pivot(index='Symbol', columns='Metric', values='Rank')
+    return {'ranks': ranks, 'rankings': rankings, **groups}
+
+
+def best_symbol(ranks, metric, symbols):
+    """Best of the given symbols for a metric by precomputed rank, or None"""
+    if metric not in ranks.columns:
+        return None
+    subset = ranks[metric].reindex(list(symbols)).dropna()
+    if subset.empty:
+        return None
+    return subset.idxmin()
+
+
+def group_table(aggregates, group, metrics, stat='Mean', members=None):
+    """Wide (group x metric) table of one statistic, optionally limited to some groups"""
+    table = aggregates.pivot(index=group, columns='Metric', values=stat)
+    if members is not None:
+        table = table.reindex([m for m in table.index if m in set(members)])
+    return table.reindex(columns=[m for m in metrics if m in table.columns])
@@ -0,0 +1,278 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# name -> (symbols, trading days)
+SCALES = {
+    'nifty50': (50, 126),
+    'nifty500_10y': (500, 2520),
+}
+
+SECTORS = ['Technology', 'Financial Services', 'Energy', 'Healthcare', 'Consumer Defensive',
+           'Industrials', 'Basic Materials', 'Utilities']
+
+
+def synthetic_prices(n_symbols, n_days, seed=0):
+    """Long-format daily OHLCV for n_symbols following geometric random walks"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_days)
+    symbols = [f"SYM{i:04d}" for i in range(n_symbols)]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, (n_days, n_symbols)), axis=0))
+    spread = np.abs(rng.normal(0, 0.01, (n_days, n_symbols)))
+    return pd.DataFrame({
+        'Date': np.repeat(dates, n_symbols),
+        'Symbol': np.tile(symbols, n_days),
+        'Open': (close * (1 + rng.normal(0, 0.005, close.shape))).ravel(),
+        'High': (close * (1 + spread)).ravel(),
+        'Low': (close * (1 - spread)).ravel(),
+        'Close': close.ravel(),
+        'Volume': rng.integers(100_000, 5_000_000, close.shape).astype(float).ravel(),
+    })
+
+
+def to_yfinance_frame(prices):
+    """Reshape long prices into what yf.download(group_by='ticker') returns"""
+    wide = prices.assign(Symbol=prices['Symbol'].astype(str) + '.NS').pivot(
+        index='Date', columns='Symbol', values=['Open', 'High', 'Low', 'Close', 'Volume'])
+    wide = wide.swaplevel(axis=1).sort_index(axis=1)
+    wide.columns.names = ['Ticker', 'Price']
+    return wide
+
+
+def install_stubs(prices):
+    """Replace yfinance and nsepython with offline stand-ins serving the synthetic data"""
+    wide = to_yfinance_frame(prices)
+    symbols = prices['Symbol'].astype(str).unique().tolist()
+    # Stubbed responses must neither be served from nor written to the disk cache
+    os.environ['DASHBOARD_HTTP_CACHE'] = 'off'
+
+    yf = types.ModuleType('yfinance')
+
+    def download(tickers, start=None, period=None, **kwargs):
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        frame = wide.loc[:, wide.columns.get_level_values(0).isin(tickers)]
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start)]
+        return frame.copy()
+
+    class Ticker:
+        def __init__(self, ticker):
+            from fundamental_analysis import StubProvider
+            self.info = StubProvider(latency=0, jitter=0)(ticker.replace('.NS', ''))
+
+    yf.download = download
+    yf.Ticker = Ticker
+
+    nse = types.ModuleType('nsepython')
+    nse.nsefetch = lambda url: {'data': [{'symbol': s} for s in symbols]}
+
+    sys.modules['yfinance'] = yf
+    sys.modules['nsepython'] = nse
+
+
+def synthetic_fundamentals(symbols):
+    from fundamental_analysis import StubProvider, build_fundamentals_row
+    provider = StubProvider(latency=0, jitter=0)
+    rows = [build_fundamentals_row(s, provider(s)) for s in symbols]
+    rng = np.random.default_rng(0)
+    fa = pd.DataFrame(rows)
+    fa['Sector'] = rng.choice(SECTORS, len(fa))
+    return fa
+
+
+def measure(fn, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {'median': statistics.median(timings), 'min': min(timings), 'repeat': repeat}
+
+
+def run(scale, repeat, only=None):
+    n_symbols, n_days = SCALES[scale]
+    prices = synthetic_prices(n_symbols, n_days)
+    install_stubs(prices)
+
+    import data_store
+    data_store.DATA_DIR = tempfile.mkdtemp(prefix='bench_')
+    import fetch_data
+    import indicators
+    import tables
+    import charts
+    import downsample
+    import portfolio
+    import screener
+    import fundamentals_history
+    from price_panel import PricePanel
+
+    symbols = prices['Symbol'].astype(str).unique().tolist()
+    dates = np.sort(prices['Date'].unique())
+    fa = data_store.clean_fundamentals(synthetic_fundamentals(symbols))
+    fa['Return (%)'] = np.random.default_rng(1).normal(0, 2, len(fa))
+
+    legacy_csv = os.path.join(data_store.DATA_DIR, 'legacy_prices.csv')
+    to_yfinance_frame(prices).to_csv(legacy_csv)
+    data_store.save_dataset(prices, 'prices')
+
+    def reset_prices(days_missing):
+        data_store.save_dataset(prices[prices['Date'] <= dates[-days_missing - 1]], 'prices')
+
+    def reset_ta(days_missing):
+        indicators.update_ta_dataset(prices[prices['Date'] <= dates[-days_missing - 1]], full=True)
+
+    valuation = fa[['Company', 'P/E Ratio', 'Forward P/E', 'PEG Ratio', 'P/B Ratio', 'Dividend Yield (%)']].set_index('Company')
+    health = fa[['Company', 'ROE (%)', 'ROA (%)', 'Profit Margin (%)', 'Operating Margin (%)', 'Debt/Equity',
+                 'Current Ratio', 'Quick Ratio']].set_index('Company')
+    comprehensive = fa.drop(columns=['Symbol']).set_index('Company')
+    comprehensive_numeric = comprehensive.select_dtypes(include=[np.number]).columns
+    key_metrics = ['Market Cap (₹100 Cr)', 'P/E Ratio', 'EPS']
+    health_metrics = ['ROE (%)', 'ROA (%)', 'Profit Margin (%)', 'Operating Margin (%)', 'Debt/Equity']
+    sector_metrics = ['Market Cap (₹100 Cr)', 'P/E Ratio', 'ROE (%)', 'Profit Margin (%)']
+    # Ten years of minute bars for one symbol, independent of the scale
+    minutes = 10 * 252 * 375
+    minute_close = pd.DataFrame(
+        {'Close': 100 * np.exp(np.cumsum(np.random.default_rng(2).normal(0, 5e-4, minutes)))},
+        index=pd.date_range('2015-01-01', periods=minutes, freq='min', name='Date'))
+    history = downsample.downsample(minute_close, 'Close', 1500)
+    panel = PricePanel.from_long(prices)
+    screen = screener.ScreenerIndex(fa)
+    screen_query = "P/E < 20 and ROE > 15 and Debt/Equity < 1.5, sector in (IT, banking), sort by PEG"
+    # CHECKPOINT_EVERY + 5 business days of fundamentals (a checkpoint and
+    # five deltas after it) in which only price-driven fields move
+    history_rng = np.random.default_rng(3)
+    history_days = iter(pd.bdate_range('2020-01-01', periods=10_000))
+
+    def next_fundamentals():
+        return fa.assign(**{col: fa[col] * (1 + history_rng.normal(0, 0.01, len(fa)))
+                            for col in ['Market Cap (₹100 Cr)', 'P/E Ratio']})
+
+    for _ in range(fundamentals_history.CHECKPOINT_EVERY + 5):
+        last_history_day = next(history_days)
+        fundamentals_history.append(next_fundamentals(), last_history_day)
+    index_close = prices.groupby('Date')['Close'].mean()
+
+    cases = {
+        'ingest.full': (lambda: fetch_data.update_prices(symbols, full=True), None),
+        'ingest.incremental_5d': (lambda: fetch_data.update_prices(symbols), lambda: reset_prices(5)),
+        'load.legacy_csv': (lambda: data_store._load_legacy('prices', legacy_csv), None),
+        'load.columnar': (lambda: data_store.load_dataset('prices'), lambda: reset_prices(0)),
+        'load.columnar_projected': (lambda: data_store.load_dataset(
+            'prices', columns=['Date', 'Close'], symbols=symbols[:5], start=dates[-60]), None),
+        'load.panel_build': (lambda: PricePanel.from_long(prices), None),
+        'load.panel_mmap': (lambda: data_store.load_price_panel().frame('Close'),
+                            lambda: data_store.save_dataset(PricePanel.from_long(prices), 'price_panel')),
+        'fundamentals.clean': (lambda: data_store.clean_fundamentals(fa), None),
+        'indicators.full': (lambda: indicators.build_ta_dataset(prices), None),
+        # Both publish prices_ta and save the state, as the pipeline stage does
+        'indicators.full_update': (lambda: indicators.update_ta_dataset(prices, full=True), None),
+        'indicators.incremental_5d': (lambda: indicators.update_ta_dataset(prices), lambda: reset_ta(5)),
+        # Styler is lazy, so each case includes to_html. Without a version the
+        # cell styles are keyed by a hash of the frame; only the first repeat
+        # computes them (np.select per column), the rest hit the style cache
+        'tables.valuation': (lambda: tables.style_valuation_table(valuation).to_html(), None),
+        'tables.health': (lambda: tables.style_health_table(health).to_html(), None),
+        'tables.comprehensive': (lambda: tables.style_fundamental_table(comprehensive, comprehensive_numeric).to_html(), None),
+        'charts.key_metrics': (lambda: charts.key_metrics_chart(fa, key_metrics), None),
+        'charts.health_radar': (lambda: charts.health_radar_chart(fa, health_metrics), None),
+        'charts.sector_pie': (lambda: charts.sector_pie_chart(fa['Sector'].value_counts()), None),
+        'charts.sector_metrics': (lambda: charts.sector_metrics_chart(
+            fa.groupby('Sector')[sector_metrics].mean(), sector_metrics), None),
+        'charts.price_history': (lambda: charts.price_history_chart(history, 'SYM0000').to_json(), None),
+        'analytics.universe': (lambda: portfolio.analyze(panel, symbols, 60, market=index_close), None),
+        'analytics.selection_20': (lambda: portfolio.analyze(panel, symbols[:20], 60, market=index_close), None),
+        'analytics.latest_corr': (lambda: portfolio.rolling_cov_corr(
+            portfolio.simple_returns(panel.fields['Close']), 60, [len(dates) - 1]), None),
+        'screener.build_index': (lambda: screener.ScreenerIndex(fa), None),
+        'screener.query': (lambda: screen.screen(screen_query), None),
+        'history.append': (lambda: fundamentals_history.append(next_fundamentals(), next(history_days)), None),
+        'history.as_of': (lambda: fundamentals_history.as_of(last_history_day), None),
+        'history.as_of_projected': (lambda: fundamentals_history.as_of(
+            last_history_day, symbols[:20], ['P/E Ratio', 'ROE (%)']), None),
+        'downsample.lttb_10y_minutes': (lambda: downsample.downsample(minute_close, 'Close', 1500, 'LTTB'), None),
+        'downsample.minmax_10y_minutes': (lambda: downsample.downsample(minute_close, 'Close', 1500, 'Min/Max'), None),
+    }
+
+    results = {}
+    for name, (fn, setup) in cases.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        # Keep the stages' progress output out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = measure(fn, repeat, setup)
+        print(f"{name:<28} median {results[name]['median'] * 1000:10.2f} ms   min {results[name]['min'] * 1000:10.2f} ms",
+              file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return the benchmarks whose median got slower than threshold x baseline"""
+    regressions = {}
+    for name, current in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None or previous['median'] <= 0:
+            continue
+        ratio = current['median'] / previous['median']
+        if ratio > threshold:
+            regressions[name] = round(ratio, 2)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the ingestion, load, indicator and render paths")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='nifty50')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='*', help="run only benchmarks whose name starts with one of these prefixes")
+    parser.add_argument('--output', help="write results as JSON to this file (default: stdout)")
+    parser.add_argument('--compare', help="baseline JSON from an earlier run to check for regressions")
+    parser.add_argument('--threshold', type=float, default=1.25, help="slowdown ratio that counts as a regression")
+    args = parser.parse_args()
+
+    results = run(args.scale, args.repeat, args.only)
+    report = {
+        'meta': {
+            'scale': args.scale,
+            'symbols': SCALES[args.scale][0],
+            'days': SCALES[args.scale][1],
+            'repeat': args.repeat,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('scale') != args.scale:
+            print("Warning: baseline was recorded at a different scale", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        for name, ratio in regressions.items():
+            print(f"REGRESSION {name}: {ratio}x slower than baseline", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import aggregates
+
+# HTML builders for the summary banner and KPI cards. They are pure functions
+# of their inputs so the output can be cached by the render cache.
+
+
+def best_performer_html(fa_selected):
+    """Banner for the stock with the highest intraday return, or '' if no returns"""
+    if 'Return (%)' not in fa_selected.columns or not fa_selected['Return (%)'].notna().any():
+        return ''
+    best_idx = fa_selected['Return (%)'].idxmax()
+    best_row = fa_selected.loc[best_idx]
+    best_symbol = best_row['Symbol']
+    best_company = best_row['Company']
+    today_open = best_row['Today Open']
+    current_close = best_row['Current Close']
+    best_return = best_row['Return (%)']
+    return f"""
+    <div style='display: flex; justify-content: center; align-items: center; gap: 30px; margin-bottom: 10px;'>
+        <div style='background: linear-gradient(135deg, #e0eafc 0%, #cfdef3 100%); border-radius: 16px; padding: 24px 36px; box-shadow: 0 4px 16px rgba(0,0,0,0.08);'>
+            <span style='font-size: 1.5rem; font-weight: bold; color: #222;'>🏆 {best_company}</span><br>
+            <span style='font-size: 1.1rem; color: #555;'>({best_symbol})</span><br>
+            <span style='font-size: 1.15rem; color: #555;'>Open: {f'₹{today_open:,.2f}' if today_open else 'N/A'}</span><br>
+            <span style='font-size: 1.3rem; color: #28a745; font-weight: bold;'>
+                Close: {f'₹{current_close:,.2f}' if current_close else 'N/A'}
+            </span><br>
+            <span style='font-size: 1.2rem; color: #007bff; font-weight: bold;'>
+                Return: {f'{best_return:.2f}%' if best_return else 'N/A'}
+            </span>
+        </div>
+    </div>
+    """
+
+
+def kpi_card_html(fa_selected, metric, ranks=None):
+    """Card showing the best selected stock for a metric.
+
+    ranks is the precomputed (Symbol x Metric) rank table from aggregates; when
+    it covers the metric the best stock is a lookup instead of a scan.
+    """
+    # Only proceed if there are non-NA values
+    if not fa_selected[metric].notna().any():
+        return f"<div style='color:#dc3545; font-weight:bold; text-align:center; margin:10px 0;'>No data for {metric}</div>"
+    best = aggregates.best_symbol(ranks, metric, fa_selected['Symbol']) if ranks is not None else None
+    if best is not None:
+        best_idx = fa_selected.index[fa_selected['Symbol'] == best][0]
+    elif metric == 'Return (%)':
+        best_idx = fa_selected[metric].idxmax()
+    elif 'Market Cap' in metric or 'EPS' in metric or 'ROE' in metric or 'Profit Margin' in metric or 'ROA' in metric:
+        best_idx = fa_selected[metric].idxmax()
+    else:
+        best_idx = fa_selected[metric].idxmin()
+    best_row = fa_selected.loc[best_idx]
+    best_symbol = best_row['Symbol']
+    best_company = best_row['Company']
+    best_value = best_row[metric]
+    current_close = best_row['Current Close'] if 'Current Close' in best_row else None
+    # Color coding and status
+    if metric == 'Return (%)':
+        color = "#007bff"; status = "Top Gainer"
+    elif 'Market Cap' in metric:
+        if best_value > 500:
+            color = "#28a745"; status = "Large Cap"
+        elif best_value > 200:
+            color = "#ffc107"; status = "Mid Cap"
+        else:
+            color = "#dc3545"; status = "Small Cap"
+    elif 'P/E Ratio' in metric:
+        if best_value < 15:
+            color = "#28a745"; status = "Undervalued"
+        elif best_value < 25:
+            color = "#ffc107"; status = "Fair Value"
+        else:
+            color = "#dc3545"; status = "Overvalued"
+    elif 'ROE' in metric:
+        if best_value > 20:
+            color = "#28a745"; status = "Excellent"
+        elif best_value > 10:
+            color = "#ffc107"; status = "Good"
+        else:
+            color = "#dc3545"; status = "Poor"
+    else:
+        color = "#007bff"; status = "Normal"
+    return f"""
+    <div style="
+        border: 2px solid {color};
+        border-radius: 14px;
+        padding: 18px 10px 14px 10px;
+        text-align: center;
+        background: linear-gradient(135deg, #f8f9fa 0%, #ffffff 100%);
+        box-shadow: 0 4px 15px rgba(0,0,0,0.08);
+        margin-bottom: 10px;
+    ">
+        <div style='font-size: 1.2rem; font-weight: bold; color: #2c3e50; margin-bottom: 6px;'>{metric}</div>
+        <div style='font-size: 2.1rem; font-weight: bold; color: {color}; margin: 8px 0 2px 0;'>
+            {best_value:.2f}
+        </div>
+        <div style='font-size: 1.1rem; color: #222; font-weight: 600; margin-bottom: 2px;'>
+            <span style='color: #007bff;'>🏢 {best_company}</span>
+        </div>
+        <div style='font-size: 1.05rem; color: #555; margin-bottom: 2px;'>({best_symbol})</div>
+        <div style='font-size: 1.15rem; color: #28a745; font-weight: bold; margin-bottom: 2px;'>
+            {f'₹{current_close:,.2f}' if current_close else 'Price N/A'}
+        </div>
+        <div style="
+            background-color: {color};
+            color: white;
+            padding: 4px 8px;
+            border-radius: 12px;
+            font-size: 13px;
+            font-weight: bold;
+            margin-top: 8px;
+            display: inline-block;
+        ">{status}</div>
+    </div>
+    """
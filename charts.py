@@ -0,0 +1,222 @@
+import pandas as pd
+import plotly.graph_objs as go
+from plotly.subplots import make_subplots
+
+# Beyond this many traces or categories the charts stop being readable, so
+# larger selections are cut down to the biggest companies / sectors
+MAX_RADAR_TRACES = 10
+MAX_PIE_SLICES = 12
+MAX_SECTORS = 15
+
+
+def largest(fa_selected, n, by='Market Cap (₹100 Cr)'):
+    """The n largest rows by market cap (or all rows when there are at most n)"""
+    if n is None or len(fa_selected) <= n or by not in fa_selected.columns:
+        return fa_selected.head(n) if n is not None else fa_selected
+    return fa_selected.nlargest(n, by)
+
+
+def key_metrics_chart(fa_selected, metrics):
+    """Grouped bar chart comparing the given metrics across companies"""
+    fig = go.Figure()
+
+    for metric in metrics:
+        values = fa_selected[metric].values
+        companies = fa_selected['Company'].values
+
+        fig.add_trace(go.Bar(
+            name=metric,
+            x=companies,
+            y=values,
+            text=[f'{v:.2f}' for v in values],
+            textposition='auto',
+        ))
+
+    fig.update_layout(
+        title=f"Comparison of Key Metrics",
+        xaxis_title="Companies",
+        yaxis_title="Values",
+        barmode='group',
+        height=500,
+        showlegend=True
+    )
+    return fig
+
+
+def health_radar_chart(fa_selected, metrics, top_n=MAX_RADAR_TRACES):
+    """Radar chart of financial health metrics, one trace per company (the
+    top_n largest companies only)"""
+    fa_selected = largest(fa_selected, top_n)
+    fig = go.Figure()
+
+    for idx, company in enumerate(fa_selected['Company']):
+        values = []
+        for metric in metrics:
+            val = fa_selected[fa_selected['Company'] == company][metric].iloc[0]
+            if pd.notna(val):
+                values.append(val)
+            else:
+                values.append(0)
+
+        fig.add_trace(go.Scatterpolar(
+            r=values,
+            theta=metrics,
+            fill='toself',
+            name=company,
+            line_color=f'rgb({50 + idx*50}, {100 + idx*30}, {150 + idx*20})'
+        ))
+
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, max([fa_selected[col].max() for col in metrics if fa_selected[col].max() > 0])]
+            )),
+        showlegend=True,
+        title="Financial Health Radar Chart",
+        height=500
+    )
+    return fig
+
+
+def sector_pie_chart(sector_counts, top_n=MAX_PIE_SLICES):
+    """Donut chart of how many selected stocks fall in each sector; sectors
+    beyond the top_n largest are folded into 'Other'"""
+    if len(sector_counts) > top_n:
+        sector_counts = sector_counts.sort_values(ascending=False)
+        other = sector_counts.iloc[top_n:].sum()
+        sector_counts = pd.concat([sector_counts.iloc[:top_n], pd.Series({'Other': other})])
+    fig = go.Figure(data=[go.Pie(
+        labels=sector_counts.index,
+        values=sector_counts.values,
+        hole=0.3,
+        marker_colors=['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD', '#98D8C8']
+    )])
+
+    fig.update_layout(
+        title="Sector Distribution",
+        height=400,
+        showlegend=True
+    )
+    return fig
+
+
+def sector_metrics_chart(sector_avg, metrics, top_n=MAX_SECTORS):
+    """Grouped bar chart of average metrics per sector (the top_n sectors by
+    the first metric)"""
+    if len(sector_avg) > top_n:
+        sector_avg = sector_avg.sort_values(metrics[0], ascending=False).head(top_n)
+    fig = go.Figure()
+
+    for metric in metrics:
+        fig.add_trace(go.Bar(
+            name=metric,
+            x=sector_avg.index,
+            y=sector_avg[metric],
+            text=[f'{v:.2f}' for v in sector_avg[metric]],
+            textposition='auto',
+        ))
+
+    fig.update_layout(
+        title="Average Metrics by Sector",
+        xaxis_title="Sectors",
+        yaxis_title="Average Values",
+        barmode='group',
+        height=500,
+        showlegend=True
+    )
+    return fig
+
+
+# Indicator columns drawn on top of the price, and below it in their own panel
+PRICE_OVERLAYS = {
+    'SMA 20': ['SMA_20'],
+    'SMA 50': ['SMA_50'],
+    'EMA 12': ['EMA_12'],
+    'EMA 26': ['EMA_26'],
+    'Bollinger Bands': ['BB_Upper', 'BB_Middle', 'BB_Lower'],
+}
+OSCILLATORS = {
+    'RSI': ['RSI_14'],
+    'MACD': ['MACD', 'MACD_Signal', 'MACD_Hist'],
+}
+
+
+def price_history_chart(history, symbol, overlays=(), oscillator=None):
+    """Close price with indicator overlays and an optional oscillator panel.
+
+    history is a Date-indexed frame that has already been downsampled; all
+    traces are Scattergl so long histories are drawn with WebGL.
+    """
+    panels = 2 if oscillator else 1
+    fig = make_subplots(rows=panels, cols=1, shared_xaxes=True, vertical_spacing=0.04,
+                        row_heights=[0.72, 0.28] if oscillator else [1.0])
+    dates = history.index
+
+    fig.add_trace(go.Scattergl(x=dates, y=history['Close'], name='Close', mode='lines',
+                               line=dict(color='#007bff', width=1.5)), row=1, col=1)
+    for overlay in overlays:
+        for column in PRICE_OVERLAYS[overlay]:
+            if column in history.columns:
+                fig.add_trace(go.Scattergl(x=dates, y=history[column], name=column, mode='lines',
+                                           line=dict(width=1, dash='dot' if column.startswith('BB_') else None)),
+                              row=1, col=1)
+
+    if oscillator:
+        for column in OSCILLATORS[oscillator]:
+            if column in history.columns:
+                fig.add_trace(go.Scattergl(x=dates, y=history[column], name=column, mode='lines',
+                                           line=dict(width=1)), row=2, col=1)
+        if oscillator == 'RSI':
+            for level in (30, 70):
+                fig.add_hline(y=level, line=dict(color='grey', width=1, dash='dash'), row=2, col=1)
+
+    fig.update_layout(
+        title=f"{symbol} Price History",
+        height=650 if oscillator else 500,
+        hovermode='x unified',
+        showlegend=True,
+        margin=dict(t=60, b=30),
+    )
+    fig.update_yaxes(title_text="Price (₹)", row=1, col=1)
+    if oscillator:
+        fig.update_yaxes(title_text=oscillator, row=2, col=1)
+    return fig
+
+
+def time_series_chart(frame, title, yaxis_title, scale=1.0, step=False):
+    """One Scattergl line per column of a Date-indexed frame (values times scale);
+    step=True holds each value until the next one, for sparse change logs"""
+    fig = go.Figure()
+    for column in frame.columns:
+        fig.add_trace(go.Scattergl(x=frame.index, y=frame[column] * scale, name=str(column), mode='lines',
+                                   line=dict(width=1.5, shape='hv' if step else 'linear')))
+    fig.update_layout(
+        title=title,
+        yaxis_title=yaxis_title,
+        height=420,
+        hovermode='x unified',
+        showlegend=True,
+    )
+    return fig
+
+
+def correlation_heatmap(corr, title="Return Correlation"):
+    """Symmetric heatmap of a correlation matrix on a fixed -1..1 colour scale"""
+    fig = go.Figure(data=go.Heatmap(
+        z=corr.to_numpy(),
+        x=[str(c) for c in corr.columns],
+        y=[str(i) for i in corr.index],
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu',
+        reversescale=True,
+        text=corr.round(2).to_numpy(),
+        texttemplate='%{text}' if len(corr) <= 15 else None,
+    ))
+    fig.update_layout(
+        title=title,
+        height=max(400, 28 * len(corr)),
+        yaxis=dict(autorange='reversed'),
+    )
+    return fig
@@ -1,96 +1,180 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objs as go
-import os
 import numpy as np
-import requests
 from datetime import datetime, timedelta
 import json
-import yfinance as yf
+import os
+import time
+import data_store
+import tables
+import charts
+import downsample
+import cards
+import render_cache
+import aggregates
+import fundamentals_history
+import quotes
+import intraday_stream
+import news_feed
+import portfolio
+import screener
+import universe
+import metrics
+import http_cache
+from price_panel import PricePanel
+
+UNIVERSE = universe.from_env()
+# Cap on compared stocks; per-company charts and tables are unreadable beyond it
+MAX_SELECTIONS = 20
+# Intraday quotes: 'poll' (one batched download a minute), 'stream' (running
+# per-symbol state from the live minute-bar feed) or 'replay:<parquet file>'
+# (plays stored minute bars back through the stream)
+INTRADAY = os.environ.get('DASHBOARD_INTRADAY', 'poll')
+STREAMING = INTRADAY != 'poll'
+# Seconds between banner/leaderboard refreshes when streaming
+LIVE_REFRESH = 5
+
+st.set_page_config(page_title=f"{UNIVERSE.name} Dashboard", layout="wide")
+run_started = time.perf_counter()
+
+# Optional Prometheus / JSON metrics endpoint, one per server process
+@st.cache_resource
+def start_metrics_server():
+    port = os.environ.get('DASHBOARD_METRICS_PORT')
+    return metrics.serve(int(port)) if port else None
+
+start_metrics_server()
+
+# Load data once per process; each loader is keyed on the dataset's snapshot
+# version, so a republished dataset is picked up on the next rerun and a
+# half-finished refresh is never seen
+@metrics.track_cache('load_symbols')
+@st.cache_resource(max_entries=2)
+def load_symbols(version):
+    metrics.cache_miss()
+    with metrics.timer('data_load_seconds', dataset='symbols'):
+        return data_store.load_dataset('symbols', version=version)['Symbol'].astype(str).tolist()
+
+@metrics.track_cache('load_ta_data')
+@st.cache_resource(max_entries=2)
+def load_ta_data(version):
+    metrics.cache_miss()
+    with metrics.timer('data_load_seconds', dataset='prices_ta'):
+        return data_store.load_dataset('prices_ta', version=version)
 
-# Load data
-symbols = pd.read_csv(os.path.join(os.path.dirname(__file__), '../data/nifty50_symbols.csv'))['Symbol'].tolist()
-ta_data = pd.read_csv(os.path.join(os.path.dirname(__file__), '../data/nifty50_data_ta.csv'))
-fa_data = pd.read_csv(os.path.join(os.path.dirname(__file__), '../data/nifty50_fundamentals.csv'))
+@metrics.track_cache('load_fundamentals')
+@st.cache_resource(max_entries=2)
+def load_fundamentals(version):
+    metrics.cache_miss()
+    with metrics.timer('data_load_seconds', dataset='fundamentals'):
+        return data_store.clean_fundamentals(data_store.load_dataset('fundamentals', version=version))
 
-# Clean fundamental data
-fa_data = fa_data[fa_data['Symbol'] != 'NIFTY 50']  # Remove the NIFTY 50 row
-fa_data = fa_data.dropna(subset=['Company'])  # Remove rows with missing company names
+@metrics.track_cache('load_aggregates')
+@st.cache_resource(max_entries=2)
+def load_aggregates(version):
+    metrics.cache_miss()
+    with metrics.timer('data_load_seconds', dataset='aggregates'):
+        return aggregates.load_aggregates(fa_data, snap)
 
-st.set_page_config(page_title="Nifty 50 Dashboard", layout="wide")
-st.title("Nifty 50 Dashboard")
+# The memory-mapped price panel is shared by every session; snapshots from
+# before it was published fall back to building it from the long prices
+@metrics.track_cache('load_price_panel')
+@st.cache_resource(max_entries=2)
+def load_price_panel(panel_version, prices_version):
+    metrics.cache_miss()
+    with metrics.timer('data_load_seconds', dataset='price_panel'):
+        if panel_version is not None:
+            return data_store.load_price_panel(panel_version)
+        return PricePanel.from_long(data_store.load_dataset('prices', version=prices_version))
 
-# Multi-select for comparison
-selected_stocks = st.multiselect("Select stocks to compare", symbols, default=symbols[:2])
+@metrics.track_cache('load_index_prices')
+@st.cache_resource(max_entries=2)
+def load_index_prices(version):
+    metrics.cache_miss()
+    with metrics.timer('data_load_seconds', dataset='index_prices'):
+        index_prices = data_store.load_dataset('index_prices', columns=['Date', 'Close'], version=version)
+        return index_prices.set_index('Date')['Close'].sort_index()
 
-tab1, tab2 = st.tabs(["📊 Fundamental Analysis", "📰 Market News"])
+# Row positions of each symbol in ta_data, so one symbol's history is a take
+# instead of a scan over the whole universe
+@st.cache_resource(max_entries=2)
+def ta_symbol_rows(version):
+    return ta_data.groupby('Symbol', observed=True).indices
+
+# Cached objects are shared between sessions and must not be modified in place
+# One snapshot handle per rerun: every dataset below comes from the same
+# published version. Pages and fragments get it as an argument, so a fragment
+# rerun keeps using the snapshot its full run was rendered from.
+snap = data_store.snapshot()
+symbols = load_symbols(snap.dataset_version('symbols'))
+ta_data = load_ta_data(snap.dataset_version('prices_ta'))
+fa_data = load_fundamentals(snap.dataset_version('fundamentals'))
+fa_aggregates = load_aggregates(snap.dataset_version('fundamentals'))
+
+st.title(f"{UNIVERSE.name} Dashboard")
+
+# Narrow the stock picker by sector so large universes stay navigable
+sectors = sorted(fa_data['Sector'].dropna().unique()) if 'Sector' in fa_data.columns else []
+selected_sectors = st.sidebar.multiselect("Filter by sector", sectors)
+if selected_sectors:
+    in_sectors = set(fa_data.loc[fa_data['Sector'].isin(selected_sectors), 'Symbol'])
+    options = [s for s in symbols if s in in_sectors]
+else:
+    options = symbols
+st.sidebar.caption(f"{len(options)} of {len(symbols)} {UNIVERSE.name} stocks")
+
+# Multi-select for comparison; the screener page can replace the selection
+# through its session state key
+if 'selected_stocks' not in st.session_state:
+    st.session_state['selected_stocks'] = options[:2]
+options = options + [s for s in st.session_state['selected_stocks'] if s not in options]
+selected_stocks = st.multiselect(
+    "Select stocks to compare", options, key='selected_stocks', max_selections=MAX_SELECTIONS
+)
+
+# One poller per server process refreshes the whole universe into a shared
+# snapshot; symbols outside the universe fall back to the per-symbol cache
+@st.cache_resource
+def get_quote_poller():
+    universe_symbols = quotes.universe_symbols(fa_data)
+    if INTRADAY == 'stream':
+        return intraday_stream.IntradayStream.live(universe_symbols).start()
+    if INTRADAY.startswith('replay:'):
+        bars = pd.read_parquet(INTRADAY.split(':', 1)[1])
+        return intraday_stream.IntradayStream(intraday_stream.replay(bars, speed=60)).start()
+    return quotes.QuotePoller(universe_symbols, interval=60).start()
+
+@st.cache_resource
+def get_quote_cache():
+    return quotes.QuoteCache(ttl=3600)
 
 # Function to fetch today's open and latest close for a list of symbols
-@st.cache_data(ttl=3600)
 def fetch_intraday_prices(symbols):
-    data = {}
-    for symbol in symbols:
-        try:
-            ticker = yf.Ticker(f"{symbol}.NS")
-            hist = ticker.history(period="1d", interval="1m")
-            if not hist.empty:
-                today_open = hist['Open'][0]
-                latest_close = hist['Close'][-1]
-                data[symbol] = {
-                    'open': today_open,
-                    'close': latest_close,
-                    'return': ((latest_close - today_open) / today_open) * 100
-                }
-            else:
-                data[symbol] = {'open': None, 'close': None, 'return': None}
-        except Exception:
-            data[symbol] = {'open': None, 'close': None, 'return': None}
+    poller = get_quote_poller()
+    poller.set_symbols(quotes.universe_symbols(fa_data))
+    data = poller.snapshot(symbols)
+    missing = [s for s in symbols if s not in data]
+    metrics.cache_lookup('quote_snapshot', True, len(data))
+    metrics.cache_lookup('quote_snapshot', False, len(missing))
+    if missing:
+        data.update(get_quote_cache().get(missing))
     return data
 
+# Rendered HTML and figure JSON shared by all sessions, capped at 64 MB
+@st.cache_resource
+def get_render_cache():
+    return render_cache.RenderCache(max_bytes=64 * 1024 * 1024)
+
 # Function to fetch market news
-@st.cache_data(ttl=3600)  # Cache for 1 hour
 def fetch_market_news():
     """Fetch market news from various sources"""
-    news_data = []
-    
-    try:
-        # Try to fetch news from a free API (using NewsAPI as example)
-        # Note: You'll need to get a free API key from https://newsapi.org/
-        api_key = "demo_key"  # Replace with your actual API key
-        
-        # Keywords for Indian market news
-        keywords = ["Nifty 50", "Sensex", "BSE", "NSE", "Indian stock market", "Indian economy"]
-        
-        for keyword in keywords[:3]:  # Limit to avoid API rate limits
-            try:
-                url = f"https://newsapi.org/v2/everything"
-                params = {
-                    'q': keyword,
-                    'language': 'en',
-                    'sortBy': 'publishedAt',
-                    'pageSize': 5,
-                    'apiKey': api_key
-                }
-                
-                response = requests.get(url, params=params, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'articles' in data:
-                        for article in data['articles']:
-                            news_data.append({
-                                'title': article.get('title', ''),
-                                'description': article.get('description', ''),
-                                'url': article.get('url', ''),
-                                'publishedAt': article.get('publishedAt', ''),
-                                'source': article.get('source', {}).get('name', ''),
-                                'keyword': keyword
-                            })
-            except Exception as e:
-                st.warning(f"Could not fetch news for '{keyword}': {str(e)}")
-                continue
-                
-    except Exception as e:
-        st.warning(f"News API not available: {str(e)}")
+    # Note: You'll need to get a free API key from https://newsapi.org/
+    api_key = "demo_key"  # Replace with your actual API key
+
+    # All keywords are queried in parallel under one overall deadline; a slow
+    # source only loses its own articles. news_feed keeps each keyword's
+    # articles for an hour and a failure for a minute.
+    news_data, news_status = news_feed.fetch_news(news_feed.KEYWORDS[:3], api_key, deadline=8.0)  # Limit to avoid API rate limits
     
     # If no news from API, provide sample market news
     if not news_data:
@@ -138,638 +222,365 @@ def fetch_market_news():
         ]
         news_data = sample_news
     
-    return news_data
+    return news_data, news_status
 
-with tab1:
-    # Filter and clean fundamental data
-    fa_selected = fa_data[fa_data['Symbol'].isin(selected_stocks)].copy()
+def best_selected_row(fa_selected, metric):
+    # Best selected stock for a metric via the precomputed universe ranks
+    best = aggregates.best_symbol(fa_aggregates['ranks'], metric, fa_selected['Symbol'])
+    return None if best is None else fa_selected[fa_selected['Symbol'] == best].iloc[0]
+
+# Each section below is a fragment: it only runs when it is the visible one,
+# and widgets inside it rerun just that section instead of the whole script.
+# Rendered HTML and figures are cached per (selection, fundamentals version,
+# intraday prices) in render_key; the table stylers take it as their data
+# version, so their cell styles are never recomputed from a frame hash.
+
+@st.fragment
+def key_metrics_section(fa_selected, render_key):
+    render = get_render_cache()
+    st.subheader("🎯 Key Performance Indicators")
+    key_metrics = ['Market Cap (₹100 Cr)', 'P/E Ratio', 'EPS', 'ROE (%)', 'Profit Margin (%)', 'ROA (%)', 'Debt/Equity', 'Return (%)']
+    available_key_metrics = [col for col in key_metrics if col in fa_selected.columns]
+    if available_key_metrics:
+        metric_cols = st.columns(len(available_key_metrics))
+        for i, metric in enumerate(available_key_metrics):
+            with metric_cols[i]:
+                st.markdown(render.get_or_render(('kpi', metric) + render_key, lambda: cards.kpi_card_html(fa_selected, metric, fa_aggregates['ranks'])), unsafe_allow_html=True)
+        
+        # Add comparison chart
+        st.subheader("📊 Metric Comparison Chart")
+        if len(available_key_metrics) > 1:
+            # Create comparison chart
+            fig = render.figure(('key_metrics_chart',) + render_key, lambda: charts.key_metrics_chart(fa_selected, available_key_metrics[:3]))  # Limit to 3 metrics for clarity
+            st.plotly_chart(fig, use_container_width=True)
+
+@st.fragment
+def valuation_section(fa_selected, render_key):
+    render = get_render_cache()
+    st.subheader("💰 Valuation Analysis")
     
-    if not fa_selected.empty:
-        st.subheader("📊 Fundamental Analysis Dashboard")
-        # Fetch intraday prices and returns for selected stocks
-        price_data = fetch_intraday_prices(fa_selected['Symbol'].tolist())
-        fa_selected['Today Open'] = fa_selected['Symbol'].map(lambda s: price_data[s]['open'])
-        fa_selected['Current Close'] = fa_selected['Symbol'].map(lambda s: price_data[s]['close'])
-        fa_selected['Return (%)'] = fa_selected['Symbol'].map(lambda s: price_data[s]['return'])
-        # Clean numeric columns - replace inf values and handle missing data
-        numeric_columns = fa_selected.select_dtypes(include=[np.number]).columns
-        for col in numeric_columns:
-            fa_selected[col] = pd.to_numeric(fa_selected[col], errors='coerce')
-            fa_selected[col] = fa_selected[col].replace([np.inf, -np.inf], np.nan)
-        # --- SUMMARY SECTION: Best Performing Stock by Return ---
-        st.markdown("""
-        <div style='padding: 18px 0 10px 0; text-align: center;'>
-            <span style='font-size: 2.2rem; font-weight: bold; color: #007bff;'>🏅 Best Performing Stock (Today)</span>
-        </div>
-        """, unsafe_allow_html=True)
-        if 'Return (%)' in fa_selected.columns and fa_selected['Return (%)'].notna().any():
-            best_idx = fa_selected['Return (%)'].idxmax()
-            best_row = fa_selected.loc[best_idx]
-            best_symbol = best_row['Symbol']
-            best_company = best_row['Company']
-            today_open = best_row['Today Open']
-            current_close = best_row['Current Close']
-            best_return = best_row['Return (%)']
-            st.markdown(f"""
-            <div style='display: flex; justify-content: center; align-items: center; gap: 30px; margin-bottom: 10px;'>
-                <div style='background: linear-gradient(135deg, #e0eafc 0%, #cfdef3 100%); border-radius: 16px; padding: 24px 36px; box-shadow: 0 4px 16px rgba(0,0,0,0.08);'>
-                    <span style='font-size: 1.5rem; font-weight: bold; color: #222;'>🏆 {best_company}</span><br>
-                    <span style='font-size: 1.1rem; color: #555;'>({best_symbol})</span><br>
-                    <span style='font-size: 1.15rem; color: #555;'>Open: {f'₹{today_open:,.2f}' if today_open else 'N/A'}</span><br>
-                    <span style='font-size: 1.3rem; color: #28a745; font-weight: bold;'>
-                        Close: {f'₹{current_close:,.2f}' if current_close else 'N/A'}
-                    </span><br>
-                    <span style='font-size: 1.2rem; color: #007bff; font-weight: bold;'>
-                        Return: {f'{best_return:.2f}%' if best_return else 'N/A'}
-                    </span>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        # --- KPI TABS ---
-        fa_tab1, fa_tab2, fa_tab3, fa_tab4 = st.tabs(["📈 Key Metrics", "💰 Valuation", "📊 Financial Health", "🏭 Sector Analysis"])
+    # Valuation metrics
+    valuation_metrics = ['P/E Ratio', 'Forward P/E', 'PEG Ratio', 'P/B Ratio', 'Dividend Yield (%)']
+    available_valuation = [col for col in valuation_metrics if col in fa_selected.columns]
+    
+    if available_valuation:
+        # Create valuation table with enhanced styling
+        valuation_data = fa_selected[['Company'] + available_valuation].set_index('Company')
         
-        with fa_tab1:
-            st.subheader("🎯 Key Performance Indicators")
-            key_metrics = ['Market Cap (₹100 Cr)', 'P/E Ratio', 'EPS', 'ROE (%)', 'Profit Margin (%)', 'ROA (%)', 'Debt/Equity', 'Return (%)']
-            available_key_metrics = [col for col in key_metrics if col in fa_selected.columns]
-            if available_key_metrics:
-                metric_cols = st.columns(len(available_key_metrics))
-                for i, metric in enumerate(available_key_metrics):
-                    with metric_cols[i]:
-                        # Only proceed if there are non-NA values
-                        if fa_selected[metric].notna().any():
-                            if metric == 'Return (%)':
-                                best_idx = fa_selected[metric].idxmax()
-                            elif 'Market Cap' in metric or 'EPS' in metric or 'ROE' in metric or 'Profit Margin' in metric or 'ROA' in metric:
-                                best_idx = fa_selected[metric].idxmax()
-                            else:
-                                best_idx = fa_selected[metric].idxmin()
-                            best_row = fa_selected.loc[best_idx]
-                            best_symbol = best_row['Symbol']
-                            best_company = best_row['Company']
-                            best_value = best_row[metric]
-                            current_close = best_row['Current Close'] if 'Current Close' in best_row else None
-                            # Color coding and status
-                            if metric == 'Return (%)':
-                                color = "#007bff"; status = "Top Gainer"
-                            elif 'Market Cap' in metric:
-                                if best_value > 500:
-                                    color = "#28a745"; status = "Large Cap"
-                                elif best_value > 200:
-                                    color = "#ffc107"; status = "Mid Cap"
-                                else:
-                                    color = "#dc3545"; status = "Small Cap"
-                            elif 'P/E Ratio' in metric:
-                                if best_value < 15:
-                                    color = "#28a745"; status = "Undervalued"
-                                elif best_value < 25:
-                                    color = "#ffc107"; status = "Fair Value"
-                                else:
-                                    color = "#dc3545"; status = "Overvalued"
-                            elif 'ROE' in metric:
-                                if best_value > 20:
-                                    color = "#28a745"; status = "Excellent"
-                                elif best_value > 10:
-                                    color = "#ffc107"; status = "Good"
-                                else:
-                                    color = "#dc3545"; status = "Poor"
-                            else:
-                                color = "#007bff"; status = "Normal"
-                            st.markdown(f"""
-                            <div style="
-                                border: 2px solid {color};
-                                border-radius: 14px;
-                                padding: 18px 10px 14px 10px;
-                                text-align: center;
-                                background: linear-gradient(135deg, #f8f9fa 0%, #ffffff 100%);
-                                box-shadow: 0 4px 15px rgba(0,0,0,0.08);
-                                margin-bottom: 10px;
-                            ">
-                                <div style='font-size: 1.2rem; font-weight: bold; color: #2c3e50; margin-bottom: 6px;'>{metric}</div>
-                                <div style='font-size: 2.1rem; font-weight: bold; color: {color}; margin: 8px 0 2px 0;'>
-                                    {best_value:.2f}
-                                </div>
-                                <div style='font-size: 1.1rem; color: #222; font-weight: 600; margin-bottom: 2px;'>
-                                    <span style='color: #007bff;'>🏢 {best_company}</span>
-                                </div>
-                                <div style='font-size: 1.05rem; color: #555; margin-bottom: 2px;'>({best_symbol})</div>
-                                <div style='font-size: 1.15rem; color: #28a745; font-weight: bold; margin-bottom: 2px;'>
-                                    {f'₹{current_close:,.2f}' if current_close else 'Price N/A'}
-                                </div>
-                                <div style="
-                                    background-color: {color};
-                                    color: white;
-                                    padding: 4px 8px;
-                                    border-radius: 12px;
-                                    font-size: 13px;
-                                    font-weight: bold;
-                                    margin-top: 8px;
-                                    display: inline-block;
-                                ">{status}</div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        else:
-                            st.markdown(f"<div style='color:#dc3545; font-weight:bold; text-align:center; margin:10px 0;'>No data for {metric}</div>", unsafe_allow_html=True)
-                
-                # Add comparison chart
-                st.subheader("📊 Metric Comparison Chart")
-                if len(available_key_metrics) > 1:
-                    # Create comparison chart
-                    fig = go.Figure()
-                    
-                    for metric in available_key_metrics[:3]:  # Limit to 3 metrics for clarity
-                        values = fa_selected[metric].values
-                        companies = fa_selected['Company'].values
-                        
-                        fig.add_trace(go.Bar(
-                            name=metric,
-                            x=companies,
-                            y=values,
-                            text=[f'{v:.2f}' for v in values],
-                            textposition='auto',
-                        ))
-                    
-                    fig.update_layout(
-                        title=f"Comparison of Key Metrics",
-                        xaxis_title="Companies",
-                        yaxis_title="Values",
-                        barmode='group',
-                        height=500,
-                        showlegend=True
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+        valuation_html = render.get_or_render(('valuation_table',) + render_key, lambda: tables.style_valuation_table(valuation_data, version=render_key).to_html())
         
-        with fa_tab2:
-            st.subheader("💰 Valuation Analysis")
-            
-            # Valuation metrics
-            valuation_metrics = ['P/E Ratio', 'Forward P/E', 'PEG Ratio', 'P/B Ratio', 'Dividend Yield (%)']
-            available_valuation = [col for col in valuation_metrics if col in fa_selected.columns]
-            
-            if available_valuation:
-                # Create valuation table with enhanced styling
-                valuation_data = fa_selected[['Company'] + available_valuation].set_index('Company')
-                
-                def style_valuation(val, col):
-                    if pd.isna(val):
-                        return 'background-color: #f8f9fa; color: #6c757d; font-style: italic;'
-                    
-                    if isinstance(val, (int, float)):
-                        if 'P/E Ratio' in col or 'Forward P/E' in col:
-                            if val < 15:
-                                return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                            elif val < 25:
-                                return 'background-color: #fff3cd; color: #856404;'
-                            else:
-                                return 'background-color: #f8d7da; color: #721c24;'
-                        elif 'PEG Ratio' in col:
-                            if val < 1:
-                                return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                            elif val < 2:
-                                return 'background-color: #fff3cd; color: #856404;'
-                            else:
-                                return 'background-color: #f8d7da; color: #721c24;'
-                        elif 'P/B Ratio' in col:
-                            if val < 1:
-                                return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                            elif val < 3:
-                                return 'background-color: #fff3cd; color: #856404;'
-                            else:
-                                return 'background-color: #f8d7da; color: #721c24;'
-                        elif 'Dividend Yield' in col:
-                            if val > 5:
-                                return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                            elif val > 2:
-                                return 'background-color: #fff3cd; color: #856404;'
-                            else:
-                                return 'background-color: #f8d7da; color: #721c24;'
-                    return ''
-                
-                styled_valuation = valuation_data.style.apply(
-                    lambda x: [style_valuation(val, col) for val, col in zip(x, x.index)], axis=1
-                ).set_properties(**{
-                    'border': '1px solid #dee2e6',
-                    'border-radius': '8px',
-                    'padding': '12px',
-                    'text-align': 'center',
-                    'font-family': 'Arial, sans-serif',
-                    'font-size': '14px'
-                }).set_table_styles([
-                    {'selector': 'th', 'props': [
-                        ('background-color', '#343a40'),
-                        ('color', 'white'),
-                        ('font-weight', 'bold'),
-                        ('text-align', 'center'),
-                        ('padding', '15px'),
-                        ('border', '1px solid #dee2e6')
-                    ]},
-                    {'selector': 'td', 'props': [
-                        ('border', '1px solid #dee2e6'),
-                        ('padding', '12px'),
-                        ('text-align', 'center')
-                    ]}
-                ]).format('{:.2f}')
-                
-                st.write(styled_valuation)
-                
-                # Valuation insights
-                st.subheader("💡 Valuation Insights")
-                insight_col1, insight_col2, insight_col3 = st.columns(3)
-                
-                with insight_col1:
-                    if 'P/E Ratio' in available_valuation:
-                        min_pe = valuation_data['P/E Ratio'].min()
-                        min_pe_company = valuation_data['P/E Ratio'].idxmin()
-                        st.metric(
-                            label="💰 Most Undervalued (P/E)",
-                            value=f"{min_pe:.2f}",
-                            delta=f"{min_pe_company}"
-                        )
-                
-                with insight_col2:
-                    if 'PEG Ratio' in available_valuation:
-                        min_peg = valuation_data['PEG Ratio'].min()
-                        min_peg_company = valuation_data['PEG Ratio'].idxmin()
-                        st.metric(
-                            label="📈 Best Growth Value (PEG)",
-                            value=f"{min_peg:.2f}",
-                            delta=f"{min_peg_company}"
-                        )
-                
-                with insight_col3:
-                    if 'Dividend Yield (%)' in available_valuation:
-                        max_div = valuation_data['Dividend Yield (%)'].max()
-                        max_div_company = valuation_data['Dividend Yield (%)'].idxmax()
-                        st.metric(
-                            label="💵 Highest Dividend Yield",
-                            value=f"{max_div:.2f}%",
-                            delta=f"{max_div_company}"
-                        )
+        st.markdown(valuation_html, unsafe_allow_html=True)
         
-        with fa_tab3:
-            st.subheader("📊 Financial Health Analysis")
-            
-            # Financial health metrics
-            health_metrics = ['ROE (%)', 'ROA (%)', 'Profit Margin (%)', 'Operating Margin (%)', 'Debt/Equity', 'Current Ratio', 'Quick Ratio']
-            available_health = [col for col in health_metrics if col in fa_selected.columns]
-            
-            if available_health:
-                # Create financial health radar chart
-                if len(available_health) >= 3:
-                    fig = go.Figure()
-                    
-                    for idx, company in enumerate(fa_selected['Company']):
-                        values = []
-                        for metric in available_health[:5]:  # Limit to 5 metrics for radar chart
-                            val = fa_selected[fa_selected['Company'] == company][metric].iloc[0]
-                            if pd.notna(val):
-                                values.append(val)
-                            else:
-                                values.append(0)
-                        
-                        fig.add_trace(go.Scatterpolar(
-                            r=values,
-                            theta=available_health[:5],
-                            fill='toself',
-                            name=company,
-                            line_color=f'rgb({50 + idx*50}, {100 + idx*30}, {150 + idx*20})'
-                        ))
-                    
-                    fig.update_layout(
-                        polar=dict(
-                            radialaxis=dict(
-                                visible=True,
-                                range=[0, max([fa_selected[col].max() for col in available_health[:5] if fa_selected[col].max() > 0])]
-                            )),
-                        showlegend=True,
-                        title="Financial Health Radar Chart",
-                        height=500
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                # Financial health table
-                health_data = fa_selected[['Company'] + available_health].set_index('Company')
-                
-                def style_health(val, col):
-                    if pd.isna(val):
-                        return 'background-color: #f8f9fa; color: #6c757d; font-style: italic;'
-                    
-                    if isinstance(val, (int, float)):
-                        if 'ROE' in col or 'ROA' in col or 'Profit Margin' in col or 'Operating Margin' in col:
-                            if val > 20:
-                                return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                            elif val > 10:
-                                return 'background-color: #fff3cd; color: #856404;'
-                            else:
-                                return 'background-color: #f8d7da; color: #721c24;'
-                        elif 'Debt/Equity' in col:
-                            if val < 0.5:
-                                return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                            elif val < 1:
-                                return 'background-color: #fff3cd; color: #856404;'
-                            else:
-                                return 'background-color: #f8d7da; color: #721c24;'
-                        elif 'Current Ratio' in col or 'Quick Ratio' in col:
-                            if val > 2:
-                                return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                            elif val > 1:
-                                return 'background-color: #fff3cd; color: #856404;'
-                            else:
-                                return 'background-color: #f8d7da; color: #721c24;'
-                    return ''
-                
-                styled_health = health_data.style.apply(
-                    lambda x: [style_health(val, col) for val, col in zip(x, x.index)], axis=1
-                ).set_properties(**{
-                    'border': '1px solid #dee2e6',
-                    'border-radius': '8px',
-                    'padding': '12px',
-                    'text-align': 'center',
-                    'font-family': 'Arial, sans-serif',
-                    'font-size': '14px'
-                }).set_table_styles([
-                    {'selector': 'th', 'props': [
-                        ('background-color', '#343a40'),
-                        ('color', 'white'),
-                        ('font-weight', 'bold'),
-                        ('text-align', 'center'),
-                        ('padding', '15px'),
-                        ('border', '1px solid #dee2e6')
-                    ]},
-                    {'selector': 'td', 'props': [
-                        ('border', '1px solid #dee2e6'),
-                        ('padding', '12px'),
-                        ('text-align', 'center')
-                    ]}
-                ]).format('{:.2f}')
-                
-                st.write(styled_health)
+        # Valuation insights
+        st.subheader("💡 Valuation Insights")
+        insight_col1, insight_col2, insight_col3 = st.columns(3)
         
-        with fa_tab4:
-            st.subheader("🏭 Sector Analysis")
-            
-            if 'Sector' in fa_selected.columns:
-                # Sector distribution
-                sector_counts = fa_selected['Sector'].value_counts()
-                
-                # Create sector pie chart
-                fig = go.Figure(data=[go.Pie(
-                    labels=sector_counts.index,
-                    values=sector_counts.values,
-                    hole=0.3,
-                    marker_colors=['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7', '#DDA0DD', '#98D8C8']
-                )])
-                
-                fig.update_layout(
-                    title="Sector Distribution",
-                    height=400,
-                    showlegend=True
+        with insight_col1:
+            best = best_selected_row(fa_selected, 'P/E Ratio') if 'P/E Ratio' in available_valuation else None
+            if best is not None:
+                st.metric(
+                    label="💰 Most Undervalued (P/E)",
+                    value=f"{best['P/E Ratio']:.2f}",
+                    delta=f"{best['Company']}"
                 )
-                st.plotly_chart(fig, use_container_width=True)
-                
-                # Sector performance comparison
-                st.subheader("📈 Sector Performance Comparison")
-                
-                # Calculate average metrics by sector
-                sector_metrics = ['Market Cap (₹100 Cr)', 'P/E Ratio', 'ROE (%)', 'Profit Margin (%)']
-                available_sector_metrics = [col for col in sector_metrics if col in fa_selected.columns]
-                
-                if available_sector_metrics:
-                    sector_avg = fa_selected.groupby('Sector')[available_sector_metrics].mean()
-                    
-                    # Create sector comparison chart
-                    fig = go.Figure()
-                    
-                    for metric in available_sector_metrics:
-                        fig.add_trace(go.Bar(
-                            name=metric,
-                            x=sector_avg.index,
-                            y=sector_avg[metric],
-                            text=[f'{v:.2f}' for v in sector_avg[metric]],
-                            textposition='auto',
-                        ))
-                    
-                    fig.update_layout(
-                        title="Average Metrics by Sector",
-                        xaxis_title="Sectors",
-                        yaxis_title="Average Values",
-                        barmode='group',
-                        height=500,
-                        showlegend=True
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                    
-                    # Sector insights
-                    st.subheader("💡 Sector Insights")
-                    
-                    # Find best performing sector for each metric
-                    for metric in available_sector_metrics:
-                        if sector_avg[metric].notna().any():
-                            if 'Market Cap' in metric or 'ROE' in metric or 'Profit Margin' in metric:
-                                best_sector = sector_avg[metric].idxmax()
-                                best_value = sector_avg[metric].max()
-                            else:  # For P/E, lower is better
-                                best_sector = sector_avg[metric].idxmin()
-                                best_value = sector_avg[metric].min()
-                            st.info(f"🏆 **{metric}**: {best_sector} leads with {best_value:.2f}")
-                        else:
-                            st.info(f"No data for {metric}")
         
-        # Original comprehensive table (moved to bottom)
-        st.subheader("📋 Comprehensive Fundamental Data")
+        with insight_col2:
+            best = best_selected_row(fa_selected, 'PEG Ratio') if 'PEG Ratio' in available_valuation else None
+            if best is not None:
+                st.metric(
+                    label="📈 Best Growth Value (PEG)",
+                    value=f"{best['PEG Ratio']:.2f}",
+                    delta=f"{best['Company']}"
+                )
         
-        # Dynamic column selection
-        all_columns = [col for col in fa_selected.columns if col not in ['Symbol', 'Company']]
-        default_cols = ['Market Cap (₹100 Cr)', 'P/E Ratio', 'EPS', 'ROE (%)', 'Profit Margin (%)', 'Sector']
+        with insight_col3:
+            best = best_selected_row(fa_selected, 'Dividend Yield (%)') if 'Dividend Yield (%)' in available_valuation else None
+            if best is not None:
+                st.metric(
+                    label="💵 Highest Dividend Yield",
+                    value=f"{best['Dividend Yield (%)']:.2f}%",
+                    delta=f"{best['Company']}"
+                )
+
+@st.fragment
+def health_section(fa_selected, render_key):
+    render = get_render_cache()
+    st.subheader("📊 Financial Health Analysis")
+    
+    # Financial health metrics
+    health_metrics = ['ROE (%)', 'ROA (%)', 'Profit Margin (%)', 'Operating Margin (%)', 'Debt/Equity', 'Current Ratio', 'Quick Ratio']
+    available_health = [col for col in health_metrics if col in fa_selected.columns]
+    
+    if available_health:
+        # Create financial health radar chart
+        if len(available_health) >= 3:
+            fig = render.figure(('health_radar_chart',) + render_key, lambda: charts.health_radar_chart(fa_selected, available_health[:5]))  # Limit to 5 metrics for radar chart
+            st.plotly_chart(fig, use_container_width=True)
         
-        # Filter available columns
-        available_cols = [col for col in default_cols if col in fa_selected.columns]
-        selected_cols = st.multiselect(
-            "🎯 Select metrics to compare", 
-            ['Company'] + all_columns, 
-            default=['Company'] + available_cols
-        )
+        # Financial health table
+        health_data = fa_selected[['Company'] + available_health].set_index('Company')
         
-        if selected_cols:
-            # Only set index if 'Company' is in the selected columns
-            if 'Company' in selected_cols:
-                fa_display = fa_selected[selected_cols].set_index('Company')
-            else:
-                fa_display = fa_selected[selected_cols]
-                st.warning("'Company' column is not selected. Table will not be indexed by company name.")
-            
-            # Format numeric columns for better display with colors
-            numeric_cols = fa_display.select_dtypes(include=[np.number]).columns
-            formatted_display = fa_display.copy()
-            
-            # Create a styled DataFrame with colors
-            def style_fundamental_data(val, col):
-                if pd.isna(val):
-                    return 'background-color: #f8f9fa; color: #6c757d; font-style: italic;'
-                
-                if isinstance(val, (int, float)):
-                    # Color coding based on column type
-                    if 'Market Cap' in col:
-                        if val > 500:
-                            return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                        elif val > 200:
-                            return 'background-color: #fff3cd; color: #856404;'
-                        else:
-                            return 'background-color: #f8d7da; color: #721c24;'
-                    
-                    elif 'P/E Ratio' in col:
-                        if val < 15:
-                            return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                        elif val < 25:
-                            return 'background-color: #fff3cd; color: #856404;'
-                        else:
-                            return 'background-color: #f8d7da; color: #721c24;'
-                    
-                    elif 'ROE' in col:
-                        if val > 20:
-                            return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                        elif val > 10:
-                            return 'background-color: #fff3cd; color: #856404;'
-                        else:
-                            return 'background-color: #f8d7da; color: #721c24;'
-                    
-                    elif 'Profit Margin' in col:
-                        if val > 15:
-                            return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                        elif val > 5:
-                            return 'background-color: #fff3cd; color: #856404;'
-                        else:
-                            return 'background-color: #f8d7da; color: #721c24;'
-                    
-                    elif 'EPS' in col:
-                        if val > 50:
-                            return 'background-color: #d4edda; color: #155724; font-weight: bold;'
-                        elif val > 20:
-                            return 'background-color: #fff3cd; color: #856404;'
-                        else:
-                            return 'background-color: #f8d7da; color: #721c24;'
-                    
-                    else:
-                        return 'background-color: #e9ecef; color: #495057;'
-                
-                return ''
-            
-            # Apply styling
-            styled_df = fa_display.style.apply(lambda x: [style_fundamental_data(val, col) for val, col in zip(x, x.index)], axis=1)
-            
-            # Format values with proper formatting
-            for col in numeric_cols:
-                if 'Market Cap' in col:
-                    styled_df = styled_df.format({col: '{:,.2f}'})
-                elif 'Ratio' in col or 'Yield' in col or 'Margin' in col or 'ROE' in col or 'ROA' in col:
-                    styled_df = styled_df.format({col: '{:.2f}'})
-                elif 'EPS' in col:
-                    styled_df = styled_df.format({col: '{:.2f}'})
-                else:
-                    styled_df = styled_df.format({col: '{:.2f}'})
-            
-            # Add hover effects and better table styling
-            styled_df = styled_df.set_properties(**{
-                'border': '1px solid #dee2e6',
-                'border-radius': '8px',
-                'padding': '12px',
-                'text-align': 'center',
-                'font-family': 'Arial, sans-serif',
-                'font-size': '14px'
-            }).set_table_styles([
-                {'selector': 'th', 'props': [
-                    ('background-color', '#343a40'),
-                    ('color', 'white'),
-                    ('font-weight', 'bold'),
-                    ('text-align', 'center'),
-                    ('padding', '15px'),
-                    ('border', '1px solid #dee2e6'),
-                    ('border-radius', '8px 8px 0 0')
-                ]},
-                {'selector': 'td', 'props': [
-                    ('border', '1px solid #dee2e6'),
-                    ('padding', '12px'),
-                    ('text-align', 'center')
-                ]},
-                {'selector': 'tr:nth-child(even)', 'props': [
-                    ('background-color', '#f8f9fa')
-                ]},
-                {'selector': 'tr:hover', 'props': [
-                    ('background-color', '#e3f2fd'),
-                    ('transform', 'scale(1.02)'),
-                    ('transition', 'all 0.3s ease')
-                ]}
-            ])
-            
-            # Display the styled table
-            st.write(styled_df)
-            
-            # Add color legend
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.markdown("""
-                <div style="background-color: #d4edda; padding: 10px; border-radius: 5px; margin: 10px 0;">
-                    <strong>🟢 Excellent</strong><br>
-                    Above average performance
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown("""
-                <div style="background-color: #fff3cd; padding: 10px; border-radius: 5px; margin: 10px 0;">
-                    <strong>🟡 Good</strong><br>
-                    Average performance
-                </div>
-                """, unsafe_allow_html=True)
+        health_html = render.get_or_render(('health_table',) + render_key, lambda: tables.style_health_table(health_data, version=render_key).to_html())
+        
+        st.markdown(health_html, unsafe_allow_html=True)
+
+@st.fragment
+def sector_section(fa_selected, render_key):
+    render = get_render_cache()
+    st.subheader("🏭 Sector Analysis")
+    
+    if 'Sector' in fa_selected.columns:
+        # Sector distribution
+        sector_counts = fa_selected['Sector'].value_counts()
+        
+        # Create sector pie chart
+        fig = render.figure(('sector_pie_chart',) + render_key, lambda: charts.sector_pie_chart(sector_counts))
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Sector performance comparison
+        st.subheader("📈 Sector Performance Comparison")
+        
+        # Calculate average metrics by sector
+        sector_metrics = ['Market Cap (₹100 Cr)', 'P/E Ratio', 'ROE (%)', 'Profit Margin (%)']
+        available_sector_metrics = [col for col in sector_metrics if col in fa_selected.columns]
+        
+        if available_sector_metrics:
+            # Precomputed universe-wide averages for the sectors in the selection
+            sector_avg = aggregates.group_table(
+                fa_aggregates['sector'], 'Sector', available_sector_metrics,
+                members=fa_selected['Sector'].dropna().unique()
+            )
+            st.caption("Sector averages cover every constituent of the sector, not only the selected stocks.")
             
-            with col3:
-                st.markdown("""
-                <div style="background-color: #f8d7da; padding: 10px; border-radius: 5px; margin: 10px 0;">
-                    <strong>🔴 Needs Attention</strong><br>
-                    Below average performance
-                </div>
-                """, unsafe_allow_html=True)
+            # Create sector comparison chart
+            fig = render.figure(('sector_metrics_chart',) + render_key, lambda: charts.sector_metrics_chart(sector_avg, available_sector_metrics))
+            st.plotly_chart(fig, use_container_width=True)
             
-            # Add insights
-            st.subheader("💡 Key Insights")
-            insights_col1, insights_col2 = st.columns(2)
+            # Sector insights
+            st.subheader("💡 Sector Insights")
             
-            with insights_col1:
-                if 'Market Cap (₹100 Cr)' in numeric_cols and fa_display['Market Cap (₹100 Cr)'].notna().any():
-                    max_market_cap = fa_display['Market Cap (₹100 Cr)'].max()
-                    max_company = fa_display['Market Cap (₹100 Cr)'].idxmax()
-                    st.metric(
-                        label="🏆 Highest Market Cap",
-                        value=f"₹{max_market_cap:,.2f} Cr",
-                        delta=f"{max_company}"
-                    )
+            # Find best performing sector for each metric
+            for metric in available_sector_metrics:
+                if sector_avg[metric].notna().any():
+                    if 'Market Cap' in metric or 'ROE' in metric or 'Profit Margin' in metric:
+                        best_sector = sector_avg[metric].idxmax()
+                        best_value = sector_avg[metric].max()
+                    else:  # For P/E, lower is better
+                        best_sector = sector_avg[metric].idxmin()
+                        best_value = sector_avg[metric].min()
+                    st.info(f"🏆 **{metric}**: {best_sector} leads with {best_value:.2f}")
                 else:
-                    st.info("No data for Market Cap")
-            
-            with insights_col2:
-                if 'P/E Ratio' in numeric_cols:
-                    min_pe = fa_display['P/E Ratio'].min()
-                    min_pe_company = fa_display['P/E Ratio'].idxmin()
-                    st.metric(
-                        label="💰 Lowest P/E Ratio",
-                        value=f"{min_pe:.2f}",
-                        delta=f"{min_pe_company}"
-                    )
+                    st.info(f"No data for {metric}")
+
+@st.fragment
+def comprehensive_section(fa_selected, render_key):
+    render = get_render_cache()
+    st.subheader("📋 Comprehensive Fundamental Data")
+    
+    # Dynamic column selection
+    all_columns = [col for col in fa_selected.columns if col not in ['Symbol', 'Company']]
+    default_cols = ['Market Cap (₹100 Cr)', 'P/E Ratio', 'EPS', 'ROE (%)', 'Profit Margin (%)', 'Sector']
+    
+    # Filter available columns
+    available_cols = [col for col in default_cols if col in fa_selected.columns]
+    selected_cols = st.multiselect(
+        "🎯 Select metrics to compare", 
+        ['Company'] + all_columns, 
+        default=['Company'] + available_cols
+    )
+    
+    if selected_cols:
+        # Only set index if 'Company' is in the selected columns
+        if 'Company' in selected_cols:
+            fa_display = fa_selected[selected_cols].set_index('Company')
         else:
-            st.info("📋 Please select at least one metric to display.")
+            fa_display = fa_selected[selected_cols]
+            st.warning("'Company' column is not selected. Table will not be indexed by company name.")
+        
+        # Format numeric columns for better display with colors
+        numeric_cols = fa_display.select_dtypes(include=[np.number]).columns
+        formatted_display = fa_display.copy()
+        
+        table_html = render.get_or_render(('fundamental_table', tuple(selected_cols)) + render_key, lambda: tables.style_fundamental_table(fa_display, numeric_cols, version=render_key).to_html())
+        
+        # Display the styled table
+        st.markdown(table_html, unsafe_allow_html=True)
+        
+        # Add color legend
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.markdown("""
+            <div style="background-color: #d4edda; padding: 10px; border-radius: 5px; margin: 10px 0;">
+                <strong>🟢 Excellent</strong><br>
+                Above average performance
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown("""
+            <div style="background-color: #fff3cd; padding: 10px; border-radius: 5px; margin: 10px 0;">
+                <strong>🟡 Good</strong><br>
+                Average performance
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col3:
+            st.markdown("""
+            <div style="background-color: #f8d7da; padding: 10px; border-radius: 5px; margin: 10px 0;">
+                <strong>🔴 Needs Attention</strong><br>
+                Below average performance
+            </div>
+            """, unsafe_allow_html=True)
+        
+        # Add insights
+        st.subheader("💡 Key Insights")
+        insights_col1, insights_col2 = st.columns(2)
+        
+        with insights_col1:
+            if 'Market Cap (₹100 Cr)' in numeric_cols and fa_display['Market Cap (₹100 Cr)'].notna().any():
+                max_market_cap = fa_display['Market Cap (₹100 Cr)'].max()
+                max_company = fa_display['Market Cap (₹100 Cr)'].idxmax()
+                st.metric(
+                    label="🏆 Highest Market Cap",
+                    value=f"₹{max_market_cap:,.2f} Cr",
+                    delta=f"{max_company}"
+                )
+            else:
+                st.info("No data for Market Cap")
+        
+        with insights_col2:
+            if 'P/E Ratio' in numeric_cols:
+                min_pe = fa_display['P/E Ratio'].min()
+                min_pe_company = fa_display['P/E Ratio'].idxmin()
+                st.metric(
+                    label="💰 Lowest P/E Ratio",
+                    value=f"{min_pe:.2f}",
+                    delta=f"{min_pe_company}"
+                )
     else:
+        st.info("📋 Please select at least one metric to display.")
+
+# Change log of every fundamentals publish; keyed on the history's files so a
+# new publish shows up on the next rerun
+@metrics.track_cache('fundamentals_trend')
+@st.cache_data(max_entries=32)
+def fundamentals_trend(history_version, metric, symbols):
+    metrics.cache_miss()
+    with metrics.timer('data_load_seconds', dataset='fundamentals_history'):
+        return fundamentals_history.series(metric, list(symbols))
+
+@st.fragment
+def trends_section(fa_selected, render_key):
+    render = get_render_cache()
+    st.subheader("📈 Fundamentals Over Time")
+    live_columns = ['Today Open', 'Current Close', 'Return (%)']
+    trend_metrics = [col for col in fa_selected.select_dtypes(include=[np.number]).columns if col not in live_columns]
+    if not trend_metrics:
+        return
+    metric = st.selectbox("Metric", trend_metrics, index=trend_metrics.index('P/E Ratio') if 'P/E Ratio' in trend_metrics else 0,
+                          key='trend_metric')
+    history_version = fundamentals_history.version()
+    trend = fundamentals_trend(history_version, metric, tuple(fa_selected['Symbol']))
+    if trend.empty:
+        st.info("📋 No fundamentals history recorded yet; it grows every time fundamental_analysis.py publishes.")
+        return
+    trend = trend.rename(columns=fa_selected.set_index('Symbol')['Company'].to_dict())
+    fig = render.figure(('fundamentals_trend', metric, history_version[-1:]) + render_key,
+                        lambda: charts.time_series_chart(trend, f"{metric} Over Time", metric, step=True))
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Values as recorded on {len(trend)} day(s) with changes, {trend.index[0].date()} to {trend.index[-1].date()}.")
+
+FA_SECTIONS = {
+    "📈 Key Metrics": key_metrics_section,
+    "💰 Valuation": valuation_section,
+    "📊 Financial Health": health_section,
+    "🏭 Sector Analysis": sector_section,
+    "📋 Comprehensive Data": comprehensive_section,
+    "📈 Trends": trends_section,
+}
+
+def with_intraday_prices(fa_selected):
+    """Copy of fa_selected with Today Open, Current Close and Return (%) columns"""
+    fa_selected = fa_selected.copy()
+    price_data = fetch_intraday_prices(fa_selected['Symbol'].tolist())
+    fa_selected['Today Open'] = fa_selected['Symbol'].map(lambda s: price_data[s]['open'])
+    fa_selected['Current Close'] = fa_selected['Symbol'].map(lambda s: price_data[s]['close'])
+    fa_selected['Return (%)'] = fa_selected['Symbol'].map(lambda s: price_data[s]['return'])
+    # Clean price columns - fundamentals are already cleaned by load_fundamentals
+    for col in ['Today Open', 'Current Close', 'Return (%)']:
+        fa_selected[col] = pd.to_numeric(fa_selected[col], errors='coerce')
+        fa_selected[col] = fa_selected[col].replace([np.inf, -np.inf], np.nan)
+    return fa_selected
+
+def make_render_key(fa_selected, snap):
+    # The selection order matters for chart traces
+    return (
+        tuple(fa_selected['Symbol']),
+        snap.dataset_version('fundamentals'),
+        tuple(fa_selected[['Today Open', 'Current Close']].itertuples(index=False, name=None)),
+    )
+
+# When streaming, the banner re-reads the stream on its own every few seconds
+# without rerunning the rest of the page
+@st.fragment(run_every=LIVE_REFRESH if STREAMING else None)
+def best_performer_banner(fa_selected, snap):
+    if STREAMING:
+        fa_selected = with_intraday_prices(fa_selected)
+    render = get_render_cache()
+    st.markdown(render.get_or_render(('best',) + make_render_key(fa_selected, snap), lambda: cards.best_performer_html(fa_selected)), unsafe_allow_html=True)
+    if STREAMING:
+        stream = get_quote_poller()
+        leaders = stream.leaderboard(5)
+        if leaders:
+            st.caption("Top movers in the index: " + " · ".join(f"**{s}** {r:+.2f}%" for s, r in leaders))
+        if not stream.alive and not stream.finished:
+            st.warning(f"⚠️ Intraday stream stopped; prices are no longer updating. {stream.last_error or ''}")
+        elif stream.last_error:
+            st.caption(f"⚠️ Last intraday update failed, retrying: {stream.last_error}")
+
+def fundamentals_page(snap):
+    # Filter and clean fundamental data
+    fa_selected = fa_data[fa_data['Symbol'].isin(selected_stocks)]
+    if fa_selected.empty:
         st.warning("⚠️ No fundamental data available for selected stocks.")
+        return
 
-with tab2:
+    st.subheader("📊 Fundamental Analysis Dashboard")
+    # Fetch intraday prices and returns for selected stocks
+    fa_selected = with_intraday_prices(fa_selected)
+    render_key = make_render_key(fa_selected, snap)
+    # --- SUMMARY SECTION: Best Performing Stock by Return ---
+    st.markdown("""
+    <div style='padding: 18px 0 10px 0; text-align: center;'>
+        <span style='font-size: 2.2rem; font-weight: bold; color: #007bff;'>🏅 Best Performing Stock (Today)</span>
+    </div>
+    """, unsafe_allow_html=True)
+    best_performer_banner(fa_selected, snap)
+    # --- KPI SECTIONS: only the selected one is computed ---
+    section = st.segmented_control(
+        "Section", list(FA_SECTIONS), default=next(iter(FA_SECTIONS)), required=True,
+        key='fa_section', label_visibility='collapsed'
+    )
+    with metrics.timer('section_render_seconds', section=section):
+        FA_SECTIONS[section](fa_selected, render_key)
+
+@st.fragment
+def news_page(snap):
     st.subheader("📰 Latest Market News & Updates")
     
     # Add refresh button
     if st.button("🔄 Refresh News"):
-        st.cache_data.clear()
-        st.rerun()
+        news_feed.clear_cache()
+        disk_cache = http_cache.default_cache()
+        if disk_cache is not None:
+            disk_cache.clear('newsapi')
+        st.rerun(scope="fragment")
     
     # Fetch news
-    news_data = fetch_market_news()
+    news_data, news_status = fetch_market_news()
+    failed_sources = [k for k, v in news_status.items() if v != 'ok']
+    if failed_sources:
+        st.warning("Some news sources are unavailable right now: " + ", ".join(failed_sources))
     
     if news_data:
         # Display news in a beautiful format
@@ -885,12 +696,242 @@ with tab2:
     else:
         st.warning("⚠️ Unable to fetch news at the moment. Please try again later.")
 
+# Look-back windows offered on the price history page, relative to the last bar
+HISTORY_RANGES = {
+    "1M": pd.DateOffset(months=1),
+    "6M": pd.DateOffset(months=6),
+    "1Y": pd.DateOffset(years=1),
+    "5Y": pd.DateOffset(years=5),
+    "Max": None,
+}
+# Points per trace sent to the browser; about the plot's width in pixels
+HISTORY_RESOLUTIONS = [500, 1000, 1500, 3000]
+
+# Downsampled on the server, so a 10-year daily or minute history costs the
+# browser only `points` rows per trace. Cached per (symbol, range, resolution,
+# method) and prices_ta version.
+@metrics.track_cache('price_history')
+@st.cache_data(max_entries=128)
+def price_history(version, symbol, range_label, points, method):
+    metrics.cache_miss()
+    with metrics.timer('downsample_seconds', method=method):
+        rows = ta_symbol_rows(version).get(symbol)
+        if rows is None:
+            return None, 0
+        history = ta_data.iloc[rows].drop(columns='Symbol').set_index('Date').sort_index()
+        offset = HISTORY_RANGES[range_label]
+        if offset is not None and not history.empty:
+            history = history[history.index >= history.index[-1] - offset]
+        return downsample.downsample(history, 'Close', points, method), len(history)
+
+@st.fragment
+def price_history_page(snap):
+    st.subheader("📉 Price History & Technical Indicators")
+    if not selected_stocks:
+        st.info("Select at least one stock to chart its price history.")
+        return
+    version = snap.dataset_version('prices_ta')
+    symbol_col, range_col, resolution_col, method_col = st.columns([2, 3, 2, 2])
+    with symbol_col:
+        symbol = st.selectbox("Stock", selected_stocks, key='history_symbol')
+    with range_col:
+        range_label = st.segmented_control("Range", list(HISTORY_RANGES), default="1Y", required=True, key='history_range')
+    with resolution_col:
+        points = st.select_slider("Points", HISTORY_RESOLUTIONS, value=1500, key='history_points')
+    with method_col:
+        method = st.radio("Downsampling", list(downsample.METHODS), horizontal=True, key='history_method')
+    overlays = st.multiselect("Overlays", list(charts.PRICE_OVERLAYS), default=['SMA 20', 'SMA 50'], key='history_overlays')
+    oscillator = st.radio("Lower panel", ['None'] + list(charts.OSCILLATORS), horizontal=True, key='history_oscillator')
+    oscillator = None if oscillator == 'None' else oscillator
+
+    history, bars = price_history(version, symbol, range_label, points, method)
+    if history is None or history.empty:
+        st.warning(f"⚠️ No price history stored for {symbol}.")
+        return
+    render = get_render_cache()
+    fig = render.figure(('price_history', symbol, range_label, points, method, tuple(overlays), oscillator, version),
+                        lambda: charts.price_history_chart(history, symbol, overlays, oscillator))
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Showing {len(history):,} of {bars:,} bars ({method if len(history) < bars else 'full resolution'}).")
+
+# Rolling windows (trading days) offered on the portfolio page
+ANALYTICS_WINDOWS = [20, 60, 120, 250]
+
+# Batched NumPy over the price panel (see portfolio.analyze), cached per
+# (symbols, window, weighting) and the versions of every dataset it reads
+@metrics.track_cache('portfolio_analytics')
+@st.cache_data(max_entries=32)
+def portfolio_analytics(panel_version, prices_version, index_version, fa_version, symbols, window, weighting):
+    metrics.cache_miss()
+    with metrics.timer('analytics_seconds', symbols=len(symbols)):
+        panel = load_price_panel(panel_version, prices_version)
+        symbols = [s for s in symbols if s in set(panel.symbols)]
+        if not symbols:
+            return None
+        weights = None
+        if weighting == "Market cap":
+            caps = fa_data.set_index('Symbol')['Market Cap (₹100 Cr)'] if 'Market Cap (₹100 Cr)' in fa_data.columns else pd.Series(dtype=float)
+            weights = caps.reindex(symbols).to_dict()
+        market = load_index_prices(index_version) if index_version is not None else None
+        return portfolio.analyze(panel, symbols, window, weights=weights, market=market)
+
+@st.fragment
+def portfolio_page(snap):
+    st.subheader("📐 Portfolio & Correlation Analytics")
+    panel_version = snap.dataset_version('price_panel')
+    prices_version = snap.dataset_version('prices')
+    if panel_version is None and prices_version is None:
+        st.warning("⚠️ No price history stored yet; run fetch_data.py first.")
+        return
+    if not selected_stocks:
+        st.info("Select stocks to analyse them as a portfolio.")
+        return
+    # Only windows the stored history can fill at least once
+    n_dates = load_price_panel(panel_version, prices_version).shape[0]
+    windows = [w for w in ANALYTICS_WINDOWS if w < n_dates]
+    if not windows:
+        st.warning(f"⚠️ Only {n_dates} day(s) of prices stored; rolling analytics need at least {ANALYTICS_WINDOWS[0] + 1}.")
+        return
+    window_col, weighting_col = st.columns(2)
+    with window_col:
+        window = st.select_slider("Rolling window (trading days)", windows, value=60 if 60 in windows else windows[-1],
+                                  key='analytics_window')
+    with weighting_col:
+        weighting = st.radio("Portfolio weights", ["Equal", "Market cap"], horizontal=True, key='analytics_weighting')
+
+    index_version = snap.dataset_version('index_prices')
+    key = (panel_version, prices_version, index_version, snap.dataset_version('fundamentals'), tuple(selected_stocks), window, weighting)
+    result = portfolio_analytics(*key)
+    if result is None:
+        st.warning("⚠️ No price history stored for the selected stocks.")
+        return
+    render = get_render_cache()
+
+    st.markdown("#### 📋 Risk & Return Summary")
+    st.dataframe(result['summary'].style.format('{:.2f}', na_rep='-'), use_container_width=True)
+    if index_version is None:
+        st.caption("Betas need the NIFTY 50 index history; run fetch_data.py to download it.")
+
+    curves = result['portfolio'].to_frame(f"{weighting} weighted")
+    if 'index' in result:
+        curves['NIFTY 50'] = result['index']
+    fig = render.figure(('portfolio_curve',) + key, lambda: charts.time_series_chart(curves, "Growth of ₹1", "Value (₹)"))
+    st.plotly_chart(fig, use_container_width=True)
+
+    if 'correlation' in result and len(result['correlation']) > 1:
+        corr_col, avg_col = st.columns([3, 2])
+        with corr_col:
+            fig = render.figure(('correlation_heatmap',) + key, lambda: charts.correlation_heatmap(
+                result['correlation'], f"Return Correlation (last {window} days)"))
+            st.plotly_chart(fig, use_container_width=True)
+        with avg_col:
+            fig = render.figure(('avg_correlation',) + key, lambda: charts.time_series_chart(
+                result['avg_correlation'].to_frame(), f"Average Pairwise Correlation ({window}-day)", "Correlation"))
+            st.plotly_chart(fig, use_container_width=True)
+
+    fig = render.figure(('rolling_volatility',) + key, lambda: charts.time_series_chart(
+        result['volatility'], f"Rolling {window}-day Volatility (annualized)", "Volatility (%)", scale=100))
+    st.plotly_chart(fig, use_container_width=True)
+    fig = render.figure(('drawdown',) + key, lambda: charts.time_series_chart(result['drawdown'], "Drawdown from Peak", "Drawdown (%)", scale=100))
+    st.plotly_chart(fig, use_container_width=True)
+    if 'beta' in result:
+        fig = render.figure(('beta',) + key, lambda: charts.time_series_chart(result['beta'], f"Rolling {window}-day Beta to NIFTY 50", "Beta"))
+        st.plotly_chart(fig, use_container_width=True)
+
+# Sorted-value and bitmap indexes over the fundamentals, built once per version
+@st.cache_resource(max_entries=2)
+def get_screener(version):
+    return screener.ScreenerIndex(fa_data)
+
+def compare_stocks(symbols):
+    # Runs before the next rerun's widgets, so it may set their state
+    st.session_state['selected_stocks'] = symbols
+    st.session_state['page'] = "📊 Fundamental Analysis"
+
+def screener_page(snap):
+    st.subheader("🔎 Stock Screener")
+    query = st.text_input(
+        "Screen", key='screen_query', label_visibility='collapsed',
+        placeholder="P/E < 20 and ROE > 15 and Debt/Equity < 100, sector = IT, sort by PEG",
+    )
+    st.caption("Conditions are joined with 'and' or commas (1,000 is read as a number); use <, <=, >, >=, =, != "
+               "or in (a, b) on any fundamentals column, then optionally 'sort by <column> [desc]' and 'limit <n>'.")
+    if not query:
+        return
+    index = get_screener(snap.dataset_version('fundamentals'))
+    try:
+        parsed = screener.parse(query, index.columns)
+        with metrics.timer('screen_seconds'):
+            positions = index.positions(parsed)
+    except ValueError as e:
+        st.error(f"⚠️ {e}")
+        return
+    result = index.frame.iloc[positions]
+    st.caption(f"{len(result)} of {index.size} stocks match")
+    shown = list(dict.fromkeys(['Symbol', 'Company', 'Sector'] + parsed.columns))
+    st.dataframe(result[[c for c in shown if c in result.columns]], hide_index=True, use_container_width=True)
+    top = result['Symbol'].head(MAX_SELECTIONS).tolist()
+    st.button(f"📊 Compare the top {len(top)} in the dashboard", on_click=compare_stocks, args=(top,), disabled=not top)
+
+PAGES = {
+    "📊 Fundamental Analysis": fundamentals_page,
+    "📉 Price History": price_history_page,
+    "📐 Portfolio Analytics": portfolio_page,
+    "🔎 Screener": screener_page,
+    "📰 Market News": news_page,
+}
+
+# st.tabs would execute every tab body on each rerun, news fetch included;
+# a segmented control runs only the visible page. The screener sets the page
+# through session state, so the default is set there too.
+st.session_state.setdefault('page', next(iter(PAGES)))
+page = st.segmented_control(
+    "Page", list(PAGES), required=True, key='page', label_visibility='collapsed'
+)
+with metrics.timer('page_render_seconds', page=page):
+    PAGES[page](snap)
+
 st.markdown(
     """
     <style>
-    .stTabs [data-baseweb="tab-list"] { justify-content: center; }
-    .stTabs [data-baseweb="tab"] { font-size: 1.2rem; }
+    [data-testid="stButtonGroup"] { justify-content: center; }
+    [data-testid="stButtonGroup"] button { font-size: 1.2rem; }
     </style>
     """,
     unsafe_allow_html=True,
-) 
\ No newline at end of file
+) 
+
+metrics.observe('script_run_seconds', time.perf_counter() - run_started)
+
+# Debug panel: append ?debug=1 to the URL
+if st.query_params.get('debug') == '1':
+    with st.sidebar.expander("⏱️ Performance metrics", expanded=True):
+        stats = metrics.snapshot()
+        timings = pd.DataFrame([
+            {
+                'metric': h['name'],
+                'labels': ', '.join(f"{k}={v}" for k, v in h['labels'].items()),
+                'count': h['count'],
+                'mean ms': 1000 * h['sum'] / h['count'],
+                'p95 ms': 1000 * metrics.quantile(h['buckets'], 0.95),
+            }
+            for h in stats['histograms'] if h['count']
+        ])
+        st.dataframe(timings, hide_index=True)
+        lookups = pd.DataFrame([
+            {'cache': c['labels']['cache'], 'result': c['labels']['result'], 'count': c['value']}
+            for c in stats['counters'] if c['name'] == 'cache_lookups_total'
+        ])
+        if not lookups.empty:
+            rates = lookups.pivot_table(index='cache', columns='result', values='count', aggfunc='sum', fill_value=0)
+            rates['hit rate'] = rates.get('hit', 0) / rates.sum(axis=1)
+            st.dataframe(rates)
+        upstream = [c for c in stats['counters'] if c['name'] == 'upstream_requests_total']
+        if upstream:
+            st.dataframe(pd.DataFrame([{**c['labels'], 'count': c['value']} for c in upstream]), hide_index=True)
+        disk_cache = http_cache.default_cache()
+        if disk_cache is not None:
+            st.dataframe(pd.DataFrame(
+                [(ns, n, size, fresh) for ns, (n, size, fresh) in disk_cache.stats().items()],
+                columns=['namespace', 'entries', 'bytes', 'fresh'],
+            ), hide_index=True)
@@ -0,0 +1,399 @@
+import json
+import os
+import re
+import shutil
+import numpy as np
+import pandas as pd
+import universe
+from price_panel import PricePanel
+
+try:
+    import pyarrow  # noqa: F401
+    HAVE_PARQUET = True
+except ImportError:
+    HAVE_PARQUET = False
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer assumed
+    fcntl = None
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '../data')
+# Every dataset file is prefixed with the universe slug, so several universes
+# can share the data directory
+PREFIX = universe.from_env().slug
+
+PRICE_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Superseded files kept per dataset, so readers still holding an older
+# snapshot can finish reading it
+KEEP_VERSIONS = 3
+
+# CSV files written by earlier versions of the pipeline (Nifty 50 only), read
+# once if the columnar file does not exist yet
+LEGACY_CSV = {
+    'symbols': 'nifty50_symbols.csv',
+    'prices': 'nifty50_data.csv',
+    'prices_ta': 'nifty50_data_ta.csv',
+    'fundamentals': 'nifty50_fundamentals.csv',
+}
+
+# Columns stored as categoricals; everything else keeps its natural dtype
+CATEGORICAL = ['Symbol']
+TEXT = ['Company', 'Sector', 'Industry']
+
+# Datasets with a Date column are kept sorted by (Symbol, Date) so parquet row
+# group statistics make symbol/date filters cheap
+SORT_KEYS = {
+    'prices': ['Symbol', 'Date'],
+    'prices_ta': ['Symbol', 'Date'],
+}
+
+
+def use_universe(u):
+    """Point the store at another universe's datasets"""
+    global PREFIX
+    PREFIX = u.slug
+
+
+def _unversioned_path(name):
+    # Files written before the manifest existed
+    ext = 'parquet' if HAVE_PARQUET else 'csv'
+    return os.path.join(DATA_DIR, f"{PREFIX}_{name}.{ext}")
+
+
+def _legacy_path(name):
+    legacy = LEGACY_CSV.get(name)
+    if legacy is None or PREFIX != 'nifty50':
+        return None
+    path = os.path.join(DATA_DIR, legacy)
+    return path if os.path.exists(path) else None
+
+
+def manifest_path():
+    return os.path.join(DATA_DIR, f"{PREFIX}_manifest.json")
+
+
+class Snapshot:
+    """Immutable view of which file backs each dataset at one manifest version.
+
+    Writers never modify a published file; they write new versioned files and
+    then swap the manifest, so a reader holding a Snapshot always sees one
+    consistent set of datasets.
+    """
+
+    def __init__(self, version=0, entries=None):
+        self.version = version
+        self.entries = entries or {}
+
+    def path(self, name):
+        """File backing a dataset in this snapshot, or None"""
+        entry = self.entries.get(name)
+        if entry is not None:
+            return os.path.join(DATA_DIR, entry['file'])
+        unversioned = _unversioned_path(name)
+        if os.path.exists(unversioned):
+            return unversioned
+        return _legacy_path(name)
+
+    def dataset_version(self, name):
+        """(name, version, path) for a dataset, or None if it does not exist.
+
+        Files from before the manifest get version 0. The tuple changes
+        whenever the dataset is republished, so it can be used as a cache key.
+        """
+        path = self.path(name)
+        if path is None:
+            return None
+        entry = self.entries.get(name)
+        return name, entry['version'] if entry else 0, path
+
+
+_snapshot_cache = (None, Snapshot())
+
+
+def snapshot():
+    """The currently published Snapshot; the manifest is only re-read when it changes"""
+    global _snapshot_cache
+    path = manifest_path()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return Snapshot()
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if _snapshot_cache[0] != key:
+        with open(path) as f:
+            manifest = json.load(f)
+        _snapshot_cache = (key, Snapshot(manifest['version'], manifest['datasets']))
+    return _snapshot_cache[1]
+
+
+def dataset_path(name):
+    """File currently backing a dataset, or None"""
+    return snapshot().path(name)
+
+
+def dataset_exists(name):
+    return dataset_path(name) is not None
+
+
+def _normalize(df):
+    df = df.copy()
+    if 'Date' in df.columns:
+        df['Date'] = pd.to_datetime(df['Date'])
+    for col in CATEGORICAL:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in df.columns:
+        if col in CATEGORICAL or col in TEXT or col == 'Date':
+            continue
+        if df[col].dtype == object:
+            converted = pd.to_numeric(df[col], errors='coerce')
+            # Only convert columns that were numeric to begin with
+            if converted.notna().sum() == df[col].notna().sum():
+                df[col] = converted
+    return df
+
+
+def wide_to_long(frame):
+    """Convert a yfinance group_by='ticker' frame (ticker, field) into long
+    format with Date and Symbol columns; '.NS' suffixes are stripped"""
+    if frame is None or frame.empty:
+        return pd.DataFrame(columns=['Date', 'Symbol'] + PRICE_FIELDS)
+    long = frame.stack(level=0, future_stack=True).dropna(how='all')
+    long.index.names = ['Date', 'Symbol']
+    long = long.reset_index()
+    long['Symbol'] = long['Symbol'].astype(str).str.replace(r'\.NS$', '', regex=True)
+    long.columns.name = None
+    return long[['Date', 'Symbol'] + [f for f in PRICE_FIELDS if f in long.columns]]
+
+
+def long_to_panel(long, fields=None):
+    """Pivot long-format rows into {field: DataFrame(date x symbol)}"""
+    fields = fields or [c for c in long.columns if c not in ('Date', 'Symbol')]
+    symbols = long['Symbol'].astype(str)
+    return {
+        field: long.assign(Symbol=symbols).pivot(index='Date', columns='Symbol', values=field).sort_index()
+        for field in fields
+    }
+
+
+def panel_to_long(panel):
+    """Inverse of long_to_panel"""
+    stacked = pd.concat({field: frame.stack(future_stack=True) for field, frame in panel.items()}, axis=1)
+    stacked.index.names = ['Date', 'Symbol']
+    return stacked.dropna(how='all').reset_index()
+
+
+def _write(df, name, path):
+    df = _normalize(df)
+    if name in SORT_KEYS:
+        df = df.sort_values(SORT_KEYS[name])
+    df = df.reset_index(drop=True)
+    tmp = path + '.tmp'
+    if HAVE_PARQUET:
+        df.to_parquet(tmp, index=False, compression='zstd', row_group_size=64_000)
+    else:
+        df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+class Parts:
+    """A dataset published as a directory of part files, so adding rows does
+    not decode and rewrite the ones already stored.
+
+    keep are part files of a published version (see dataset_parts); they are
+    hard-linked into the new version unchanged and followed by one new part
+    per non-empty frame in frames.
+    """
+
+    def __init__(self, frames, keep=()):
+        self.frames = list(frames)
+        self.keep = list(keep)
+
+    def save(self, name, path):
+        """Write the parts into directory path; returns the total row count"""
+        tmp = path + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        ext = 'parquet' if HAVE_PARQUET else 'csv'
+        rows = 0
+        for i, source in enumerate(self.keep):
+            target = os.path.join(tmp, f"part-{i:05d}{os.path.splitext(source)[1]}")
+            try:
+                os.link(source, target)
+            except OSError:  # no hard links on this filesystem
+                shutil.copyfile(source, target)
+            rows += _count_rows(target)
+        frames = [df for df in self.frames if not df.empty] or self.frames[:1]
+        for i, df in enumerate(frames, len(self.keep)):
+            _write(df, name, os.path.join(tmp, f"part-{i:05d}.{ext}"))
+            rows += len(df)
+        os.replace(tmp, path)
+        return rows
+
+
+def _count_rows(path):
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.read_metadata(path).num_rows
+    with open(path) as f:
+        return sum(1 for _ in f) - 1
+
+
+def _collect_garbage(name):
+    pattern = re.compile(rf"^{re.escape(PREFIX)}_{re.escape(name)}\.v(\d+)\.(parquet|csv|panel|parts)$")
+    versions = sorted(
+        ((int(m.group(1)), f) for f in os.listdir(DATA_DIR) if (m := pattern.match(f))),
+        reverse=True,
+    )
+    for _, filename in versions[KEEP_VERSIONS:]:
+        path = os.path.join(DATA_DIR, filename)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def save_datasets(frames):
+    """Publish several datasets as one new snapshot version.
+
+    Each frame is written to a new versioned file (a PricePanel or Parts to a
+    new directory), then the manifest is swapped atomically; readers see either
+    all of the new datasets or none. Returns {name: path}.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    ext = 'parquet' if HAVE_PARQUET else 'csv'
+    with open(manifest_path() + '.lock', 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        current = snapshot()
+        version = current.version + 1
+        entries = dict(current.entries)
+        paths = {}
+        for name, df in frames.items():
+            if isinstance(df, PricePanel):
+                filename = f"{PREFIX}_{name}.v{version}.panel"
+                paths[name] = os.path.join(DATA_DIR, filename)
+                df.save(paths[name])
+                rows = df.shape[0]
+            elif isinstance(df, Parts):
+                filename = f"{PREFIX}_{name}.v{version}.parts"
+                paths[name] = os.path.join(DATA_DIR, filename)
+                rows = df.save(name, paths[name])
+            else:
+                filename = f"{PREFIX}_{name}.v{version}.{ext}"
+                paths[name] = os.path.join(DATA_DIR, filename)
+                _write(df, name, paths[name])
+                rows = len(df)
+            entries[name] = {'file': filename, 'version': version, 'rows': rows}
+        tmp = manifest_path() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'version': version, 'datasets': entries}, f, indent=1)
+        os.replace(tmp, manifest_path())
+        for name in frames:
+            _collect_garbage(name)
+    return paths
+
+
+def save_dataset(df, name):
+    """Publish one dataset as a new snapshot version and return its path"""
+    return save_datasets({name: df})[name]
+
+
+def dataset_version(name):
+    """Version handle of a dataset in the current snapshot; see Snapshot.dataset_version"""
+    return snapshot().dataset_version(name)
+
+
+def dataset_parts(name, version=None):
+    """Files holding a dataset in the current (or given) snapshot: the part
+    files of a Parts dataset in order, otherwise the single file"""
+    path = version[2] if version is not None else dataset_path(name)
+    if path is None:
+        return []
+    if not path.endswith('.parts'):
+        return [path]
+    return [os.path.join(path, f) for f in sorted(os.listdir(path))]
+
+
+def _load_legacy(name, path):
+    if name == 'prices':
+        wide = pd.read_csv(path, header=[0, 1], index_col=0, parse_dates=True)
+        return wide_to_long(wide)
+    return pd.read_csv(path)
+
+
+def load_dataset(name, columns=None, symbols=None, start=None, end=None, version=None):
+    """Load a dataset, reading only the requested columns and rows.
+
+    symbols/start/end are pushed down to the parquet reader where possible, so
+    unneeded row groups are never decoded. Pass a dataset_version() handle as
+    version to read exactly that snapshot of the dataset.
+    """
+    path = version[2] if version is not None else dataset_path(name)
+    if path is None:
+        raise FileNotFoundError(f"No '{name}' dataset in {DATA_DIR}")
+    filters = []
+    if symbols is not None:
+        filters.append(('Symbol', 'in', list(symbols)))
+    if start is not None:
+        filters.append(('Date', '>=', pd.Timestamp(start)))
+    if end is not None:
+        filters.append(('Date', '<=', pd.Timestamp(end)))
+
+    read_columns = None
+    if columns is not None:
+        read_columns = list(columns)
+        for col, _, _ in filters:
+            if col not in read_columns:
+                read_columns.append(col)
+
+    files = dataset_parts(name, (name, None, path))
+    if files[0].endswith('.parquet'):
+        # A directory of parts is read as one dataset, with the same pushdown
+        df = pd.read_parquet(path, columns=read_columns, filters=filters or None)
+    else:
+        if path == _legacy_path(name):
+            df = _normalize(_load_legacy(name, path))
+        else:
+            df = _normalize(pd.concat([pd.read_csv(f, float_precision='round_trip') for f in files], ignore_index=True))
+        if symbols is not None:
+            df = df[df['Symbol'].isin(list(symbols))]
+        if start is not None:
+            df = df[df['Date'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['Date'] <= pd.Timestamp(end)]
+        if read_columns is not None:
+            df = df[read_columns]
+
+    if columns is not None:
+        df = df[list(columns)]
+    for col in CATEGORICAL:
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.remove_unused_categories()
+    return df.reset_index(drop=True)
+
+
+def load_price_panel(version=None, mmap=True):
+    """The compact price panel of the current (or given) snapshot, memory-mapped
+    by default; built from the long 'prices' dataset if no panel was published"""
+    version = version or dataset_version('price_panel')
+    if version is not None:
+        return PricePanel.load(version[2], mmap=mmap)
+    return PricePanel.from_long(load_dataset('prices'))
+
+
+def clean_fundamentals(fa):
+    """Drop index rows and unnamed companies, and turn inf into NaN"""
+    fa = fa[~fa['Symbol'].astype(str).str.startswith('NIFTY ')]  # Remove index rows such as NIFTY 50
+    fa = fa.dropna(subset=['Company']).copy()  # Remove rows with missing company names
+    # Plain strings: element-wise .map() on a categorical would visit every category
+    fa['Symbol'] = fa['Symbol'].astype(str)
+    numeric_columns = fa.select_dtypes(include=[np.number]).columns
+    fa[numeric_columns] = fa[numeric_columns].replace([np.inf, -np.inf], np.nan)
+    return fa
+
+
+def load_symbols():
+    return load_dataset('symbols')['Symbol'].astype(str).tolist()
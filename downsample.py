@@ -0,0 +1,85 @@
+import numpy as np
+
+# Both downsamplers return the positions of the points to keep rather than
+# the points themselves, so the overlays of a chart (moving averages, bands)
+# can be taken at exactly the same dates as the price they are drawn over.
+# NaN values are never selected.
+
+
+def _valid(y):
+    y = np.asarray(y, dtype=np.float64)
+    return y, np.flatnonzero(~np.isnan(y))
+
+
+def lttb(x, y, n):
+    """Largest-Triangle-Three-Buckets: positions of at most n points that keep
+    the visual shape of the line (peaks, troughs and trend changes).
+
+    x must be increasing and numeric (use datetime64 .view('i8') for dates).
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the point chosen
+    in the previous bucket and the mean of the next one.
+    """
+    y, valid = _valid(y)
+    if len(valid) <= n or n < 3:
+        return valid
+    x = np.asarray(x, dtype=np.float64)[valid]
+    y = y[valid]
+    edges = np.linspace(1, len(valid) - 1, n - 1).astype(np.int64)
+    # Mean point of each bucket, used as the third vertex for the bucket before it
+    sums_x = np.add.reduceat(x[:-1], edges[:-1])
+    sums_y = np.add.reduceat(y[:-1], edges[:-1])
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    keep = np.empty(n, dtype=np.int64)
+    keep[0], keep[-1] = 0, len(valid) - 1
+    ax, ay = x[0], y[0]
+    for b in range(n - 2):
+        lo, hi = edges[b], edges[b + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        cx, cy = mean_x[b + 1], mean_y[b + 1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((ax - cx) * (by - ay) - (ax - bx) * (cy - ay))
+        i = lo + int(np.argmax(area))
+        keep[b + 1] = i
+        ax, ay = x[i], y[i]
+    return valid[keep]
+
+
+def minmax(y, n):
+    """Min/max bucketing: positions of at most n points, the minimum and maximum
+    of each of n/2 equal-width buckets (in time order), plus the end points.
+
+    Cheaper than LTTB and guarantees every extreme stays visible, which suits
+    high/low style data and very dense minute bars.
+    """
+    y, valid = _valid(y)
+    if len(valid) <= n or n < 4:
+        return valid
+    values = y[valid]
+    width = -(-len(values) // max((n - 2) // 2, 1))
+    buckets = -(-len(values) // width)
+    # One row per bucket; the last one is padded so it never wins min or max
+    pad = buckets * width - len(values)
+    low = np.append(values, np.full(pad, np.inf)).reshape(buckets, width)
+    high = np.append(values, np.full(pad, -np.inf)).reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    keep = np.unique(np.concatenate((
+        [0, len(values) - 1], offsets + low.argmin(axis=1), offsets + high.argmax(axis=1))))
+    return valid[keep]
+
+
+METHODS = {
+    'LTTB': lambda x, y, n: lttb(x, y, n),
+    'Min/Max': lambda x, y, n: minmax(y, n),
+}
+
+
+def downsample(frame, column, n, method='LTTB'):
+    """Rows of a Date-indexed frame reduced to about n points, chosen on column"""
+    if len(frame) <= n:
+        return frame
+    x = frame.index.to_numpy(dtype='datetime64[ns]').view('i8')
+    return frame.iloc[METHODS[method](x, frame[column].to_numpy(dtype=np.float64, na_value=np.nan), n)]
@@ -1,22 +1,154 @@
-import os
+import argparse
+import numpy as np
 import pandas as pd
-from nsepython import nsefetch
 import yfinance as yf
+import data_store
+import http_cache
+import universe
+from price_panel import PricePanel
 
-# Ensure data directory exists
-os.makedirs(os.path.join(os.path.dirname(__file__), '../data'), exist_ok=True)
+# Tickers per yf.download call; keeps each wide frame small for large universes
+CHUNK_SIZE = 100
+# Benchmark for betas and the index line on the portfolio page
+INDEX_TICKER = '^NSEI'
 
-# Fetch Nifty 50 symbols
-nifty50_url = "https://www.nseindia.com/api/equity-stockIndices?index=NIFTY%2050"
-data = nsefetch(nifty50_url)
-symbols = [item['symbol'] for item in data['data']]
 
-symbols_path = os.path.join(os.path.dirname(__file__), '../data/nifty50_symbols.csv')
-pd.DataFrame(symbols, columns=['Symbol']).to_csv(symbols_path, index=False)
-print(f"Nifty 50 symbols saved to {symbols_path}")
+def load_prices():
+    """Load the stored long-format price rows, or None if there are none yet"""
+    if not data_store.dataset_exists('prices'):
+        return None
+    return data_store.load_dataset('prices')
 
-# Fetch historical data for all symbols using yfinance (6 months)
-symbols_yf = [s + ".NS" for s in symbols]
-hist_data = yf.download(symbols_yf, period="6mo", interval="1d", group_by='ticker', auto_adjust=True)
-hist_data.to_csv(os.path.join(os.path.dirname(__file__), '../data/nifty50_data.csv'))
-print("Nifty 50 historical data saved to data/nifty50_data.csv") 
\ No newline at end of file
+
+def last_dates(prices):
+    """Last stored date for each symbol"""
+    if prices is None or prices.empty:
+        return {}
+    return prices.groupby('Symbol', observed=True)['Date'].max().to_dict()
+
+
+# Failed or empty downloads are not cached, so the next run retries them
+@http_cache.cached('yf_daily', should_cache=lambda frame: not frame.empty)
+def download(tickers, **kwargs):
+    data = yf.download(tickers, interval="1d", group_by='ticker', auto_adjust=True, **kwargs)
+    if data.empty:
+        return data
+    if not isinstance(data.columns, pd.MultiIndex):
+        # A single ticker comes back without the ticker level
+        data = pd.concat({tickers[0]: data}, axis=1)
+    data.index = pd.to_datetime(data.index).tz_localize(None)
+    return data.dropna(how='all')
+
+
+def merge_prices(stored, new):
+    """Merge new bars into the stored rows; new rows win on overlapping dates"""
+    if stored is None or stored.empty:
+        return new
+    merged = pd.concat([stored.astype({'Symbol': str}), new], ignore_index=True)
+    return merged.drop_duplicates(subset=['Symbol', 'Date'], keep='last')
+
+
+def changed_bars(stored, new):
+    """Rows of new that are not stored yet or differ from the stored bar"""
+    if stored is None or stored.empty:
+        return new
+    key = ['Symbol', 'Date']
+    fields = [f for f in data_store.PRICE_FIELDS if f in new.columns]
+    as_keys = lambda df: df.assign(Symbol=df['Symbol'].astype(str), Date=pd.to_datetime(df['Date']).astype('datetime64[ns]'))
+    # Only stored bars from the first new date on can overlap
+    old = stored[stored['Date'] >= new['Date'].min()]
+    merged = as_keys(new).merge(as_keys(old)[key + fields], on=key, how='left', suffixes=('', '_stored'), indicator=True)
+    changed = merged['_merge'] == 'left_only'
+    for field in fields:
+        a = merged[field].to_numpy(dtype='float64', na_value=np.nan)
+        b = merged[f'{field}_stored'].to_numpy(dtype='float64', na_value=np.nan)
+        changed |= ~((a == b) | (np.isnan(a) & np.isnan(b)))
+    return new[changed.to_numpy()]
+
+
+def update_prices(symbols, period="6mo", full=False):
+    """Fetch only the bars missing from the local store and merge them in.
+
+    Tickers without stored data (or all tickers when full=True) get the whole
+    period; the rest are grouped by their last stored date so each group needs
+    a single download starting on that date. The last stored bar is fetched
+    again because it may have been saved mid-session; merge_prices replaces
+    it with the new one. Nothing is published unless a bar was added or
+    revised. full=True also bypasses the response cache.
+    """
+    stored = None if full else load_prices()
+    latest = last_dates(stored)
+
+    groups = {}
+    for symbol in symbols:
+        groups.setdefault(latest.get(symbol), []).append(symbol + ".NS")
+
+    frames = []
+    for last, group in groups.items():
+        if last is None:
+            print(f"Downloading {period} of history for {len(group)} ticker(s)")
+            kwargs = {'period': period}
+        else:
+            kwargs = {'start': last.strftime('%Y-%m-%d')}
+            print(f"Downloading bars since {kwargs['start']} for {len(group)} ticker(s)")
+        # Convert each chunk to long format right away so only one wide
+        # frame is alive at a time
+        for chunk in universe.chunks(group, CHUNK_SIZE):
+            frame = download(chunk, refresh=full, **kwargs)
+            if not frame.empty:
+                frames.append(data_store.wide_to_long(frame))
+    if not frames:
+        print("Price store is already up to date")
+        return stored
+
+    new = changed_bars(stored, pd.concat(frames, ignore_index=True))
+    if new.empty:
+        print("Price store is already up to date")
+        return stored
+    merged = merge_prices(stored, new)
+    # The memory-mappable panel is published with the prices it was built from
+    paths = data_store.save_datasets({'prices': merged, 'price_panel': PricePanel.from_long(merged)})
+    path = paths['prices']
+    print(f"Added or revised {len(new)} bar(s) across {new['Symbol'].nunique()} symbol(s); "
+          f"store now spans {merged['Date'].min().date()} to {merged['Date'].max().date()} ({path})")
+    return merged
+
+
+def update_index_prices(start, ticker=INDEX_TICKER, refresh=False):
+    """Download the benchmark index's daily bars since start and publish them as
+    the 'index_prices' dataset (same long format as 'prices')"""
+    frame = download([ticker], refresh=refresh, start=pd.Timestamp(start).strftime('%Y-%m-%d'))
+    if frame.empty:
+        print(f"No {ticker} bars returned; keeping the stored index prices")
+        return None
+    index_prices = data_store.wide_to_long(frame)
+    path = data_store.save_dataset(index_prices, 'index_prices')
+    print(f"{len(index_prices)} {ticker} bar(s) saved to {path}")
+    return index_prices
+
+
+def update_symbols(u):
+    """Fetch the universe's constituents and publish them as the 'symbols' dataset"""
+    symbols = u.fetch_symbols()
+    symbols_path = data_store.save_dataset(pd.DataFrame(symbols, columns=['Symbol']), 'symbols')
+    print(f"{len(symbols)} {u.name} symbols saved to {symbols_path}")
+    return symbols
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch index constituents and daily OHLCV")
+    universe.add_arguments(parser)
+    parser.add_argument('--period', default="6mo", help="history to download for tickers with no stored data (e.g. 6mo, 5y, 10y)")
+    parser.add_argument('--full', action='store_true', help="ignore the local store and the response cache and re-download the whole period")
+    args = parser.parse_args()
+
+    u = universe.from_args(args)
+    data_store.use_universe(u)
+    symbols = update_symbols(u)
+    prices = update_prices(symbols, period=args.period, full=args.full)
+    if prices is not None and not prices.empty:
+        update_index_prices(prices['Date'].min(), refresh=args.full)
+
+
+if __name__ == "__main__":
+    main()
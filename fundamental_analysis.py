@@ -1,15 +1,65 @@
 import yfinance as yf
 import pandas as pd
-import os
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import data_store
+import http_cache
+import aggregates
+import fundamentals_history
+import universe
 
-symbols_path = os.path.join(os.path.dirname(__file__), '../data/nifty50_symbols.csv')
-symbols = pd.read_csv(symbols_path)['Symbol'].tolist()
 
-fundamentals = []
-for symbol in symbols:
-    stock = yf.Ticker(symbol + ".NS")
-    info = stock.info
-    fundamentals.append({
+@http_cache.cached('yf_info', should_cache=bool)
+def yfinance_provider(symbol):
+    """Fetch the raw .info dict for an NSE symbol from yfinance"""
+    return yf.Ticker(symbol + ".NS").info
+
+
+class StubProvider:
+    """Offline provider returning synthetic .info dicts after a simulated delay"""
+
+    def __init__(self, latency=0.2, jitter=0.1, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol):
+        with self._lock:
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            fail = self._rng.random() < self.failure_rate
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError(f"stub failure for {symbol}")
+        rng = random.Random(symbol)
+        return {
+            'shortName': f"{symbol} Ltd",
+            'marketCap': rng.uniform(5e11, 2e13),
+            'trailingPE': rng.uniform(5, 60),
+            'forwardPE': rng.uniform(5, 50),
+            'pegRatio': rng.uniform(0.3, 4),
+            'priceToBook': rng.uniform(0.5, 15),
+            'trailingEps': rng.uniform(1, 200),
+            'forwardEps': rng.uniform(1, 220),
+            'dividendYield': rng.uniform(0, 0.06),
+            'returnOnEquity': rng.uniform(-0.05, 0.4),
+            'returnOnAssets': rng.uniform(-0.02, 0.2),
+            'debtToEquity': rng.uniform(0, 3),
+            'currentRatio': rng.uniform(0.5, 3),
+            'quickRatio': rng.uniform(0.3, 2.5),
+            'profitMargins': rng.uniform(-0.05, 0.35),
+            'operatingMargins': rng.uniform(0, 0.45),
+            'sector': rng.choice(['Technology', 'Financial Services', 'Energy', 'Healthcare', 'Consumer Defensive']),
+            'industry': 'Synthetic',
+        }
+
+
+def build_fundamentals_row(symbol, info):
+    return {
         'Symbol': symbol,
         'Company': info.get('shortName'),
         'Market Cap (₹100 Cr)': round((info.get('marketCap', 0) or 0) / 1e10, 2),
@@ -29,8 +79,127 @@ for symbol in symbols:
         'Operating Margin (%)': info.get('operatingMargins', 0) * 100 if info.get('operatingMargins') is not None else None,
         'Sector': info.get('sector'),
         'Industry': info.get('industry'),
-    })
+    }
+
+
+class _Call:
+    """One provider call on its own daemon thread. yfinance has no timeout for
+    .info, so a call that overruns is abandoned, but it can be waited on again
+    instead of starting another request for the same symbol."""
+
+    def __init__(self, provider, symbol):
+        self.result = {}
+        self.thread = threading.Thread(target=self._run, args=(provider, symbol), daemon=True)
+        self.thread.start()
+
+    def _run(self, provider, symbol):
+        try:
+            self.result['value'] = provider(symbol)
+        except Exception as e:
+            self.result['error'] = e
+
+    def wait(self, timeout):
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            raise TimeoutError(f"no response within {timeout}s")
+        if 'error' in self.result:
+            raise self.result['error']
+        return self.result['value']
+
+
+def _fetch_with_retry(provider, symbol, timeout, retries, backoff, max_backoff):
+    attempt = 0
+    call = None
+    while True:
+        attempt += 1
+        # A retry after a timeout keeps waiting on the call that is still
+        # running, so a slow endpoint never has more than one request per
+        # symbol in flight
+        if call is None or not call.thread.is_alive():
+            call = _Call(provider, symbol)
+        try:
+            return call.wait(timeout)
+        except Exception as e:
+            if attempt > retries:
+                e.attempts = attempt
+                raise
+            # Full-jitter exponential backoff
+            time.sleep(random.uniform(0, min(max_backoff, backoff * 2 ** (attempt - 1))))
+
+
+def fetch_fundamentals(symbols, provider=yfinance_provider, max_workers=8, timeout=15.0,
+                       retries=3, backoff=1.0, max_backoff=30.0):
+    """Fetch fundamentals for all symbols concurrently.
+
+    Returns (rows, failures) where failures maps symbol -> {'error', 'attempts'}.
+    """
+    rows = {}
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_fetch_with_retry, provider, symbol, timeout, retries, backoff, max_backoff): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                rows[symbol] = build_fundamentals_row(symbol, future.result() or {})
+            except Exception as e:
+                failures[symbol] = {'error': f"{type(e).__name__}: {e}", 'attempts': getattr(e, 'attempts', retries + 1)}
+    # Keep the output in symbol order regardless of completion order
+    return [rows[s] for s in symbols if s in rows], failures
+
+
+def print_failure_report(failures):
+    if not failures:
+        print("All symbols fetched successfully")
+        return
+    print(f"{len(failures)} symbol(s) failed:")
+    for symbol, failure in sorted(failures.items()):
+        print(f"  {symbol}: {failure['error']} (after {failure['attempts']} attempts)")
+
+
+def publish_fundamentals(rows):
+    """Publish fundamentals together with their rankings and sector/industry
+    aggregates, so readers never see them out of step"""
+    fundamentals_df = pd.DataFrame(rows)
+    paths = data_store.save_datasets({'fundamentals': fundamentals_df, **aggregates.build_aggregates(fundamentals_df)})
+    print(f"Fundamental data saved to {paths['fundamentals']}")
+    print("Rankings and sector/industry aggregates updated")
+    # The dataset above only holds the latest values; the history keeps
+    # every change
+    changed = fundamentals_history.append(fundamentals_df)
+    print(f"{changed} changed value(s) recorded in the fundamentals history")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch fundamentals for the stored index symbols")
+    universe.add_arguments(parser)
+    parser.add_argument('--workers', type=int, default=8, help="number of concurrent requests")
+    parser.add_argument('--timeout', type=float, default=15.0, help="per-request timeout in seconds")
+    parser.add_argument('--retries', type=int, default=3, help="retries per symbol after the first attempt")
+    parser.add_argument('--stub', action='store_true', help="use the offline stub provider (for benchmarking)")
+    parser.add_argument('--stub-latency', type=float, default=0.2)
+    args = parser.parse_args()
+
+    data_store.use_universe(universe.from_args(args))
+    symbols = data_store.load_symbols()
+
+    provider = StubProvider(latency=args.stub_latency) if args.stub else yfinance_provider
+    start = time.perf_counter()
+    fundamentals, failures = fetch_fundamentals(
+        symbols, provider=provider, max_workers=args.workers, timeout=args.timeout, retries=args.retries
+    )
+    elapsed = time.perf_counter() - start
+    print(f"Fetched {len(fundamentals)}/{len(symbols)} symbols in {elapsed:.2f}s with {args.workers} workers")
+    print_failure_report(failures)
+    if args.stub:
+        # Benchmark runs must not clobber the real dataset
+        return
+
+    publish_fundamentals(fundamentals)
+
 
-fundamentals_path = os.path.join(os.path.dirname(__file__), '../data/nifty50_fundamentals.csv')
-pd.DataFrame(fundamentals).to_csv(fundamentals_path, index=False)
-print(f"Fundamental data saved to {fundamentals_path}") 
\ No newline at end of file
+if __name__ == "__main__":
+    main()
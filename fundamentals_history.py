@@ -0,0 +1,278 @@
+import argparse
+import json
+import os
+import re
+from datetime import date as Date
+import numpy as np
+import pandas as pd
+import data_store
+import market_calendar
+import universe
+
+# Layout of DATA_DIR/{PREFIX}_fundamentals_history/:
+#   delta-YYYY-MM-DD.parquet       cells that changed on that day
+#   checkpoint-YYYY-MM-DD.parquet  every cell's latest value as of that day
+# Both hold long rows (Date, Symbol, Field, Value, Text): numeric fields in
+# Value, text fields (Company, Sector, Industry) in Text, and Date is the day
+# the value was first seen. Files are only ever added, never rewritten,
+# except that a second snapshot on the same day extends that day's delta.
+# fields.json lists the fields in the order the snapshots had them, so
+# as_of returns columns in the 'fundamentals' dataset's order.
+CELL_COLUMNS = ['Date', 'Symbol', 'Field', 'Value', 'Text']
+# A checkpoint after this many deltas keeps an as-of query to one checkpoint
+# plus at most CHECKPOINT_EVERY - 1 deltas
+CHECKPOINT_EVERY = 20
+
+_PARTITION = re.compile(r'^(delta|checkpoint)-(\d{4}-\d{2}-\d{2})\.(parquet|csv)$')
+
+
+def history_dir():
+    return os.path.join(data_store.DATA_DIR, f"{data_store.PREFIX}_fundamentals_history")
+
+
+def partitions():
+    """[(date, kind, path)] of every stored partition, oldest first; on the
+    same day a delta sorts before the checkpoint that includes it"""
+    try:
+        names = os.listdir(history_dir())
+    except FileNotFoundError:
+        return []
+    found = []
+    for name in names:
+        if m := _PARTITION.match(name):
+            found.append((Date.fromisoformat(m.group(2)), m.group(1), os.path.join(history_dir(), name)))
+    return sorted(found, key=lambda p: (p[0], p[1] == 'checkpoint'))
+
+
+def fields_path():
+    return os.path.join(history_dir(), 'fields.json')
+
+
+def field_order():
+    """Every recorded field, in the column order of the snapshots"""
+    try:
+        with open(fields_path()) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _record_fields(fa):
+    known = field_order()
+    fields = known + [c for c in fa.columns if c != 'Symbol' and c not in known]
+    if fields != known:
+        tmp = fields_path() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(fields, f, indent=1)
+        os.replace(tmp, fields_path())
+
+
+def version():
+    """Changes whenever a partition is added or extended; usable as a cache key"""
+    return tuple((os.path.basename(path), os.stat(path).st_mtime_ns) for _, _, path in partitions())
+
+
+def to_cells(fa, day):
+    """Fundamentals rows (one per symbol) as long cells dated day"""
+    fa = fa.drop_duplicates('Symbol', keep='last')
+    fields = [c for c in fa.columns if c != 'Symbol']
+    long = fa.assign(Symbol=fa['Symbol'].astype(str)).melt(id_vars='Symbol', value_vars=fields, var_name='Field', value_name='Value')
+    text_fields = [c for c in fields if c in data_store.TEXT
+                   or pd.to_numeric(fa[c], errors='coerce').notna().sum() < fa[c].notna().sum()]
+    text = long['Field'].isin(text_fields)
+    return pd.DataFrame({
+        'Date': pd.Timestamp(day),
+        'Symbol': long['Symbol'],
+        'Field': long['Field'],
+        'Value': pd.to_numeric(long['Value'].where(~text), errors='coerce').astype(np.float64),
+        'Text': long['Value'].where(text & long['Value'].notna()).astype(object),
+    })
+
+
+def _read(path, symbols=None, fields=None):
+    filters = []
+    if symbols is not None:
+        filters.append(('Symbol', 'in', list(symbols)))
+    if fields is not None:
+        filters.append(('Field', 'in', list(fields)))
+    if path.endswith('.parquet'):
+        cells = pd.read_parquet(path, filters=filters or None)
+    else:
+        cells = pd.read_csv(path, parse_dates=['Date'], dtype={'Symbol': str, 'Field': str, 'Text': object})
+        if symbols is not None:
+            cells = cells[cells['Symbol'].isin(list(symbols))]
+        if fields is not None:
+            cells = cells[cells['Field'].isin(list(fields))]
+    return cells
+
+
+def _concat(frames):
+    # Each partition has its own categories, so compare as plain strings
+    cells = pd.concat(frames, ignore_index=True)
+    return cells.astype({'Symbol': object, 'Field': object, 'Text': object})
+
+
+def _write(cells, path):
+    cells = cells[CELL_COLUMNS].sort_values(['Symbol', 'Field']).reset_index(drop=True)
+    tmp = path + '.tmp'
+    if data_store.HAVE_PARQUET:
+        cells.astype({'Symbol': 'category', 'Field': 'category'}).to_parquet(tmp, index=False, compression='zstd')
+    else:
+        cells.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _latest(cells):
+    """Last value of every (Symbol, Field) in date order"""
+    if cells.empty:
+        return cells
+    cells = cells.sort_values('Date', kind='stable')
+    return cells.drop_duplicates(['Symbol', 'Field'], keep='last').reset_index(drop=True)
+
+
+def cells_as_of(day=None, symbols=None, fields=None):
+    """Latest long cells on or before day (default: everything stored).
+
+    Reads the newest checkpoint on or before day and the deltas after it;
+    symbols and fields are pushed down to the parquet reader.
+    """
+    stored = partitions()
+    if day is not None:
+        day = pd.Timestamp(day).date()
+        stored = [p for p in stored if p[0] <= day]
+    start = max((i for i, p in enumerate(stored) if p[1] == 'checkpoint'), default=0)
+    frames = [_read(path, symbols, fields) for _, _, path in stored[start:]]
+    if not frames:
+        return pd.DataFrame(columns=CELL_COLUMNS)
+    return _latest(_concat(frames))
+
+
+def _changed(new, old):
+    """Cells of new whose value differs from old (NaN equals NaN)"""
+    merged = new.merge(old[['Symbol', 'Field', 'Value', 'Text']], on=['Symbol', 'Field'], how='left',
+                       suffixes=('', '_old'), indicator=True)
+    value_same = (merged['Value'] == merged['Value_old']) | (merged['Value'].isna() & merged['Value_old'].isna())
+    text_same = (merged['Text'] == merged['Text_old']) | (merged['Text'].isna() & merged['Text_old'].isna())
+    changed = (merged['_merge'] == 'left_only') | ~(value_same & text_same)
+    return new[changed.to_numpy()]
+
+
+def append(fa, day=None):
+    """Record a fundamentals snapshot taken on day (default: today in IST).
+
+    Only cells that differ from the latest stored value are written. Days
+    must not go backwards; a second snapshot on the same day extends that
+    day's delta. Returns the number of cells written.
+    """
+    day = pd.Timestamp(day).date() if day is not None else market_calendar.now_ist().date()
+    os.makedirs(history_dir(), exist_ok=True)
+    ext = 'parquet' if data_store.HAVE_PARQUET else 'csv'
+    with open(os.path.join(history_dir(), '.lock'), 'w') as lock:
+        if data_store.fcntl is not None:
+            data_store.fcntl.flock(lock, data_store.fcntl.LOCK_EX)
+        stored = partitions()
+        if stored and stored[-1][0] > day:
+            raise ValueError(f"History already has {stored[-1][0]}; cannot append {day}")
+        _record_fields(fa)
+        current = cells_as_of()
+        changes = _changed(to_cells(fa, day), current)
+        if changes.empty:
+            return 0
+        written = len(changes)
+        path = os.path.join(history_dir(), f"delta-{day}.{ext}")
+        same_day = [p for p in stored if p[0] == day and p[1] == 'delta']
+        if same_day:
+            changes = _latest(_concat([_read(same_day[0][2]), changes]))
+        _write(changes, path)
+
+        deltas = 0
+        for _, kind, _ in reversed(stored):
+            if kind == 'checkpoint':
+                break
+            deltas += 1
+        # A checkpoint already written today has to take the new changes too
+        checkpointed = any(p[0] == day and p[1] == 'checkpoint' for p in stored)
+        if checkpointed or (not same_day and deltas + 1 >= CHECKPOINT_EVERY):
+            _write(_latest(_concat([current, changes])),
+                   os.path.join(history_dir(), f"checkpoint-{day}.{ext}"))
+        return written
+
+
+def _wide(cells, fields=None):
+    """Long cells back to one row per symbol, with text and numeric columns in
+    the order of fields (default: the recorded field order)"""
+    if cells.empty:
+        return pd.DataFrame(columns=['Symbol'] + list(fields or []))
+    cells = cells.assign(Cell=cells['Text'].where(cells['Text'].notna(), cells['Value']))
+    wide = cells.pivot(index='Symbol', columns='Field', values='Cell')
+    wide.columns.name = None
+    order = list(fields) if fields is not None else field_order()
+    # Fields missing from fields.json (histories written before it) go last
+    order = order + [f for f in pd.unique(cells['Field']) if f not in order]
+    wide = wide[[f for f in order if f in wide.columns]].reset_index()
+    has_text = cells['Text'].notna().groupby(cells['Field']).any()
+    for column in wide.columns[1:]:
+        if not has_text[column]:
+            wide[column] = pd.to_numeric(wide[column], errors='coerce')
+    return wide
+
+
+def as_of(day, symbols=None, fields=None):
+    """Fundamentals as they were known on day: one row per symbol, in the same
+    shape as the 'fundamentals' dataset (symbols first seen later are absent)"""
+    return _wide(cells_as_of(day, symbols, fields), fields)
+
+
+def series(field, symbols=None, start=None, end=None):
+    """One numeric field over time as a (date x symbol) frame: the value in
+    force on each day a change was recorded, carried forward between changes"""
+    stored = [p for p in partitions() if p[1] == 'delta']
+    if start is not None:
+        start = pd.Timestamp(start).date()
+        stored = [p for p in stored if p[0] > start]
+    if end is not None:
+        end = pd.Timestamp(end).date()
+        stored = [p for p in stored if p[0] <= end]
+    frames = [_read(path, symbols, [field]) for _, _, path in stored]
+    if start is not None:
+        initial = cells_as_of(start, symbols, [field])
+        frames.insert(0, initial.assign(Date=pd.Timestamp(start)))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    cells = _concat(frames)
+    wide = cells.pivot_table(index='Date', columns='Symbol', values='Value', aggfunc='last')
+    wide.columns.name = None
+    return wide.sort_index().ffill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append to or query the fundamentals history")
+    universe.add_arguments(parser)
+    parser.add_argument('--append', action='store_true', help="record the current 'fundamentals' dataset")
+    parser.add_argument('--import-file', help="record a fundamentals CSV or parquet file (e.g. an old snapshot)")
+    parser.add_argument('--date', help="day the recorded snapshot was taken (default: today)")
+    parser.add_argument('--as-of', help="print the fundamentals known on this day")
+    parser.add_argument('--symbols', nargs='+', help="limit --as-of to these symbols")
+    parser.add_argument('--fields', nargs='+', help="limit --as-of to these columns")
+    args = parser.parse_args()
+
+    data_store.use_universe(universe.from_args(args))
+    if args.append or args.import_file:
+        if args.import_file:
+            fa = pd.read_parquet(args.import_file) if args.import_file.endswith('.parquet') else pd.read_csv(args.import_file)
+        else:
+            fa = data_store.load_dataset('fundamentals')
+        written = append(fa, args.date)
+        print(f"Recorded {written} changed cell(s) for {len(fa)} symbol(s) in {history_dir()}")
+    if args.as_of:
+        print(as_of(args.as_of, args.symbols, args.fields).to_string(index=False))
+    if not (args.append or args.import_file or args.as_of):
+        stored = partitions()
+        deltas = [p for p in stored if p[1] == 'delta']
+        print(f"{len(deltas)} day(s) recorded, {len(stored) - len(deltas)} checkpoint(s)"
+              + (f", {deltas[0][0]} to {deltas[-1][0]}" if deltas else ""))
+
+
+if __name__ == "__main__":
+    main()
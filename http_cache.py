@@ -0,0 +1,237 @@
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import metrics
+
+# Seconds a cached response is served without touching the network, per endpoint
+TTLS = {
+    'nse_index': 24 * 3600,   # index constituents change a few times a year
+    'yf_daily': 3600,         # daily bars
+    'yf_intraday': 60,        # 1-minute bars, matches the quote poller cadence
+    'yf_info': 12 * 3600,     # fundamentals from Ticker.info
+    'newsapi': 1800,
+}
+
+# Path of the shared cache file; set to 'off' to bypass the cache entirely
+CACHE_ENV = 'DASHBOARD_HTTP_CACHE'
+MAX_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+
+
+class Entry:
+    __slots__ = ('value', 'expires_at', 'etag', 'last_modified')
+
+    def __init__(self, value, expires_at, etag, last_modified):
+        self.value = value
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires_at
+
+
+class ResponseCache:
+    """SQLite-backed response cache shared by every process using the same file.
+
+    Entries outlive their TTL so they can be revalidated (ETag /
+    Last-Modified) or served when upstream fails; the least recently used ones
+    are evicted once the file holds more than max_bytes of values.
+    """
+
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    def _connect(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """The stored Entry for key (fresh or not), or None"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at, etag, last_modified FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return Entry(pickle.loads(row[0]), row[1], row[2], row[3])
+
+    def put(self, key, value, ttl, namespace='', etag=None, last_modified=None):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, blob, len(blob), etag, last_modified, now, now + ttl, now),
+            )
+        self._evict()
+
+    def touch(self, key, ttl):
+        """Extend an entry's freshness after a 304 Not Modified"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?", (now + ttl, now, key))
+
+    def _evict(self):
+        conn = self._connect()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        with conn:
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                metrics.inc('http_cache_evictions_total')
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def clear(self, namespace=None):
+        conn = self._connect()
+        with conn:
+            if namespace is None:
+                conn.execute("DELETE FROM responses")
+            else:
+                conn.execute("DELETE FROM responses WHERE namespace = ?", (namespace,))
+
+    def stats(self):
+        """{namespace: (entries, bytes, fresh entries)}"""
+        rows = self._connect().execute(
+            "SELECT namespace, COUNT(*), SUM(size), SUM(expires_at > ?) FROM responses GROUP BY namespace",
+            (time.time(),),
+        ).fetchall()
+        return {ns: (n, size, fresh) for ns, n, size, fresh in rows}
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache():
+    """The process-wide cache (data/http_cache.sqlite unless overridden), or
+    None when caching is switched off"""
+    global _default
+    path = os.environ.get(CACHE_ENV)
+    if path == 'off':
+        return None
+    with _default_lock:
+        if _default is None:
+            if not path:
+                # Imported here: data_store -> universe -> http_cache
+                import data_store
+                path = os.path.join(data_store.DATA_DIR, 'http_cache.sqlite')
+            _default = ResponseCache(path)
+        return _default
+
+
+def make_key(namespace, *parts):
+    """Stable hashed key; keeps API keys and long ticker lists out of the file"""
+    return namespace + ':' + hashlib.sha256(pickle.dumps(parts, protocol=4)).hexdigest()
+
+
+def cached(namespace, ttl=None, should_cache=None):
+    """Cache a function's return value on disk for TTLS[namespace] seconds.
+
+    For library calls (yfinance, nsefetch) where only time-based expiry is
+    possible. Results rejected by should_cache are not stored; if the call
+    raises and an expired entry exists, the expired value is returned.
+    Calling the wrapper with refresh=True skips a fresh entry and replaces it.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, refresh=False, **kwargs):
+            cache = default_cache()
+            if cache is None:
+                return fn(*args, **kwargs)
+            key = make_key(namespace, fn.__qualname__, args, sorted(kwargs.items()))
+            entry = cache.get(key)
+            if entry is not None and entry.fresh and not refresh:
+                metrics.cache_lookup(f'http:{namespace}', True)
+                return entry.value
+            metrics.cache_lookup(f'http:{namespace}', False)
+            try:
+                value = fn(*args, **kwargs)
+            except Exception:
+                if entry is None:
+                    raise
+                metrics.inc('http_cache_stale_served_total', namespace=namespace)
+                return entry.value
+            if should_cache is None or should_cache(value):
+                cache.put(key, value, ttl or TTLS[namespace], namespace)
+            return value
+        return wrapper
+    return decorator
+
+
+def get_json(session, url, params=None, namespace='http', ttl=None, timeout=None):
+    """GET a JSON resource through the cache, revalidating expired entries with
+    If-None-Match / If-Modified-Since when upstream sent validators"""
+    ttl = ttl or TTLS.get(namespace, 600)
+    cache = default_cache()
+    key = make_key(namespace, url, sorted((params or {}).items()))
+    entry = cache.get(key) if cache is not None else None
+    if entry is not None and entry.fresh:
+        metrics.cache_lookup(f'http:{namespace}', True)
+        return entry.value
+    metrics.cache_lookup(f'http:{namespace}', False)
+
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+    with metrics.timer('upstream_seconds', source=namespace):
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=timeout)
+        except Exception:
+            metrics.inc('upstream_requests_total', source=namespace, status='error')
+            raise
+    metrics.inc('upstream_requests_total', source=namespace, status=response.status_code)
+
+    if response.status_code == 304 and entry is not None:
+        cache.touch(key, ttl)
+        return entry.value
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}")
+    value = response.json()
+    if cache is not None:
+        cache.put(
+            key, value, ttl, namespace,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+        )
+    return value
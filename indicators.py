@@ -0,0 +1,423 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+import data_store
+import universe
+
+SMA_WINDOWS = (20, 50)
+EMA_SPANS = (12, 26)
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BB_WINDOW, BB_STD = 20, 2.0
+ATR_PERIOD = 14
+
+INDICATOR_COLUMNS = (
+    [f'SMA_{w}' for w in SMA_WINDOWS] + [f'EMA_{s}' for s in EMA_SPANS]
+    + [f'RSI_{RSI_PERIOD}', 'MACD', 'MACD_Signal', 'MACD_Hist',
+       'BB_Upper', 'BB_Middle', 'BB_Lower', f'ATR_{ATR_PERIOD}', 'OBV']
+)
+
+# Longest trailing window any indicator needs
+TAIL = max(max(SMA_WINDOWS), BB_WINDOW) - 1
+
+# prices_ta is published as data_store.Parts with the last date's rows in a
+# part of their own, so an update rewrites only that part and adds the new
+# dates; a full recompute (which writes two parts) runs once it reaches
+# MAX_PARTS parts
+MAX_PARTS = 64
+
+# All kernels work on float64 arrays shaped (dates, symbols). They loop over
+# dates at most, never over symbols, so every step is one NumPy operation
+# across the whole universe. Each kernel can be resumed from carried-over
+# state and performs exactly the same floating point operations as a full
+# run, which is what keeps incremental updates bit-for-bit identical.
+
+
+def _ema(x, alpha, seed=None):
+    """Exponential moving average y[t] = y[t-1] + alpha * (x[t] - y[t-1]),
+    seeded with the first value; gaps carry the previous average forward"""
+    out = np.empty_like(x)
+    prev = np.full(x.shape[1], np.nan) if seed is None else seed
+    for t in range(x.shape[0]):
+        cur = x[t]
+        prev = np.where(np.isnan(prev), cur, np.where(np.isnan(cur), prev, prev + alpha * (cur - prev)))
+        out[t] = prev
+    return out
+
+
+def _rolling_sum(x, window):
+    """Trailing window sum; NaN until a full window of values is available.
+
+    Each window is summed left to right, so the result for a row depends only
+    on that row's window and not on how much history precedes it.
+    """
+    out = np.full_like(x, np.nan)
+    n = x.shape[0] - window + 1
+    if n <= 0:
+        return out
+    acc = x[0:n].copy()
+    for k in range(1, window):
+        acc += x[k:k + n]
+    out[window - 1:] = acc
+    return out
+
+
+def _rolling_mean(x, window):
+    return _rolling_sum(x, window) / window
+
+
+def _rolling_std(x, window, mean):
+    """Population standard deviation over the trailing window, given its mean"""
+    out = np.full_like(x, np.nan)
+    n = x.shape[0] - window + 1
+    if n <= 0:
+        return out
+    m = mean[window - 1:]
+    acc = (x[0:n] - m) ** 2
+    for k in range(1, window):
+        acc += (x[k:k + n] - m) ** 2
+    out[window - 1:] = np.sqrt(acc / window)
+    return out
+
+
+def _ffill(x):
+    return pd.DataFrame(x).ffill().to_numpy()
+
+
+def _empty_state(n_symbols):
+    nan = np.full(n_symbols, np.nan)
+    state = {
+        'close_tail': np.full((TAIL, n_symbols), np.nan),
+        'last_close': nan.copy(),
+        'signal': nan.copy(),
+        'avg_gain': nan.copy(),
+        'avg_loss': nan.copy(),
+        'atr': nan.copy(),
+        'obv': np.zeros(n_symbols),
+    }
+    for s in set(EMA_SPANS) | {MACD_FAST, MACD_SLOW}:
+        state[f'ema_{s}'] = nan.copy()
+    return state
+
+
+def align_state(state, symbols):
+    """Reorder carried-over state to the given symbol order; symbols the state
+    has never seen start empty, exactly as they would in a full run"""
+    symbols = [str(s) for s in symbols]
+    if state is None:
+        state = {'symbols': [], 'last_date': None, **_empty_state(0)}
+    positions = {s: i for i, s in enumerate(state['symbols'])}
+    target = np.array([j for j, s in enumerate(symbols) if s in positions], dtype=int)
+    source = np.array([positions[symbols[j]] for j in target], dtype=int)
+    aligned = {'symbols': symbols, 'last_date': state['last_date']}
+    for key, values in _empty_state(len(symbols)).items():
+        values[..., target] = state[key][..., source]
+        aligned[key] = values
+    return aligned
+
+
+def compute_indicators(panel, state=None):
+    """Compute all indicators for a {field: DataFrame(date x symbol)} panel.
+
+    With state from a previous call the panel only needs to hold the new bars;
+    the result is identical to recomputing over the whole history. Returns
+    ({column: ndarray(date x symbol)}, new_state). Values are NaN on dates
+    where a symbol has no close.
+    """
+    symbols = panel['Close'].columns
+    state = align_state(state, symbols)
+    close = panel['Close'].to_numpy(dtype=np.float64)
+    high = panel['High'].to_numpy(dtype=np.float64)
+    low = panel['Low'].to_numpy(dtype=np.float64)
+    volume = panel['Volume'].to_numpy(dtype=np.float64)
+    n = close.shape[0]
+
+    # Previous valid close, so a missing day does not break the delta chain
+    filled = _ffill(np.vstack([state['last_close'][None, :], close]))
+    prev_close = filled[:-1]
+    delta = close - prev_close
+
+    # Rolling windows see the carried-over tail followed by the new bars
+    extended = np.vstack([state['close_tail'], close])
+
+    result = {}
+    for w in SMA_WINDOWS:
+        result[f'SMA_{w}'] = _rolling_mean(extended[TAIL - (w - 1):], w)[w - 1:]
+    emas = {s: _ema(close, 2.0 / (s + 1), state[f'ema_{s}']) for s in set(EMA_SPANS) | {MACD_FAST, MACD_SLOW}}
+    for s in EMA_SPANS:
+        result[f'EMA_{s}'] = emas[s].copy()
+
+    # Wilder's RSI
+    gain = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+    loss = np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0))
+    avg_gain = _ema(gain, 1.0 / RSI_PERIOD, state['avg_gain'])
+    avg_loss = _ema(loss, 1.0 / RSI_PERIOD, state['avg_loss'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    result[f'RSI_{RSI_PERIOD}'] = np.where((avg_loss == 0) & ~np.isnan(avg_gain), 100.0, rsi)
+
+    macd = emas[MACD_FAST] - emas[MACD_SLOW]
+    signal = _ema(macd, 2.0 / (MACD_SIGNAL + 1), state['signal'])
+    result['MACD'] = macd
+    result['MACD_Signal'] = signal.copy()
+    result['MACD_Hist'] = macd - signal
+
+    bb_close = extended[TAIL - (BB_WINDOW - 1):]
+    middle = _rolling_mean(bb_close, BB_WINDOW)
+    std = _rolling_std(bb_close, BB_WINDOW, middle)
+    middle, std = middle[BB_WINDOW - 1:], std[BB_WINDOW - 1:]
+    result['BB_Upper'] = middle + BB_STD * std
+    result['BB_Middle'] = middle
+    result['BB_Lower'] = middle - BB_STD * std
+
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    true_range[np.isnan(high) | np.isnan(low)] = np.nan
+    atr = _ema(true_range, 1.0 / ATR_PERIOD, state['atr'])
+    result[f'ATR_{ATR_PERIOD}'] = atr.copy()
+
+    obv_step = np.nan_to_num(np.sign(delta) * volume)
+    obv = np.cumsum(np.vstack([state['obv'][None, :], obv_step]), axis=0)[1:]
+    result['OBV'] = obv.copy()
+
+    missing = np.isnan(close)
+    for values in result.values():
+        values[missing] = np.nan
+
+    new_state = {
+        'symbols': [str(s) for s in symbols],
+        'last_date': panel['Close'].index.max() if n else state['last_date'],
+        'close_tail': extended[-TAIL:],
+        'last_close': filled[-1],
+        'signal': signal[-1] if n else state['signal'],
+        'avg_gain': avg_gain[-1] if n else state['avg_gain'],
+        'avg_loss': avg_loss[-1] if n else state['avg_loss'],
+        'atr': atr[-1] if n else state['atr'],
+        'obv': obv[-1] if n else state['obv'],
+    }
+    for s, values in emas.items():
+        new_state[f'ema_{s}'] = values[-1] if n else state[f'ema_{s}']
+    return result, new_state
+
+
+def state_path():
+    return os.path.join(data_store.DATA_DIR, f"{data_store.PREFIX}_ta_state.npz")
+
+
+def _state_arrays(state, prefix=''):
+    arrays = {prefix + k: v for k, v in state.items() if k not in ('symbols', 'last_date')}
+    arrays[prefix + 'symbols'] = np.array(state['symbols'], dtype=str)
+    arrays[prefix + 'last_date'] = np.array(np.datetime64(state['last_date'], 'ns'))
+    return arrays
+
+
+def _state_from(data, prefix=''):
+    state = {k[len(prefix):]: data[k] for k in data.files
+             if k.startswith(prefix) and k[len(prefix):] in _empty_state(0)}
+    state['symbols'] = data[prefix + 'symbols'].tolist()
+    last_date = pd.Timestamp(data[prefix + 'last_date'].item())
+    state['last_date'] = None if pd.isna(last_date) else last_date
+    return state
+
+
+def save_state(state, previous, counts, bar, ta_version):
+    """Persist the carry-over state after the last processed date and after the
+    date before it, plus what they were built from: per-symbol bar counts up
+    to the earlier date, the last date's OHLCV and the prices_ta version"""
+    tmp = state_path() + '.tmp.npz'
+    np.savez(tmp, counts=counts, last_bar=bar, ta_version=np.array(ta_version),
+             **_state_arrays(state), **_state_arrays(previous, 'prev_'))
+    os.replace(tmp, state_path())
+
+
+def load_state():
+    """The dict saved by save_state (state, previous, counts, last_bar,
+    ta_version), or None"""
+    if not os.path.exists(state_path()):
+        return None
+    with np.load(state_path()) as data:
+        if 'prev_symbols' not in data.files:
+            return None  # written before the previous state was kept
+        return {
+            'state': _state_from(data),
+            'previous': _state_from(data, 'prev_'),
+            'counts': data['counts'],
+            'last_bar': data['last_bar'],
+            'ta_version': int(data['ta_version']),
+        }
+
+
+def bar_counts(prices, symbols, until):
+    """Number of stored bars per symbol up to and including `until`"""
+    if until is None:
+        return np.zeros(len(symbols), dtype=np.int64)
+    counts = prices[prices['Date'] <= until].groupby('Symbol', observed=True).size()
+    counts.index = counts.index.astype(str)
+    return counts.reindex([str(s) for s in symbols], fill_value=0).to_numpy()
+
+
+def last_bar(prices, symbols, day):
+    """(field x symbol) OHLCV of one date, NaN where a symbol has no bar"""
+    rows = prices[prices['Date'] == day]
+    rows = rows.assign(Symbol=rows['Symbol'].astype(str)).set_index('Symbol')
+    return rows[data_store.PRICE_FIELDS].reindex([str(s) for s in symbols]).to_numpy(dtype=np.float64).T
+
+
+def to_long(panel, indicators):
+    """Flatten the OHLCV panel plus indicator arrays into long-format rows"""
+    dates = panel['Close'].index.to_numpy()
+    symbols = panel['Close'].columns.to_numpy()
+    n_dates, n_symbols = len(dates), len(symbols)
+    columns = {
+        'Date': np.repeat(dates, n_symbols),
+        'Symbol': np.tile(symbols, n_dates),
+    }
+    for field in data_store.PRICE_FIELDS:
+        if field in panel:
+            columns[field] = panel[field].to_numpy().ravel()
+    for name in INDICATOR_COLUMNS:
+        columns[name] = indicators[name].ravel()
+    long = pd.DataFrame(columns)
+    return long[long['Close'].notna()].reset_index(drop=True)
+
+
+def build_ta_dataset(prices, state=None):
+    """Long-format prices in, (long-format prices with indicators, state) out"""
+    panel = data_store.long_to_panel(prices, data_store.PRICE_FIELDS)
+    if state is not None:
+        # Keep symbols the state knows about even if they have no new bars
+        columns = list(state['symbols']) + [c for c in panel['Close'].columns if c not in set(state['symbols'])]
+        panel = {field: frame.reindex(columns=columns) for field, frame in panel.items()}
+    indicators, new_state = compute_indicators(panel, state)
+    return to_long(panel, indicators), new_state
+
+
+def _split_build(prices, state=None):
+    """build_ta_dataset with the last date's rows kept apart: returns (rows
+    before the last date, last date rows, state before it, final state)"""
+    last = prices['Date'].max()
+    head, previous = build_ta_dataset(prices[prices['Date'] < last], state)
+    tail, new_state = build_ta_dataset(prices[prices['Date'] == last], previous)
+    return head, tail, previous, new_state
+
+
+def _recompute_reason(prices, saved):
+    """Why the saved state cannot be resumed from, or None if it can"""
+    if saved is None:
+        return "no saved state"
+    current = data_store.dataset_version('prices_ta')
+    if current is None or current[1] != saved['ta_version'] or not current[2].endswith('.parts'):
+        return "prices_ta was published without this state"
+    state, previous = saved['state'], saved['previous']
+    if set(prices['Symbol'].astype(str).unique()) != set(state['symbols']):
+        return "the set of symbols changed"
+    if not np.array_equal(bar_counts(prices, previous['symbols'], previous['last_date']), saved['counts']):
+        return "stored prices changed before the last processed date"
+    if len(data_store.dataset_parts('prices_ta')) >= MAX_PARTS:
+        return f"prices_ta has {MAX_PARTS} parts; compacting"
+    return None
+
+
+def update_ta_dataset(prices, full=False):
+    """Bring prices_ta up to date with the stored prices.
+
+    The last date is recomputed together with any newer ones, resuming from
+    the state saved one date earlier, since its bar may have been stored
+    mid-session and revised since. Falls back to a full recompute when there
+    is no usable state, the symbols changed, or bars were added or revised
+    before the last date.
+    """
+    saved = None if full else load_state()
+    reason = "--full" if full else _recompute_reason(prices, saved)
+    if reason is None:
+        state, previous = saved['state'], saved['previous']
+        last_date = state['last_date']
+        revised = not np.array_equal(last_bar(prices, state['symbols'], last_date), saved['last_bar'], equal_nan=True)
+        if not revised and not (prices['Date'] > last_date).any():
+            print("Indicators are already up to date")
+            return None
+        head, tail, previous, new_state = _split_build(prices[prices['Date'] >= last_date], previous)
+        # The old last date's part is replaced; everything before it is kept as is
+        ta = data_store.Parts([head, tail], keep=data_store.dataset_parts('prices_ta')[:-1])
+        print(f"Computed {len(head) + len(tail)} row(s) incrementally")
+    else:
+        print(f"Recomputing all indicators ({reason})")
+        head, tail, previous, new_state = _split_build(prices)
+        ta = data_store.Parts([head, tail])
+
+    path = data_store.save_dataset(ta, 'prices_ta')
+    save_state(new_state, previous,
+               bar_counts(prices, previous['symbols'], previous['last_date']),
+               last_bar(prices, new_state['symbols'], new_state['last_date']),
+               data_store.dataset_version('prices_ta')[1])
+    return path
+
+
+def _mismatches(expected, actual):
+    """Value columns that differ between two prices_ta frames matched on
+    (Symbol, Date); ['rows'] if they do not hold the same bars"""
+    key = ['Symbol', 'Date']
+    frames = [f.assign(Symbol=f['Symbol'].astype(str), Date=pd.to_datetime(f['Date']).astype('datetime64[ns]'))
+              .sort_values(key).reset_index(drop=True) for f in (expected, actual)]
+    expected, actual = frames
+    if len(expected) != len(actual) or not expected[key].equals(actual[key]):
+        return ['rows']
+    return [
+        col for col in data_store.PRICE_FIELDS + INDICATOR_COLUMNS
+        if not np.array_equal(expected[col].to_numpy(dtype=np.float64), actual[col].to_numpy(dtype=np.float64),
+                              equal_nan=True)
+    ]
+
+
+def verify_incremental(prices, n_new=5):
+    """Check that an update adding the last n_new dates matches a full
+    recompute exactly, with the bar before them revised since it was
+    processed (as a bar saved mid-session is); returns the columns that
+    differ"""
+    dates = np.sort(prices['Date'].unique())
+    if len(dates) <= n_new + 1:
+        raise ValueError("not enough history to split")
+    split = dates[-n_new - 1]
+    full, _ = build_ta_dataset(prices)
+    stale = prices[prices['Date'] <= split].copy()
+    stale.loc[stale['Date'] == split, 'Close'] *= 0.99
+    _, _, previous, _ = _split_build(stale)
+    head, tail, _, _ = _split_build(prices[prices['Date'] >= split], previous)
+    return _mismatches(full[full['Date'] >= split], pd.concat([head, tail], ignore_index=True))
+
+
+def verify_stored(prices):
+    """Compare the published prices_ta with a full recompute from prices;
+    returns the columns that differ"""
+    full, _ = build_ta_dataset(prices)
+    return _mismatches(full, data_store.load_dataset('prices_ta'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute technical indicators for all stored symbols")
+    universe.add_arguments(parser)
+    parser.add_argument('--full', action='store_true', help="ignore saved state and recompute the whole history")
+    parser.add_argument('--verify', action='store_true', help="check incremental updates against a full recompute")
+    args = parser.parse_args()
+
+    data_store.use_universe(universe.from_args(args))
+    start = time.perf_counter()
+    prices = data_store.load_dataset('prices')
+    if args.verify:
+        mismatched = verify_incremental(prices)
+        print("Incremental update matches full recompute" if not mismatched
+              else f"Incremental update mismatch in: {', '.join(mismatched)}")
+        if data_store.dataset_exists('prices_ta'):
+            mismatched = verify_stored(prices)
+            print("Stored prices_ta matches full recompute" if not mismatched
+                  else f"Stored prices_ta mismatch in: {', '.join(mismatched)}")
+        return
+
+    path = update_ta_dataset(prices, full=args.full)
+    if path:
+        print(f"Indicators updated in {time.perf_counter() - start:.2f}s; saved to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import argparse
+import heapq
+import threading
+import time
+import pandas as pd
+import yfinance as yf
+import data_store
+import market_calendar
+import universe
+
+# Columns of a minute-bar frame (long format, one row per symbol and minute)
+BAR_COLUMNS = ['Date', 'Symbol', 'Open', 'High', 'Low', 'Close', 'Volume']
+CHUNK_SIZE = 200
+# Longest wait between live polls after repeated failures (seconds)
+MAX_BACKOFF = 600
+
+
+class SymbolState:
+    """Running session statistics for one symbol, updated in O(1) per bar.
+
+    A bar with the same timestamp as the previous one replaces it (the live
+    feed re-sends the still-forming minute); older bars are ignored.
+    """
+
+    __slots__ = ('session', 'open', 'high', 'low', 'last', 'volume', 'turnover',
+                 'last_time', 'last_volume', 'last_turnover')
+
+    def __init__(self):
+        self.session = None
+        self.reset()
+
+    def reset(self):
+        self.open = self.high = self.low = self.last = None
+        self.volume = self.turnover = 0.0
+        self.last_time = None
+        self.last_volume = self.last_turnover = 0.0
+
+    def update(self, ts, open_, high, low, close, volume):
+        if close != close:  # NaN bar
+            return False
+        session = ts.date()
+        if session != self.session:
+            self.reset()
+            self.session = session
+        if self.last_time is not None:
+            if ts < self.last_time:
+                return False
+            if ts == self.last_time:
+                self.volume -= self.last_volume
+                self.turnover -= self.last_turnover
+        volume = 0.0 if volume != volume else float(volume)
+        if self.open is None:
+            self.open = float(open_)
+        self.high = high if self.high is None else max(self.high, high)
+        self.low = low if self.low is None else min(self.low, low)
+        self.last = float(close)
+        # VWAP on the bar's typical price
+        turnover = volume * (high + low + close) / 3
+        self.volume += volume
+        self.turnover += turnover
+        self.last_time, self.last_volume, self.last_turnover = ts, volume, turnover
+        return True
+
+    @property
+    def return_pct(self):
+        if not self.open or self.last is None:
+            return None
+        return (self.last - self.open) / self.open * 100
+
+    @property
+    def vwap(self):
+        return self.turnover / self.volume if self.volume else None
+
+    def quote(self):
+        """Same keys as quotes.quote_from_bars, plus the running extremes and VWAP"""
+        return {'open': self.open, 'close': self.last, 'return': self.return_pct,
+                'high': self.high, 'low': self.low, 'vwap': self.vwap, 'volume': self.volume}
+
+
+class Leaderboard:
+    """Symbols ranked by return. Updates push onto a max-heap and outdated
+    entries are dropped lazily, so reading the leader is O(1) amortized."""
+
+    def __init__(self):
+        self._current = {}
+        self._heap = []
+
+    def update(self, symbol, value):
+        self._current[symbol] = value
+        if value is not None:
+            heapq.heappush(self._heap, (-value, symbol))
+        if len(self._heap) > 4 * len(self._current) + 64:
+            self._heap = [(-v, s) for s, v in self._current.items() if v is not None]
+            heapq.heapify(self._heap)
+
+    def best(self):
+        """(symbol, return) of the leader, or None"""
+        while self._heap:
+            value, symbol = self._heap[0]
+            if self._current.get(symbol) == -value:
+                return symbol, -value
+            heapq.heappop(self._heap)
+        return None
+
+    def top(self, n, symbols=None):
+        items = self._current.items() if symbols is None else ((s, self._current.get(s)) for s in symbols)
+        return heapq.nlargest(n, ((s, v) for s, v in items if v is not None), key=lambda item: item[1])
+
+
+def replay(bars, speed=None):
+    """Play stored minute bars back in time order, one batch per minute.
+
+    speed is market seconds per wall-clock second (60 plays a minute per
+    second); None replays as fast as the consumer can take it.
+    """
+    previous = None
+    for ts, batch in bars.sort_values('Date').groupby('Date', sort=False):
+        if speed and previous is not None:
+            time.sleep((ts - previous).total_seconds() / speed)
+        previous = ts
+        yield list(batch[BAR_COLUMNS].itertuples(index=False, name=None))
+
+
+def download_minute_bars(symbols):
+    """Today's 1-minute bars for symbols as a long frame"""
+    frames = []
+    for chunk in universe.chunks(list(symbols), CHUNK_SIZE):
+        data = yf.download([f"{s}.NS" for s in chunk], period="1d", interval="1m",
+                           group_by='ticker', progress=False, threads=True)
+        if data.empty:
+            continue
+        if not isinstance(data.columns, pd.MultiIndex):
+            data = pd.concat({f"{chunk[0]}.NS": data}, axis=1)
+        frames.append(data_store.wide_to_long(data))
+    if not frames:
+        return pd.DataFrame(columns=BAR_COLUMNS)
+    return pd.concat(frames, ignore_index=True).astype({'Symbol': str})
+
+
+def poll_live(get_symbols, interval=60, on_error=None):
+    """Live source: polls 1-minute bars during NSE sessions and yields bars at
+    or after the last one seen per symbol (the newest minute is re-sent while
+    it is still forming).
+
+    A failed poll is passed to on_error and retried after a wait that doubles
+    with each consecutive failure, up to MAX_BACKOFF seconds.
+    """
+    seen = {}
+    failures = 0
+    while True:
+        if market_calendar.is_open():
+            try:
+                bars = download_minute_bars(get_symbols())
+            except Exception as e:
+                failures += 1
+                if on_error is not None:
+                    on_error(e)
+                time.sleep(min(interval * 2 ** failures, MAX_BACKOFF))
+                continue
+            failures = 0
+            if not bars.empty:
+                last = pd.DataFrame({'Symbol': pd.Series(list(seen), dtype=object),
+                                     'Seen': pd.Series(list(seen.values()), dtype=bars['Date'].dtype)})
+                bars = bars.merge(last, on='Symbol', how='left')
+                fresh = bars[bars['Seen'].isna() | (bars['Date'] >= bars['Seen'])]
+                seen.update(fresh.groupby('Symbol')['Date'].max().to_dict())
+                yield list(fresh.sort_values('Date')[BAR_COLUMNS].itertuples(index=False, name=None))
+        time.sleep(interval)
+
+
+class IntradayStream:
+    """Consumes a bar source on a daemon thread and keeps per-symbol session
+    state plus a return leaderboard.
+
+    Offers the same start/stop/set_symbols/snapshot interface as
+    quotes.QuotePoller, so the dashboard can use either.
+    """
+
+    def __init__(self, source, symbols=()):
+        self.source = source
+        self.symbols = list(symbols)
+        self.updated_at = None
+        self.last_error = None
+        self.bars_seen = 0
+        # Set once the source is exhausted (a replay that reached its end)
+        self.finished = False
+        self._states = {}
+        self._board = Leaderboard()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def live(cls, symbols, interval=60):
+        stream = cls(None, symbols)
+        stream.source = poll_live(lambda: stream.symbols, interval, on_error=stream._record_error)
+        return stream
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="intraday-stream", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def set_symbols(self, symbols):
+        self.symbols = list(symbols)
+
+    @property
+    def alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _record_error(self, e):
+        self.last_error = f"{type(e).__name__}: {e}"
+
+    def _run(self):
+        # A bad batch is skipped; only an error raised by the source itself
+        # (which ends a generator) stops the thread
+        try:
+            for batch in self.source:
+                if self._stop.is_set():
+                    return
+                try:
+                    self.apply(batch)
+                except Exception as e:
+                    self._record_error(e)
+                else:
+                    self.last_error = None
+        except Exception as e:
+            self._record_error(e)
+            return
+        self.finished = not self._stop.is_set()
+
+    def apply(self, batch):
+        """Fold a batch of (Date, Symbol, Open, High, Low, Close, Volume) bars into the state"""
+        with self._lock:
+            for ts, symbol, open_, high, low, close, volume in batch:
+                state = self._states.get(symbol)
+                if state is None:
+                    state = self._states[symbol] = SymbolState()
+                if state.update(ts, open_, high, low, close, volume):
+                    self._board.update(symbol, state.return_pct)
+            self.bars_seen += len(batch)
+            self.updated_at = time.time()
+
+    def snapshot(self, symbols=None):
+        with self._lock:
+            if symbols is None:
+                return {s: state.quote() for s, state in self._states.items()}
+            return {s: self._states[s].quote() for s in symbols if s in self._states}
+
+    def best(self):
+        with self._lock:
+            return self._board.best()
+
+    def leaderboard(self, n=10, symbols=None):
+        """Top n (symbol, return) pairs, optionally among some symbols only"""
+        with self._lock:
+            return self._board.top(n, symbols)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream intraday bars and print the return leaderboard")
+    universe.add_arguments(parser)
+    parser.add_argument('--replay', help="play back a stored minute-bar file instead of the live feed")
+    parser.add_argument('--speed', type=float, help="replay speed in market seconds per second (default: as fast as possible)")
+    parser.add_argument('--record', help="save today's minute bars for the universe to this parquet file and exit")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    data_store.use_universe(universe.from_args(args))
+    if args.record:
+        bars = download_minute_bars(data_store.load_symbols())
+        bars.to_parquet(args.record, index=False)
+        print(f"Saved {len(bars)} minute bar(s) to {args.record}")
+        return
+
+    if args.replay:
+        stream = IntradayStream(replay(pd.read_parquet(args.replay), args.speed))
+    else:
+        stream = IntradayStream.live(data_store.load_symbols())
+    start = time.perf_counter()
+    stream.start()
+    try:
+        while stream._thread.is_alive():
+            stream._thread.join(5)
+            for symbol, value in stream.leaderboard(args.top):
+                print(f"{symbol:<12} {value:7.2f}%")
+            print()
+    except KeyboardInterrupt:
+        stream.stop()
+    print(f"{stream.bars_seen} bar(s) in {time.perf_counter() - start:.2f}s")
+    if stream.last_error:
+        print(f"Stream stopped: {stream.last_error}")
+
+
+if __name__ == "__main__":
+    main()
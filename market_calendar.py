@@ -0,0 +1,46 @@
+import os
+from datetime import datetime, time, timedelta, timezone
+
+IST = timezone(timedelta(hours=5, minutes=30), 'IST')
+SESSION_OPEN = time(9, 15)
+SESSION_CLOSE = time(15, 30)
+
+# Optional file of exchange holidays, one YYYY-MM-DD per line
+HOLIDAYS_ENV = 'DASHBOARD_HOLIDAYS_FILE'
+
+
+def load_holidays(path=None):
+    path = path or os.environ.get(HOLIDAYS_ENV)
+    if not path or not os.path.exists(path):
+        return frozenset()
+    with open(path) as f:
+        return frozenset(datetime.strptime(line.strip(), '%Y-%m-%d').date() for line in f if line.strip())
+
+
+HOLIDAYS = load_holidays()
+
+
+def now_ist():
+    return datetime.now(IST)
+
+
+def is_trading_day(day, holidays=None):
+    holidays = HOLIDAYS if holidays is None else holidays
+    return day.weekday() < 5 and day not in holidays
+
+
+def is_open(now=None, holidays=None):
+    """True during the NSE cash session (09:15-15:30 IST on trading days)"""
+    now = (now or now_ist()).astimezone(IST)
+    return is_trading_day(now.date(), holidays) and SESSION_OPEN <= now.time() < SESSION_CLOSE
+
+
+def last_close(now=None, holidays=None):
+    """Date of the most recent session that has already closed"""
+    now = (now or now_ist()).astimezone(IST)
+    day = now.date()
+    if now.time() < SESSION_CLOSE:
+        day -= timedelta(days=1)
+    while not is_trading_day(day, holidays):
+        day -= timedelta(days=1)
+    return day
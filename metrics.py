@@ -0,0 +1,183 @@
+import bisect
+import functools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds (Prometheus 'le' labels)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_counters = {}
+_histograms = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Add value to a counter"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    """Record one duration in a histogram"""
+    key = _key(name, labels)
+    i = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        hist[0][i] += 1
+        hist[1] += seconds
+        hist[2] += 1
+
+
+class timer:
+    """Time a block or a function into a histogram:
+
+        with metrics.timer('data_load_seconds', dataset='prices_ta'):
+            ...
+
+        @metrics.timer('section_render_seconds', section='valuation')
+        def render(): ...
+    """
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self._start, **self.labels)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self:
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def cache_lookup(cache, hit, count=1):
+    if count:
+        inc('cache_lookups_total', count, cache=cache, result='hit' if hit else 'miss')
+
+
+def track_cache(cache):
+    """Count hits and misses of a st.cache_* function.
+
+    Apply above the st.cache decorator; the cached body must call cache_miss(),
+    which only runs when the cache misses.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            _local.missed = False
+            result = fn(*args, **kwargs)
+            cache_lookup(cache, not _local.missed)
+            return result
+        if hasattr(fn, 'clear'):
+            wrapper.clear = fn.clear  # keep st.cache's clear()
+        return wrapper
+    return decorator
+
+
+def cache_miss():
+    _local.missed = True
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def snapshot():
+    """All metrics as plain data: {'counters': [...], 'histograms': [...]}"""
+    with _lock:
+        counters = [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in sorted(_counters.items())]
+        histograms = [
+            {'name': n, 'labels': dict(l), 'count': h[2], 'sum': h[1],
+             'buckets': dict(zip([str(b) for b in BUCKETS] + ['+Inf'], h[0]))}
+            for (n, l), h in sorted(_histograms.items())
+        ]
+    return {'counters': counters, 'histograms': histograms}
+
+
+def quantile(buckets, q):
+    """Approximate quantile from cumulative bucket counts (upper bound of the bucket)"""
+    total = sum(buckets.values())
+    if not total:
+        return None
+    seen = 0
+    for bound, n in buckets.items():
+        seen += n
+        if seen >= q * total:
+            return float('inf') if bound == '+Inf' else float(bound)
+    return None
+
+
+def _labels_text(labels, extra=()):
+    items = list(labels.items()) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in items) + '}'
+
+
+def prometheus_text():
+    """Metrics in the Prometheus text exposition format"""
+    snap = snapshot()
+    lines = []
+    typed = set()
+    for c in snap['counters']:
+        if c['name'] not in typed:
+            lines.append(f"# TYPE {c['name']} counter")
+            typed.add(c['name'])
+        lines.append(f"{c['name']}{_labels_text(c['labels'])} {c['value']}")
+    for h in snap['histograms']:
+        if h['name'] not in typed:
+            lines.append(f"# TYPE {h['name']} histogram")
+            typed.add(h['name'])
+        cumulative = 0
+        for bound, n in h['buckets'].items():
+            cumulative += n
+            lines.append(f"{h['name']}_bucket{_labels_text(h['labels'], [('le', bound)])} {cumulative}")
+        lines.append(f"{h['name']}_sum{_labels_text(h['labels'])} {h['sum']:.6f}")
+        lines.append(f"{h['name']}_count{_labels_text(h['labels'])} {h['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith('/metrics.json'):
+            body, content_type = json.dumps(snapshot()).encode(), 'application/json'
+        elif self.path.startswith('/metrics'):
+            body, content_type = prometheus_text().encode(), 'text/plain; version=0.0.4'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port, host='0.0.0.0'):
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+import http_cache
+import metrics
+
+NEWSAPI_URL = "https://newsapi.org/v2/everything"
+
+# Keywords for Indian market news
+KEYWORDS = ["Nifty 50", "Sensex", "BSE", "NSE", "Indian stock market", "Indian economy"]
+
+_session = None
+_session_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="news")
+
+# Each keyword's result is reused for OK_TTL seconds; a keyword that failed
+# or timed out is not asked again for FAILURE_TTL seconds, so an outage (or
+# a bad API key) costs one request per keyword per minute
+OK_TTL = 3600
+FAILURE_TTL = 60
+_results = {}
+_results_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide HTTP session so connections are pooled and kept alive"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def _query(session, url, keyword, api_key, timeout, page_size):
+    params = {
+        'q': keyword,
+        'language': 'en',
+        'sortBy': 'publishedAt',
+        'pageSize': page_size,
+        'apiKey': api_key
+    }
+    data = http_cache.get_json(session, url, params, namespace='newsapi', timeout=timeout)
+    return [
+        {
+            'title': article.get('title', ''),
+            'description': article.get('description', ''),
+            'url': article.get('url', ''),
+            'publishedAt': article.get('publishedAt', ''),
+            'source': (article.get('source') or {}).get('name', ''),
+            'keyword': keyword
+        }
+        for article in data.get('articles', [])
+    ]
+
+
+def fetch_news(keywords, api_key, url=NEWSAPI_URL, deadline=8.0, timeout=5.0, page_size=5, session=None):
+    """Query all keywords concurrently and return whatever arrives in time.
+
+    Returns (articles, status) where status maps each keyword to 'ok',
+    'timeout' or an error message. Articles keep the keyword order, so the
+    result does not depend on which request finished first. Keywords with a
+    remembered result (see OK_TTL and FAILURE_TTL) are not queried.
+    """
+    session = session or get_session()
+    now = time.monotonic()
+    with _results_lock:
+        results = {k: _results[(url, api_key, k)][1:] for k in keywords
+                   if (url, api_key, k) in _results and _results[(url, api_key, k)][0] > now}
+    metrics.cache_lookup('news_feed', True, len(results))
+    metrics.cache_lookup('news_feed', False, len(keywords) - len(results))
+    futures = {
+        keyword: _pool.submit(_query, session, url, keyword, api_key, timeout, page_size)
+        for keyword in keywords if keyword not in results
+    }
+    if futures:
+        wait(futures.values(), timeout=deadline)
+
+    fetched = {}
+    for keyword, future in futures.items():
+        if not future.done():
+            future.cancel()
+            fetched[keyword] = ([], 'timeout')
+            continue
+        try:
+            fetched[keyword] = (future.result(), 'ok')
+        except Exception as e:
+            fetched[keyword] = ([], str(e))
+    done = time.monotonic()
+    with _results_lock:
+        for keyword, (found, state) in fetched.items():
+            ttl = OK_TTL if state == 'ok' else FAILURE_TTL
+            _results[(url, api_key, keyword)] = (done + ttl, found, state)
+    results.update(fetched)
+
+    articles = []
+    status = {}
+    for keyword in keywords:
+        found, status[keyword] = results[keyword]
+        articles.extend(found)
+    return articles, status
+
+
+def clear_cache():
+    """Forget remembered results, so the next fetch_news queries every keyword"""
+    with _results_lock:
+        _results.clear()
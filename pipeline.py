@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+import data_store
+import market_calendar
+import metrics
+import universe
+
+
+class Stage:
+    """One pipeline step.
+
+    inputs(pipeline) returns a JSON-able fingerprint of everything the stage
+    reads (dataset versions, the trading day); the stage is skipped when it
+    matches the fingerprint of its last successful run. when(pipeline), if
+    given, gates the stage on the clock (e.g. market hours).
+    """
+
+    def __init__(self, name, run, deps=(), inputs=None, when=None):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.inputs = inputs or (lambda p: None)
+        self.when = when
+
+
+def _version(name):
+    v = data_store.dataset_version(name)
+    return None if v is None else list(v[:2])
+
+
+def _symbols(p):
+    import fetch_data
+    fetch_data.update_symbols(p.universe)
+
+
+def _prices(p):
+    import fetch_data
+    fetch_data.update_prices(data_store.load_symbols(), period=p.period)
+
+
+def _index_prices(p):
+    import fetch_data
+    prices = data_store.load_dataset('prices', columns=['Date'])
+    fetch_data.update_index_prices(prices['Date'].min())
+
+
+def _indicators(p):
+    import indicators
+    indicators.update_ta_dataset(data_store.load_dataset('prices'))
+
+
+def _fundamentals(p):
+    import fundamental_analysis
+    rows, failures = fundamental_analysis.fetch_fundamentals(data_store.load_symbols(), max_workers=p.workers)
+    fundamental_analysis.print_failure_report(failures)
+    if not rows:
+        raise RuntimeError("no fundamentals fetched")
+    fundamental_analysis.publish_fundamentals(rows)
+
+
+def _aggregates(p):
+    import aggregates
+    fa = data_store.load_dataset('fundamentals')
+    if aggregates.stored_versions(fa, data_store.snapshot()) is not None:
+        print("Aggregates are already current")
+        return
+    aggregates.update_aggregates(fa)
+
+
+def _intraday(p):
+    # Warms the shared response cache so dashboard quote polls are served
+    # from disk; the same symbol list gives the same chunk keys
+    import quotes
+    quotes.download_intraday(quotes.universe_symbols())
+
+
+STAGES = [
+    # Constituents change rarely: once per calendar day
+    Stage('symbols', _symbols, inputs=lambda p: str(market_calendar.now_ist().date())),
+    # Daily bars are final once the session has closed
+    Stage('prices', _prices, ['symbols'], inputs=lambda p: [_version('symbols'), str(market_calendar.last_close())]),
+    Stage('index_prices', _index_prices, ['prices'], inputs=lambda p: _version('prices')),
+    Stage('indicators', _indicators, ['prices'], inputs=lambda p: _version('prices')),
+    Stage('fundamentals', _fundamentals, ['symbols'],
+          inputs=lambda p: [_version('symbols'), str(market_calendar.now_ist().date())]),
+    Stage('aggregates', _aggregates, ['fundamentals'], inputs=lambda p: _version('fundamentals')),
+    Stage('intraday', _intraday, ['symbols'], inputs=lambda p: int(time.time() // p.intraday_interval),
+          when=lambda p: market_calendar.is_open()),
+]
+
+
+class Pipeline:
+    """Runs STAGES as a DAG: a stage starts once its dependencies have finished,
+    independent stages run in parallel, and stages whose inputs are unchanged
+    since their last successful run are skipped."""
+
+    def __init__(self, u, stages=STAGES, period="6mo", workers=8, intraday_interval=60, max_parallel=3):
+        self.universe = u
+        self.stages = {stage.name: stage for stage in stages}
+        self.period = period
+        self.workers = workers
+        self.intraday_interval = intraday_interval
+        self.max_parallel = max_parallel
+
+    def state_path(self):
+        return os.path.join(data_store.DATA_DIR, f"{data_store.PREFIX}_pipeline_state.json")
+
+    def load_state(self):
+        try:
+            with open(self.state_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_state(self, state):
+        os.makedirs(data_store.DATA_DIR, exist_ok=True)
+        tmp = self.state_path() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=1)
+        os.replace(tmp, self.state_path())
+
+    def run_once(self, only=None, force=False):
+        """Run every due stage once; returns {stage: {'status', 'duration', ...}}.
+
+        Status is 'ok', 'failed', 'skipped' (inputs unchanged), 'closed'
+        (outside its time window) or 'blocked' (a dependency failed). Stages
+        outside `only` are treated as already satisfied.
+        """
+        names = [n for n in self.stages if only is None or n in only]
+        state = self.load_state()
+        results = {}
+        running = {}
+        pending = list(names)
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="stage") as pool:
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    deps = [d for d in stage.deps if d in names]
+                    if any(d not in results for d in deps):
+                        continue
+                    pending.remove(name)
+                    if any(results[d]['status'] in ('failed', 'blocked') for d in deps):
+                        results[name] = {'status': 'blocked', 'duration': 0.0}
+                    elif stage.when is not None and not stage.when(self):
+                        results[name] = {'status': 'closed', 'duration': 0.0}
+                    else:
+                        inputs = stage.inputs(self)
+                        if not force and state.get(name, {}).get('inputs') == inputs:
+                            results[name] = {'status': 'skipped', 'duration': 0.0}
+                        else:
+                            running[pool.submit(self._run_stage, stage)] = (name, inputs)
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, inputs = running.pop(future)
+                    results[name] = future.result()
+                    if results[name]['status'] == 'ok':
+                        state[name] = {'inputs': inputs, **results[name]}
+                    else:
+                        state.setdefault(name, {}).update(last_error=results[name]['error'])
+                    self._save_state(state)
+
+        for name, result in results.items():
+            metrics.inc('pipeline_stage_runs_total', stage=name, status=result['status'])
+        return {name: results[name] for name in names}
+
+    def _run_stage(self, stage):
+        start = time.perf_counter()
+        try:
+            stage.run(self)
+            result = {'status': 'ok'}
+        except Exception as e:
+            result = {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+        result['duration'] = time.perf_counter() - start
+        result['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        metrics.observe('pipeline_stage_seconds', result['duration'], stage=stage.name)
+        return result
+
+    def run_forever(self, interval=60, only=None):
+        while True:
+            print_results(self.run_once(only))
+            time.sleep(interval)
+
+
+def print_results(results):
+    for name, result in results.items():
+        line = f"{name:<13} {result['status']:<8} {result['duration']:8.2f}s"
+        if result.get('error'):
+            line += f"  {result['error']}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh symbols, prices, indicators and fundamentals as one pipeline")
+    universe.add_arguments(parser)
+    parser.add_argument('--once', action='store_true', help="run due stages once and exit instead of looping")
+    parser.add_argument('--stages', nargs='+', choices=[s.name for s in STAGES], help="only run these stages")
+    parser.add_argument('--force', action='store_true', help="run stages even if their inputs are unchanged")
+    parser.add_argument('--interval', type=float, default=60, help="seconds between scheduler ticks")
+    parser.add_argument('--period', default="6mo", help="price history for tickers with no stored data")
+    parser.add_argument('--workers', type=int, default=8, help="concurrent fundamentals requests")
+    parser.add_argument('--status', action='store_true', help="print the last run of every stage and exit")
+    parser.add_argument('--metrics-port', type=int, help="serve /metrics and /metrics.json on this port")
+    args = parser.parse_args()
+
+    u = universe.from_args(args)
+    data_store.use_universe(u)
+    pipeline = Pipeline(u, period=args.period, workers=args.workers)
+    if args.status:
+        for name, entry in pipeline.load_state().items():
+            print(f"{name:<13} last ok {entry.get('finished_at', '-'):<20} {entry.get('duration', 0):8.2f}s"
+                  + (f"  last error: {entry['last_error']}" if entry.get('last_error') else ""))
+        return
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    if args.once:
+        print_results(pipeline.run_once(args.stages, force=args.force))
+    else:
+        if args.force:
+            print_results(pipeline.run_once(args.stages, force=True))
+        pipeline.run_forever(args.interval, args.stages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+TRADING_DAYS = 252
+# Rolling correlation matrices are computed for at most this many window end
+# dates, and fewer for wide selections so that windows x symbols^2 stays
+# under MAX_CELLS (24 windows for 500 symbols). WINDOW_BATCH windows are
+# stacked at a time to bound memory.
+MAX_WINDOWS = 60
+MAX_CELLS = 6_000_000
+WINDOW_BATCH = 8
+
+# Everything below works on float64 arrays shaped (dates, symbols) with NaN
+# for missing bars. Rolling statistics use pairwise-complete observations:
+# a window only counts the days on which both series have a return.
+
+
+def simple_returns(close):
+    """Day-over-day returns; the first row (and any day after a gap) is NaN"""
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(close.shape, np.nan)
+    out[1:] = close[1:] / close[:-1] - 1
+    return out
+
+
+def _rolling_sum(a, window):
+    """Sum over the trailing window along axis 0; NaN until the window is full"""
+    out = np.full(a.shape, np.nan)
+    if len(a) < window:
+        return out
+    c = np.cumsum(a, axis=0)
+    out[window - 1] = c[window - 1]
+    out[window:] = c[window:] - c[:-window]
+    return out
+
+
+def _min_periods(window):
+    return max(3, window // 2)
+
+
+def rolling_volatility(returns, window, annualize=True):
+    """Rolling standard deviation of returns, annualized by sqrt(252) by default"""
+    present = ~np.isnan(returns)
+    r = np.where(present, returns, 0.0)
+    n = _rolling_sum(present.astype(np.float64), window)
+    s1 = _rolling_sum(r, window)
+    s2 = _rolling_sum(r * r, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        var = (s2 - s1 * s1 / n) / (n - 1)
+    vol = np.sqrt(np.clip(var, 0, None))
+    vol[n < _min_periods(window)] = np.nan
+    return vol * np.sqrt(TRADING_DAYS) if annualize else vol
+
+
+def rolling_beta(returns, market, window):
+    """Rolling beta of every column of returns against the market return series"""
+    market = np.asarray(market, dtype=np.float64)[:, None]
+    present = ~np.isnan(returns) & ~np.isnan(market)
+    r = np.where(present, returns, 0.0)
+    m = np.where(present, market, 0.0)
+    n = _rolling_sum(present.astype(np.float64), window)
+    sr, sm = _rolling_sum(r, window), _rolling_sum(m, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = _rolling_sum(r * m, window) - sr * sm / n
+        var = _rolling_sum(m * m, window) - sm * sm / n
+        beta = cov / var
+    beta[n < _min_periods(window)] = np.nan
+    return beta
+
+
+def drawdown(close):
+    """Fractional distance below the running peak (0 at a new high, -0.3 is 30% down)"""
+    close = np.asarray(close, dtype=np.float64)
+    return close / np.fmax.accumulate(close, axis=0) - 1
+
+
+def window_ends(n_dates, window, max_windows=MAX_WINDOWS):
+    """Evenly spaced end positions of rolling windows, always including the last date"""
+    if n_dates < window:
+        return np.array([], dtype=np.int64)
+    return np.unique(np.linspace(window - 1, n_dates - 1, max_windows).round().astype(np.int64))
+
+
+def rolling_cov_corr(returns, window, ends):
+    """Covariance and correlation matrices of the windows ending at positions ends.
+
+    All windows are computed together: the stacked (windows, symbols, days)
+    view goes through four batched matrix products, which give the pairwise
+    counts, sums, sums of squares and cross products in one pass.
+    Returns two (len(ends), symbols, symbols) arrays.
+    """
+    stacked = sliding_window_view(returns, window, axis=0)[np.asarray(ends) - window + 1]
+    present = ~np.isnan(stacked)
+    if present.all():
+        # No gaps: one centred cross product per window
+        centred = stacked - stacked.mean(axis=2, keepdims=True)
+        cov = centred @ centred.swapaxes(1, 2) / (window - 1)
+        std = np.sqrt(np.diagonal(cov, axis1=1, axis2=2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / (std[:, :, None] * std[:, None, :])
+        return cov, np.clip(corr, -1, 1)
+    mask = present.astype(np.float64)
+    x = np.where(present, stacked, 0.0)
+    mask_t = mask.swapaxes(1, 2)
+    n = mask @ mask_t
+    sx = x @ mask_t  # sum of x_i over the days where j is present too
+    sxx = (x * x) @ mask_t
+    sxy = x @ x.swapaxes(1, 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = (sxy - sx * sx.swapaxes(1, 2) / n) / (n - 1)
+        var = (sxx - sx * sx / n) / (n - 1)
+        corr = cov / np.sqrt(var * var.swapaxes(1, 2))
+    short = n < _min_periods(window)
+    cov[short] = np.nan
+    corr[short] = np.nan
+    return cov, np.clip(corr, -1, 1)
+
+
+def average_correlation(corr):
+    """Mean off-diagonal correlation of each matrix in a (windows, n, n) stack"""
+    n = corr.shape[-1]
+    if n < 2:
+        return np.full(corr.shape[0], np.nan)
+    off = ~np.eye(n, dtype=bool)
+    return np.nanmean(corr[:, off], axis=1)
+
+
+def portfolio_curve(returns, weights=None):
+    """Growth of 1 invested at target weights, rebalanced daily.
+
+    weights default to equal; on days a symbol has no return its weight is
+    spread over the others.
+    """
+    n_symbols = returns.shape[1]
+    weights = np.full(n_symbols, 1.0 / n_symbols) if weights is None else np.asarray(weights, dtype=np.float64)
+    present = ~np.isnan(returns)
+    w = np.where(present, weights, 0.0)
+    total = w.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        daily = np.where(present, returns, 0.0) @ weights / total
+    daily[total == 0] = 0.0
+    return np.cumprod(1 + daily)
+
+
+def analyze(panel, symbols, window, weights=None, market=None, max_windows=MAX_WINDOWS):
+    """Returns analytics for some symbols of a PricePanel.
+
+    market is an optional Date-indexed close series of the benchmark index;
+    weights maps symbol to portfolio weight (equal weights when None).
+    Returns a dict of Date-indexed frames plus the latest covariance and
+    correlation matrices and a per-symbol summary table.
+    """
+    panel = panel.select(symbols)
+    close = panel.fields['Close'].astype(np.float64)
+    # Dates on which none of these symbols traded carry no information
+    traded = ~np.isnan(close).all(axis=1)
+    close = close[traded]
+    dates = pd.DatetimeIndex(panel.dates[traded], name='Date')
+    names = pd.Index(panel.symbols, name='Symbol')
+    returns = simple_returns(close)
+
+    frame = lambda values: pd.DataFrame(values, index=dates, columns=names)
+    result = {
+        'volatility': frame(rolling_volatility(returns, window)),
+        'drawdown': frame(drawdown(close)),
+    }
+
+    w = None
+    if weights is not None:
+        w = np.array([weights.get(s, np.nan) for s in panel.symbols], dtype=np.float64)
+        w = np.where(np.isnan(w), 0.0, w)
+        w = None if w.sum() <= 0 else w / w.sum()
+    result['portfolio'] = pd.Series(portfolio_curve(returns, w), index=dates, name='Portfolio')
+
+    if market is not None:
+        market_close = market.reindex(dates).to_numpy(dtype=np.float64)
+        market_returns = simple_returns(market_close[:, None])[:, 0]
+        result['beta'] = frame(rolling_beta(returns, market_returns, window))
+        growth = np.cumprod(1 + np.nan_to_num(market_returns))
+        result['index'] = pd.Series(growth, index=dates, name='Index')
+
+    max_windows = min(max_windows, max(MAX_CELLS // max(len(names), 1) ** 2, 2))
+    ends = window_ends(len(dates), window, max_windows)
+    if len(ends):
+        average = []
+        for start in range(0, len(ends), WINDOW_BATCH):
+            cov, corr = rolling_cov_corr(returns, window, ends[start:start + WINDOW_BATCH])
+            average.append(average_correlation(corr))
+        result['covariance'] = pd.DataFrame(cov[-1], index=names, columns=names)
+        result['correlation'] = pd.DataFrame(corr[-1], index=names, columns=names)
+        result['avg_correlation'] = pd.Series(np.concatenate(average), index=dates[ends], name='Average correlation')
+
+    first = pd.DataFrame(close).bfill().to_numpy()[0] if len(close) else np.full(len(names), np.nan)
+    last = pd.DataFrame(close).ffill().to_numpy()[-1] if len(close) else np.full(len(names), np.nan)
+    summary = pd.DataFrame({
+        'Total Return (%)': (last / first - 1) * 100,
+        'Volatility (%)': result['volatility'].ffill().iloc[-1].to_numpy() * 100 if len(dates) else np.nan,
+        'Max Drawdown (%)': result['drawdown'].min().to_numpy() * 100,
+    }, index=names)
+    if 'beta' in result:
+        summary['Beta'] = result['beta'].ffill().iloc[-1].to_numpy()
+    result['summary'] = summary
+    return result
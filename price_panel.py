@@ -0,0 +1,126 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# float32 keeps ~7 significant digits, plenty for INR prices; volume is an
+# integer count. Missing bars are NaN in the price fields and 0 in Volume.
+FIELD_DTYPES = {
+    'Open': np.float32,
+    'High': np.float32,
+    'Low': np.float32,
+    'Close': np.float32,
+    'Volume': np.uint64,
+}
+
+
+class PricePanel:
+    """Daily OHLCV as one contiguous (date x symbol) NumPy block per field.
+
+    Dates are a sorted datetime64[ns] array and symbols a sorted array of
+    strings. Date-range slices and contiguous symbol ranges are views into
+    the same blocks, so a panel loaded with mmap=True shares its pages with
+    every other worker reading the same files.
+    """
+
+    def __init__(self, dates, symbols, fields):
+        self.dates = dates
+        self.symbols = symbols
+        self.fields = fields
+        self._positions = None
+
+    @classmethod
+    def from_long(cls, long):
+        """Build a panel from long-format rows (Date, Symbol, OHLCV)"""
+        date_codes, dates = pd.factorize(pd.to_datetime(long['Date']).to_numpy(dtype='datetime64[ns]'), sort=True)
+        # Categorical codes avoid hashing millions of symbol strings
+        symbol = long['Symbol'].astype('category')
+        symbol = symbol.cat.reorder_categories(sorted(symbol.cat.categories)).cat.remove_unused_categories()
+        symbol_codes = symbol.cat.codes.to_numpy()
+        symbols = np.asarray(symbol.cat.categories.astype(str))
+        shape = (len(dates), len(symbols))
+        fields = {}
+        for field, dtype in FIELD_DTYPES.items():
+            if field not in long.columns:
+                continue
+            values = long[field].to_numpy(dtype=np.float64, na_value=np.nan)
+            if np.issubdtype(dtype, np.integer):
+                block = np.zeros(shape, dtype=dtype)
+                ok = ~np.isnan(values)
+                block[date_codes[ok], symbol_codes[ok]] = values[ok]
+            else:
+                block = np.full(shape, np.nan, dtype=dtype)
+                block[date_codes, symbol_codes] = values
+            fields[field] = block
+        return cls(np.asarray(dates, dtype='datetime64[ns]'), symbols, fields)
+
+    def to_long(self):
+        """Long-format rows for bars that exist (non-NaN Close), sorted by (Symbol, Date)"""
+        present = ~np.isnan(self.fields['Close']) if 'Close' in self.fields else np.ones(self.shape, dtype=bool)
+        si, di = np.nonzero(present.T)
+        long = pd.DataFrame({
+            'Date': self.dates[di],
+            'Symbol': pd.Categorical.from_codes(si, self.symbols),
+        })
+        for field, block in self.fields.items():
+            long[field] = block[di, si].astype(np.float64)
+        return long
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.symbols)
+
+    @property
+    def nbytes(self):
+        return self.dates.nbytes + sum(block.nbytes for block in self.fields.values())
+
+    def position(self, symbol):
+        if self._positions is None:
+            self._positions = {s: i for i, s in enumerate(self.symbols)}
+        return self._positions[symbol]
+
+    def frame(self, field):
+        """One field as a DataFrame (date x symbol) backed by the panel's block"""
+        return pd.DataFrame(self.fields[field], index=pd.DatetimeIndex(self.dates, name='Date'),
+                            columns=pd.Index(self.symbols, name='Symbol'), copy=False)
+
+    def series(self, symbol):
+        """One symbol's bars as a Date-indexed DataFrame (columns are strided views)"""
+        i = self.position(symbol)
+        return pd.DataFrame({field: block[:, i] for field, block in self.fields.items()},
+                            index=pd.DatetimeIndex(self.dates, name='Date'), copy=False)
+
+    def between(self, start=None, end=None):
+        """Panel restricted to start <= date <= end; a view, no data is copied"""
+        lo = 0 if start is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), 'ns'), 'left')
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end), 'ns'), 'right')
+        return PricePanel(self.dates[lo:hi], self.symbols, {f: b[lo:hi] for f, b in self.fields.items()})
+
+    def select(self, symbols):
+        """Panel with only the given symbols (in panel order). A contiguous run of
+        symbols is a view; anything else is gathered into new blocks."""
+        idx = np.sort([self.position(s) for s in symbols])
+        if len(idx) and idx[-1] - idx[0] + 1 == len(idx):
+            key = slice(idx[0], idx[-1] + 1)
+        else:
+            key = idx
+        return PricePanel(self.dates, self.symbols[key], {f: b[:, key] for f, b in self.fields.items()})
+
+    def save(self, path):
+        """Write one .npy file per field plus dates and symbols into directory path"""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'dates.npy'), np.ascontiguousarray(self.dates))
+        for field, block in self.fields.items():
+            np.save(os.path.join(path, f'{field}.npy'), np.ascontiguousarray(block))
+        with open(os.path.join(path, 'symbols.json'), 'w') as f:
+            json.dump({'symbols': list(map(str, self.symbols)), 'fields': list(self.fields)}, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Open a saved panel; with mmap=True the blocks are read-only memory maps"""
+        mode = 'r' if mmap else None
+        with open(os.path.join(path, 'symbols.json')) as f:
+            meta = json.load(f)
+        dates = np.load(os.path.join(path, 'dates.npy'), mmap_mode=mode)
+        fields = {field: np.load(os.path.join(path, f'{field}.npy'), mmap_mode=mode) for field in meta['fields']}
+        return cls(dates, np.array(meta['symbols']), fields)
@@ -0,0 +1,170 @@
+import threading
+import time
+import pandas as pd
+import yfinance as yf
+import data_store
+import http_cache
+import market_calendar
+import metrics
+import universe
+
+EMPTY_QUOTE = {'open': None, 'close': None, 'return': None}
+
+
+def quote_from_bars(bars):
+    """Build an open/close/return quote from a frame of intraday bars"""
+    if bars is None or bars.empty:
+        return dict(EMPTY_QUOTE)
+    bars = bars.dropna(subset=['Open', 'Close'])
+    if bars.empty:
+        return dict(EMPTY_QUOTE)
+    today_open = float(bars['Open'].iloc[0])
+    latest_close = float(bars['Close'].iloc[-1])
+    return {
+        'open': today_open,
+        'close': latest_close,
+        'return': ((latest_close - today_open) / today_open) * 100 if today_open else None,
+    }
+
+
+# Tickers per intraday request; large universes are split into several calls
+CHUNK_SIZE = 200
+
+
+def universe_symbols(fa=None):
+    """Symbols the shared quote poller covers, in poll order: those of the
+    cleaned fundamentals (fa, or the stored dataset), or the constituents if
+    no fundamentals are stored yet. Whoever warms the intraday cache must use
+    the same list, or the chunk cache keys will not match."""
+    if fa is None:
+        if not data_store.dataset_exists('fundamentals'):
+            return data_store.load_symbols()
+        fa = data_store.clean_fundamentals(data_store.load_dataset('fundamentals', columns=['Symbol', 'Company']))
+    return fa['Symbol'].astype(str).tolist()
+
+
+def download_intraday(symbols):
+    """Fetch today's 1-minute bars, batching symbols into multi-ticker downloads"""
+    result = {}
+    for chunk in universe.chunks(list(symbols), CHUNK_SIZE):
+        result.update(_download_chunk(chunk))
+    return result
+
+
+@http_cache.cached('yf_intraday', should_cache=lambda quotes: any(q['close'] is not None for q in quotes.values()))
+def _download_chunk(symbols):
+    tickers = [f"{symbol}.NS" for symbol in symbols]
+    try:
+        with metrics.timer('upstream_seconds', source='yfinance_intraday'):
+            data = yf.download(tickers, period="1d", interval="1m", group_by='ticker', progress=False, threads=True)
+    except Exception:
+        metrics.inc('upstream_requests_total', source='yfinance_intraday', status='error')
+        return {symbol: dict(EMPTY_QUOTE) for symbol in symbols}
+    metrics.inc('upstream_requests_total', source='yfinance_intraday', status='ok')
+    result = {}
+    for symbol, ticker in zip(symbols, tickers):
+        try:
+            if isinstance(data.columns, pd.MultiIndex):
+                bars = data[ticker]
+            else:
+                bars = data
+            result[symbol] = quote_from_bars(bars)
+        except Exception:
+            result[symbol] = dict(EMPTY_QUOTE)
+    return result
+
+
+class QuoteCache:
+    """Per-symbol intraday quote cache.
+
+    Only symbols that are missing or older than ttl seconds are downloaded, and
+    all of them go out in one batched request.
+    """
+
+    def __init__(self, ttl=3600, fetch=download_intraday):
+        self.ttl = ttl
+        self.fetch = fetch
+        self._quotes = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbols):
+        now = time.monotonic()
+        with self._lock:
+            stale = [s for s in symbols if s not in self._quotes or now - self._quotes[s][0] > self.ttl]
+        metrics.cache_lookup('quote_cache', True, len(symbols) - len(stale))
+        metrics.cache_lookup('quote_cache', False, len(stale))
+        if stale:
+            fetched = self.fetch(stale)
+            fetched_at = time.monotonic()
+            with self._lock:
+                for symbol in stale:
+                    self._quotes[symbol] = (fetched_at, fetched.get(symbol, dict(EMPTY_QUOTE)))
+        with self._lock:
+            return {s: self._quotes.get(s, (None, EMPTY_QUOTE))[1] for s in symbols}
+
+    def clear(self):
+        with self._lock:
+            self._quotes.clear()
+
+
+class QuotePoller:
+    """Background thread refreshing quotes for a fixed universe on a cadence.
+
+    All readers share one lock-protected snapshot, so upstream traffic depends
+    only on the interval, not on how many dashboard sessions are open.
+    """
+
+    def __init__(self, symbols, interval=60, fetch=download_intraday):
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.fetch = fetch
+        self.updated_at = None
+        self.last_error = None
+        self._snapshot = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="quote-poller", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def set_symbols(self, symbols):
+        """Change the polled universe; takes effect on the next refresh"""
+        symbols = list(symbols)
+        if symbols != self.symbols:
+            self.symbols = symbols
+
+    def refresh(self):
+        try:
+            fetched = self.fetch(self.symbols)
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return
+        with self._lock:
+            # Keep the previous quote if a symbol came back empty this round
+            for symbol, quote in fetched.items():
+                if quote.get('close') is not None or symbol not in self._snapshot:
+                    self._snapshot[symbol] = quote
+            self.updated_at = time.time()
+        self.last_error = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Quotes only move during NSE sessions; outside them one refresh
+            # is enough to have a snapshot
+            if self.updated_at is None or market_calendar.is_open():
+                self.refresh()
+            self._stop.wait(self.interval)
+
+    def snapshot(self, symbols=None):
+        with self._lock:
+            if symbols is None:
+                return dict(self._snapshot)
+            return {s: self._snapshot[s] for s in symbols if s in self._snapshot}
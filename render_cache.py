@@ -0,0 +1,65 @@
+import json
+import sys
+import threading
+from collections import OrderedDict
+import metrics
+
+
+class RenderCache:
+    """LRU cache of rendered HTML and Plotly figure JSON, bounded by total size.
+
+    Keys should include everything the output depends on (selection, columns,
+    dataset version), so entries never need explicit invalidation; old ones
+    simply age out.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        """Return the cached string for key, calling render() on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.cache_lookup('render', True)
+                return value
+            self.misses += 1
+        metrics.cache_lookup('render', False)
+        with metrics.timer('render_seconds', item=key[0] if isinstance(key, tuple) else key):
+            value = render()
+        self._put(key, value)
+        return value
+
+    def figure(self, key, build):
+        """Cached figure as a plain dict that st.plotly_chart accepts directly"""
+        return json.loads(self.get_or_render(key, lambda: build().to_json()))
+
+    def _put(self, key, value):
+        size = sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= sys.getsizeof(previous)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= sys.getsizeof(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
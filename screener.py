@@ -0,0 +1,256 @@
+import argparse
+import re
+import numpy as np
+import pandas as pd
+import data_store
+import universe
+
+# Short names accepted in queries, on top of the full column names
+# (matching is case-insensitive and ignores a trailing unit such as " (%)")
+COLUMN_ALIASES = {
+    'pe': 'P/E Ratio',
+    'p/e': 'P/E Ratio',
+    'forward pe': 'Forward P/E',
+    'peg': 'PEG Ratio',
+    'pb': 'P/B Ratio',
+    'p/b': 'P/B Ratio',
+    'de': 'Debt/Equity',
+    'd/e': 'Debt/Equity',
+    'market cap': 'Market Cap (₹100 Cr)',
+    'mcap': 'Market Cap (₹100 Cr)',
+    'dividend yield': 'Dividend Yield (%)',
+    'yield': 'Dividend Yield (%)',
+    'margin': 'Profit Margin (%)',
+}
+# Common Indian market shorthand for yfinance sector names
+VALUE_ALIASES = {
+    'it': 'Technology',
+    'tech': 'Technology',
+    'banking': 'Financial Services',
+    'banks': 'Financial Services',
+    'finance': 'Financial Services',
+    'pharma': 'Healthcare',
+    'fmcg': 'Consumer Defensive',
+    'auto': 'Consumer Cyclical',
+    'metals': 'Basic Materials',
+    'power': 'Utilities',
+}
+# Text columns indexed as one bitmap per distinct value
+CATEGORY_COLUMNS = ['Sector', 'Industry']
+
+_OPERATORS = r'<=|>=|!=|==|=|<|>|\bnot in\b|\bin\b'
+_CONDITION = re.compile(rf'^(?P<column>.+?)\s*(?P<op>{_OPERATORS})\s*(?P<value>.+)$', re.IGNORECASE)
+_SORT = re.compile(r'^sort(?:ed)?\s+by\s+(?P<column>.+?)(?:\s+(?P<order>asc|desc)(?:ending)?)?$', re.IGNORECASE)
+_LIMIT = re.compile(r'^(?:limit|top)\s+(?P<n>\d+)$', re.IGNORECASE)
+# A comma, unless it groups digits as in 1,000 or 1,00,000
+_SEPARATOR = r',(?!(?:\d\d,)*\d{3}(?!\d))'
+
+
+class Query:
+    """A parsed screen: AND-ed (column, op, value) conditions plus an optional
+    sort column and row limit"""
+
+    def __init__(self, conditions, sort=None, ascending=True, limit=None):
+        self.conditions = conditions
+        self.sort = sort
+        self.ascending = ascending
+        self.limit = limit
+
+    @property
+    def columns(self):
+        """Columns the query refers to, in order of appearance"""
+        columns = [c for c, _, _ in self.conditions] + ([self.sort] if self.sort else [])
+        return list(dict.fromkeys(columns))
+
+
+def _strip_unit(name):
+    return re.sub(r'\s*\(.*\)$|\s+ratio$', '', name.strip(), flags=re.IGNORECASE).lower()
+
+
+def resolve_column(name, columns):
+    """Map a name as typed in a query to a fundamentals column"""
+    key = name.strip().lower()
+    lookup = {c.lower(): c for c in columns}
+    if key in lookup:
+        return lookup[key]
+    if key in COLUMN_ALIASES and COLUMN_ALIASES[key] in columns:
+        return COLUMN_ALIASES[key]
+    stripped = {_strip_unit(c): c for c in columns}
+    if _strip_unit(key) in stripped:
+        return stripped[_strip_unit(key)]
+    raise ValueError(f"Unknown column '{name.strip()}'")
+
+
+def _parse_value(text):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'':
+        return text[1:-1]
+    try:
+        return float(text.replace(',', '').replace('_', ''))
+    except ValueError:
+        return text
+
+
+def parse(text, columns):
+    """Parse e.g. "P/E < 20 and ROE > 15, sector = IT, sort by PEG desc, limit 10".
+
+    Clauses are separated by 'and' or commas and all have to hold. Commas
+    that group digits are part of the number ("Market Cap > 1,000").
+    'in' and 'not in' take a parenthesised, comma-separated list.
+    """
+    # Commas inside (a, b) lists and digit grouping are not clause separators
+    clauses = re.split(rf'{_SEPARATOR}(?![^()]*\))|\s+and\s+', text.strip(), flags=re.IGNORECASE)
+    conditions, sort, ascending, limit = [], None, True, None
+    for clause in filter(None, (c.strip() for c in clauses)):
+        if m := _SORT.match(clause):
+            sort = resolve_column(m['column'], columns)
+            ascending = (m['order'] or 'asc').lower() == 'asc'
+        elif m := _LIMIT.match(clause):
+            limit = int(m['n'])
+        elif m := _CONDITION.match(clause):
+            op = m['op'].lower()
+            op = '=' if op == '==' else op
+            if op in ('in', 'not in'):
+                items = m['value'].strip()
+                if not (items.startswith('(') and items.endswith(')')):
+                    raise ValueError(f"'{op}' needs a list in parentheses: {clause}")
+                value = [_parse_value(v) for v in re.split(_SEPARATOR, items[1:-1]) if v.strip()]
+            else:
+                value = _parse_value(m['value'])
+            conditions.append((resolve_column(m['column'], columns), op, value))
+        else:
+            raise ValueError(f"Cannot parse '{clause}'")
+    return Query(conditions, sort, ascending, limit)
+
+
+class ScreenerIndex:
+    """Per-column indexes over a fundamentals frame, built once per dataset
+    version.
+
+    Numeric columns keep their row positions sorted by value (NaN rows
+    excluded), so a range condition is two binary searches and a scatter into
+    a boolean row mask. Sector and Industry keep one boolean mask per
+    distinct value.
+    Conditions combine with &, and sorting walks the sort column's order
+    instead of sorting the matches again.
+    """
+
+    def __init__(self, fa):
+        self.frame = fa.reset_index(drop=True)
+        self.size = len(self.frame)
+        self.sorted = {}
+        self.bitmaps = {}
+        for column in self.frame.columns:
+            series = self.frame[column]
+            if column in CATEGORY_COLUMNS:
+                codes, values = pd.factorize(series.astype(object).where(series.notna(), None))
+                self.bitmaps[column] = {str(v).lower(): codes == i for i, v in enumerate(values)}
+            elif pd.api.types.is_numeric_dtype(series):
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+                order = np.argsort(values, kind='stable')
+                order = order[~np.isnan(values[order])]
+                self.sorted[column] = (values[order], order)
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    def _range(self, column, op, value):
+        values, order = self.sorted[column]
+        if not isinstance(value, float):
+            raise ValueError(f"'{column}' is numeric; '{value}' is not a number")
+        lo, hi = 0, len(values)
+        if op == '<':
+            hi = np.searchsorted(values, value, 'left')
+        elif op == '<=':
+            hi = np.searchsorted(values, value, 'right')
+        elif op == '>':
+            lo = np.searchsorted(values, value, 'right')
+        elif op == '>=':
+            lo = np.searchsorted(values, value, 'left')
+        elif op == '=':
+            lo, hi = np.searchsorted(values, value, 'left'), np.searchsorted(values, value, 'right')
+        mask = np.zeros(self.size, dtype=bool)
+        mask[order[lo:hi]] = True
+        return mask
+
+    def _members(self, column, values):
+        if column not in self.bitmaps:
+            # Unique-per-row text (Symbol, Company) is compared directly
+            text = self.frame[column].astype(str).str.lower().to_numpy()
+            return np.isin(text, [str(v).lower() for v in values])
+        bitmaps = self.bitmaps[column]
+        mask = np.zeros(self.size, dtype=bool)
+        for value in values:
+            key = str(value).lower()
+            key = key if key in bitmaps else VALUE_ALIASES.get(key, key).lower()
+            if key in bitmaps:
+                mask |= bitmaps[key]
+        return mask
+
+    def mask(self, column, op, value):
+        """Boolean row mask for one condition"""
+        if column in self.sorted:
+            if op in ('in', 'not in'):
+                values = np.asarray([float(v) for v in value])
+                mask = np.isin(self.frame[column].to_numpy(dtype=np.float64, na_value=np.nan), values)
+                return ~mask if op == 'not in' else mask
+            if op == '!=':
+                return self._range(column, '<', value) | self._range(column, '>', value)
+            return self._range(column, op, value)
+        if op in ('in', 'not in'):
+            mask = self._members(column, value)
+            return ~mask if op == 'not in' else mask
+        if op in ('=', '!='):
+            mask = self._members(column, [value])
+            return ~mask if op == '!=' else mask
+        raise ValueError(f"'{column}' is text; use =, !=, in or not in")
+
+    def positions(self, query):
+        """Row positions matching query, in the query's sort order"""
+        mask = np.ones(self.size, dtype=bool)
+        for column, op, value in query.conditions:
+            mask &= self.mask(column, op, value)
+        if query.sort is None:
+            positions = np.flatnonzero(mask)
+        elif query.sort in self.sorted:
+            _, order = self.sorted[query.sort]
+            positions = order[mask[order]]
+            if not query.ascending:
+                positions = positions[::-1]
+            # Rows without a value for the sort column go last
+            missing = mask.copy()
+            missing[order] = False
+            positions = np.concatenate([positions, np.flatnonzero(missing)])
+        else:
+            positions = np.flatnonzero(mask)
+            keys = self.frame[query.sort].iloc[positions].astype(str).to_numpy()
+            positions = positions[np.argsort(keys, kind='stable')]
+            if not query.ascending:
+                positions = positions[::-1]
+        return positions[:query.limit] if query.limit is not None else positions
+
+    def screen(self, text):
+        """Rows of the fundamentals frame matching a query string"""
+        return self.frame.iloc[self.positions(parse(text, self.columns))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen the stored fundamentals with a query")
+    universe.add_arguments(parser)
+    parser.add_argument('query', help='e.g. "P/E < 20 and ROE > 15 and Debt/Equity < 100, sector = IT, sort by PEG"')
+    parser.add_argument('--limit', type=int, default=20, help="rows to print")
+    args = parser.parse_args()
+
+    data_store.use_universe(universe.from_args(args))
+    fa = data_store.clean_fundamentals(data_store.load_dataset('fundamentals'))
+    index = ScreenerIndex(fa)
+    query = parse(args.query, index.columns)
+    result = index.frame.iloc[index.positions(query)]
+    print(f"{len(result)} of {len(fa)} stocks match")
+    print(result[['Symbol', 'Company'] + [c for c in query.columns if c not in ('Symbol', 'Company')]]
+          .head(args.limit).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
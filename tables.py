@@ -0,0 +1,164 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import metrics
+
+GOOD = 'background-color: #d4edda; color: #155724; font-weight: bold;'
+FAIR = 'background-color: #fff3cd; color: #856404;'
+POOR = 'background-color: #f8d7da; color: #721c24;'
+MISSING = 'background-color: #f8f9fa; color: #6c757d; font-style: italic;'
+NEUTRAL = 'background-color: #e9ecef; color: #495057;'
+
+# Threshold rules: (column name fragments, better, good threshold, fair threshold).
+# better='lower' means value < good is GOOD and value < fair is FAIR;
+# better='higher' means value > good is GOOD and value > fair is FAIR; anything
+# else is POOR. The first rule with a fragment contained in the column name wins.
+VALUATION_RULES = (
+    (('P/E Ratio', 'Forward P/E'), 'lower', 15, 25),
+    (('PEG Ratio',), 'lower', 1, 2),
+    (('P/B Ratio',), 'lower', 1, 3),
+    (('Dividend Yield',), 'higher', 5, 2),
+)
+
+HEALTH_RULES = (
+    (('ROE', 'ROA', 'Profit Margin', 'Operating Margin'), 'higher', 20, 10),
+    (('Debt/Equity',), 'lower', 0.5, 1),
+    (('Current Ratio', 'Quick Ratio'), 'higher', 2, 1),
+)
+
+FUNDAMENTAL_RULES = (
+    (('Market Cap',), 'higher', 500, 200),
+    (('P/E Ratio',), 'lower', 15, 25),
+    (('ROE',), 'higher', 20, 10),
+    (('Profit Margin',), 'higher', 15, 5),
+    (('EPS',), 'higher', 50, 20),
+)
+
+TABLE_PROPERTIES = {
+    'border': '1px solid #dee2e6',
+    'border-radius': '8px',
+    'padding': '12px',
+    'text-align': 'center',
+    'font-family': 'Arial, sans-serif',
+    'font-size': '14px'
+}
+
+HEADER_STYLE = [
+    ('background-color', '#343a40'),
+    ('color', 'white'),
+    ('font-weight', 'bold'),
+    ('text-align', 'center'),
+    ('padding', '15px'),
+    ('border', '1px solid #dee2e6')
+]
+
+CELL_STYLE = [
+    ('border', '1px solid #dee2e6'),
+    ('padding', '12px'),
+    ('text-align', 'center')
+]
+
+_CSS_CACHE = OrderedDict()
+_CSS_CACHE_SIZE = 64
+
+
+def _rule_for(column, rules):
+    for fragments, better, good, fair in rules:
+        if any(fragment in column for fragment in fragments):
+            return better, good, fair
+    return None
+
+
+def cell_styles(df, rules, default=''):
+    """CSS for every cell of df, evaluated as one np.select per column.
+
+    NaN cells get MISSING, numeric cells are banded by the matching rule (or
+    get `default` when no rule matches) and non-numeric cells stay unstyled.
+    """
+    css = np.empty(df.shape, dtype=object)
+    for j, column in enumerate(df.columns):
+        values = df.iloc[:, j]
+        missing = values.isna().to_numpy()
+        if not pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+            css[:, j] = np.where(missing, MISSING, '')
+            continue
+        rule = _rule_for(str(column), rules)
+        if rule is None:
+            css[:, j] = np.where(missing, MISSING, default)
+            continue
+        better, good, fair = rule
+        x = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        if better == 'lower':
+            conditions = [missing, x < good, x < fair]
+        else:
+            conditions = [missing, x > good, x > fair]
+        css[:, j] = np.select(conditions, [MISSING, GOOD, FAIR], POOR)
+    return pd.DataFrame(css, index=df.index, columns=df.columns)
+
+
+def frame_version(df):
+    """Content fingerprint of a frame, used when the caller has no data version"""
+    return (tuple(map(str, df.columns)), tuple(map(str, df.index)),
+            int(pd.util.hash_pandas_object(df, index=False).to_numpy().sum()))
+
+
+def _cached_styles(name, df, rules, default, version):
+    key = (name, tuple(map(str, df.columns)), version if version is not None else frame_version(df))
+    css = _CSS_CACHE.get(key)
+    metrics.cache_lookup('table_css', css is not None)
+    if css is None:
+        with metrics.timer('style_seconds', table=name):
+            css = cell_styles(df, rules, default)
+        _CSS_CACHE[key] = css
+        while len(_CSS_CACHE) > _CSS_CACHE_SIZE:
+            _CSS_CACHE.popitem(last=False)
+    else:
+        _CSS_CACHE.move_to_end(key)
+    return css
+
+
+def _styled(df, name, rules, default='', version=None):
+    css = _cached_styles(name, df, rules, default, version)
+    return df.style.apply(lambda _: css, axis=None)
+
+
+def style_valuation_table(valuation_data, version=None):
+    """Styled valuation table (P/E, PEG, P/B, dividend yield) indexed by company"""
+    return _styled(valuation_data, 'valuation', VALUATION_RULES, version=version).set_properties(
+        **TABLE_PROPERTIES
+    ).set_table_styles([
+        {'selector': 'th', 'props': HEADER_STYLE},
+        {'selector': 'td', 'props': CELL_STYLE}
+    ]).format('{:.2f}')
+
+
+def style_health_table(health_data, version=None):
+    """Styled financial health table (returns, margins, leverage, liquidity)"""
+    return _styled(health_data, 'health', HEALTH_RULES, version=version).set_properties(
+        **TABLE_PROPERTIES
+    ).set_table_styles([
+        {'selector': 'th', 'props': HEADER_STYLE},
+        {'selector': 'td', 'props': CELL_STYLE}
+    ]).format('{:.2f}')
+
+
+def style_fundamental_table(fa_display, numeric_cols, version=None):
+    """Styled comprehensive fundamentals table for the selected columns"""
+    styled_df = _styled(fa_display, 'fundamental', FUNDAMENTAL_RULES, default=NEUTRAL, version=version)
+
+    # Format values with proper formatting
+    styled_df = styled_df.format({col: '{:,.2f}' if 'Market Cap' in col else '{:.2f}' for col in numeric_cols})
+
+    # Add hover effects and better table styling
+    return styled_df.set_properties(**TABLE_PROPERTIES).set_table_styles([
+        {'selector': 'th', 'props': HEADER_STYLE + [('border-radius', '8px 8px 0 0')]},
+        {'selector': 'td', 'props': CELL_STYLE},
+        {'selector': 'tr:nth-child(even)', 'props': [
+            ('background-color', '#f8f9fa')
+        ]},
+        {'selector': 'tr:hover', 'props': [
+            ('background-color', '#e3f2fd'),
+            ('transform', 'scale(1.02)'),
+            ('transition', 'all 0.3s ease')
+        ]}
+    ])
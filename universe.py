@@ -0,0 +1,80 @@
+import os
+import re
+from urllib.parse import quote
+import pandas as pd
+import http_cache
+
+DEFAULT_INDEX = "NIFTY 50"
+
+# Environment overrides so the dashboard and scheduled jobs agree on the
+# universe without passing flags around
+INDEX_ENV = 'DASHBOARD_INDEX'
+SYMBOLS_FILE_ENV = 'DASHBOARD_SYMBOLS_FILE'
+
+
+class Universe:
+    """The set of symbols the pipeline and dashboard work on: an NSE index or
+    a custom symbol file"""
+
+    def __init__(self, index=None, symbols_file=None):
+        self.index = index or (None if symbols_file else DEFAULT_INDEX)
+        self.symbols_file = symbols_file
+
+    @property
+    def name(self):
+        if self.symbols_file:
+            return os.path.splitext(os.path.basename(self.symbols_file))[0]
+        return self.index.title()
+
+    @property
+    def slug(self):
+        """Dataset file prefix, e.g. 'nifty50' or 'nifty500'"""
+        return re.sub(r'[^a-z0-9]+', '', self.name.lower()) or 'custom'
+
+    def fetch_symbols(self):
+        if self.symbols_file:
+            return read_symbols_file(self.symbols_file)
+        return fetch_index_symbols(self.index)
+
+    def __repr__(self):
+        return f"Universe(index={self.index!r}, symbols_file={self.symbols_file!r})"
+
+
+@http_cache.cached('nse_index', should_cache=bool)
+def fetch_index_symbols(index):
+    """Constituents of any NSE index, without the index's own summary row"""
+    from nsepython import nsefetch
+    url = f"https://www.nseindia.com/api/equity-stockIndices?index={quote(index)}"
+    data = nsefetch(url)
+    return [item['symbol'] for item in data['data'] if item['symbol'] != index]
+
+
+def read_symbols_file(path):
+    """Symbols from a CSV with a Symbol column, or one symbol per line"""
+    with open(path) as f:
+        first = f.readline().strip()
+    if first.lower().startswith('symbol'):
+        symbols = pd.read_csv(path)['Symbol']
+    else:
+        symbols = pd.read_csv(path, header=None)[0]
+    return [s.strip().upper().removesuffix('.NS') for s in symbols.dropna().astype(str) if s.strip()]
+
+
+def from_env():
+    return Universe(os.environ.get(INDEX_ENV), os.environ.get(SYMBOLS_FILE_ENV))
+
+
+def add_arguments(parser):
+    parser.add_argument('--index', help=f"NSE index to work on (default: ${INDEX_ENV} or '{DEFAULT_INDEX}')")
+    parser.add_argument('--symbols-file', help="CSV or text file of symbols to use instead of an index")
+
+
+def from_args(args):
+    if args.index or args.symbols_file:
+        return Universe(args.index, args.symbols_file)
+    return from_env()
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]